@@ -1,65 +1,505 @@
+import hashlib
 import os
 import sys
 import streamlit as st
+import numpy as np
 import pandas as pd
-from io import BytesIO
-from wordcloud import WordCloud
+from concurrent import futures
 
 # Add parent dir for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Existing imports
 from src.analyze import compute_sentiment, top_keywords, topic_model, ensure_datetime
-from src.emotions import analyze_emotions
+from src.emotions import analyze_emotions, emotion_scores
 from src.reporting import build_pdf
 from src.summary import generate_summary
 
 # NEW imports for advanced NLP
+from src.keyword_index import KeywordIndex
+from src.rollups import Rollups
+from src.dedup import deduplicate
+from src.ingest import load_journal
 from src.symbols_ext import load_symbol_lexicon, symbol_summary_for_df
-from src.semantic import get_model, build_embeddings_index, semantic_search
+from src.symbol_analytics import symbol_analytics, symbol_report_table
+from src.semantic import get_model, embed_texts, semantic_search
 from src.clustering import cluster_with_kmeans, label_clusters_by_top_terms
+from src.retrieval import select_context
+from src.corpus import DreamCorpus, score_sentiment
+from src.jobs import JobRunner, map_chunks
+from src.knn_graph import build_knn_graph, recurring_chains, similar_dreams
+from src.anomaly import detect_anomalies
+from src.snapshot import load_snapshot, seed_jobs
+
+# Optional shared analysis service: the heavy stages run in its preloaded
+# worker pool (see src/service.py) and this app becomes a thin client.
+if os.getenv("DREAM_NLP_SERVICE_URL"):
+    from src.service import ServiceClient
+    _service = ServiceClient(os.getenv("DREAM_NLP_SERVICE_URL"))
+    compute_sentiment = _service.compute_sentiment
+    analyze_emotions = _service.analyze_emotions
+    symbol_summary_for_df = _service.symbol_summary_for_df
+    cluster_with_kmeans = _service.cluster_with_kmeans
 
 # Visuals
 from src.visuals import (
     plot_emotion_trends,
     plot_dream_frequency,
     plot_keyword_emotion_network,
-    plot_cluster_projection
+    plot_cluster_projection,
+    wordcloud_png,
 )
 
 
 # Streamlit Config
 st.set_page_config(page_title="Dream Journal NLP", layout="wide")
 st.title("🌙 Dream Journal NLP")
-st.caption("Upload a CSV with columns: date, text")
+st.caption("Upload a journal: CSV or JSONL with date and text, a Markdown file, or a plain-text diary")
 
 
 # --- Helper Functions ---
 def make_wordcloud(freq: dict):
-    """Generate and display a word cloud."""
-    wc = WordCloud(width=1200, height=600, background_color="white", colormap="plasma").generate_from_frequencies(freq)
-    buf = BytesIO()
-    wc.to_image().save(buf, format="PNG")
-    st.image(buf.getvalue(), use_container_width=True)  # ✅ fixed deprecated arg
+    """Display a word cloud (rendered once per distinct set of frequencies)."""
+    st.image(wordcloud_png(freq), use_container_width=True)  # ✅ fixed deprecated arg
+
+
+@st.cache_resource(max_entries=4, show_spinner="Indexing keywords...")
+def get_keyword_index(dataset_key, _df):
+    """Tokenize the journal once; date-range keyword queries then take milliseconds."""
+    return KeywordIndex.from_frame(_df)
+
+
+@st.cache_data(show_spinner="Checking for duplicate entries...")
+def remove_duplicates(df):
+    """Exact and near-duplicate entries (re-imports, double pastes) are merged at ingest."""
+    return deduplicate(df)
+
+
+# --- Whole-journal stages, computed once per dataset ---
+# Widget changes rerun the script (or only a fragment, below); every NLP stage
+# is cached on the dataset / filtered view, so a rerun only re-slices results.
+@st.cache_resource(max_entries=4, show_spinner="Scoring sentiment...")
+def get_scored_corpus(dataset_key, source, _df, _snapshot=None):
+    """Columnar journal with a sentiment score for every entry (batched VADER, so cheap)."""
+    corpus = DreamCorpus.from_frame(_df)
+    if source == "snapshot":
+        corpus.attach("sentiment", _snapshot["sentiment"])
+    elif source == "service":
+        corpus.attach("sentiment", compute_sentiment(corpus.to_frame([]))["sentiment"].to_numpy())
+    elif source == "local":
+        score_sentiment(corpus)
+    # A journal store already holds per-entry sentiment and emotion scores
+    return corpus
+
+
+def get_embedding_model():
+    # With the analysis service, query embeddings are computed there as well
+    return _service if os.getenv("DREAM_NLP_SERVICE_URL") else get_model()
+
+
+def view_key(dataset_key, corpus):
+    """Cache key of a filtered view: the dataset plus the rows it covers."""
+    return f"{dataset_key}:{hashlib.sha1(corpus.positions().tobytes()).hexdigest()}"
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_sample_snapshot(sample_path, mtime):
+    """Precomputed sample analysis, if it still matches the sample and the models."""
+    return load_snapshot(sample_path)
+
+
+# --- Background jobs (see src/jobs.py) ---
+# Emotions, embeddings, topics, clusters and the forecast run concurrently
+# while the cheap sections render; each section fills in when its job ends.
+def get_job_runner():
+    """Background jobs of this browser session."""
+    if "job_runner" not in st.session_state:
+        st.session_state["job_runner"] = JobRunner()
+    return st.session_state["job_runner"]
+
+
+def _emotion_chunk(texts):
+    if os.getenv("DREAM_NLP_SERVICE_URL"):
+        emo = analyze_emotions(pd.DataFrame({"text": texts}))
+        labels = [c for c in emo.columns if c != "text"]
+        return labels, emo[labels].to_numpy(dtype=np.float32)
+    return emotion_scores(texts)
+
+
+@st.cache_data(max_entries=4, show_spinner="Estimating emotions...")
+def get_fast_emotions(dataset_key, _texts):
+    """Lexicon-tier emotion scores (see src/emotion_lexicon.py): milliseconds, shown until the model's arrive."""
+    return emotion_scores(_texts, tier="fast")
+
+
+def emotions_note(emo_job):
+    """Caption for emotion charts still drawn from the lexicon estimates."""
+    if emo_job is None or emo_job.state == "done":
+        return
+    if emo_job.state == "failed":
+        st.caption(f"⚠️ Emotion model failed ({emo_job.error}); showing quick lexicon estimates.")
+    else:
+        st.caption(f"⚡ Quick lexicon estimates, refined in place by the emotion model "
+                   f"({emo_job.progress:.0%}, {emo_job.elapsed():.0f}s)")
+
+
+def score_emotions_job(texts):
+    """(labels, n x labels scores) for the whole journal, in chunks so progress shows."""
+    parts = map_chunks(_emotion_chunk, texts)
+    return parts[0][0], np.vstack([scores for _, scores in parts])
+
+
+def embed_job(texts):
+    model = get_embedding_model()
+    return np.vstack(map_chunks(lambda chunk: embed_texts(chunk, model=model), texts, chunk_size=512))
+
+
+def submit_clusters(runner, key, emb_job, positions, df, n_clusters, kw_index):
+    """Clustering of a view, started as soon as the journal embeddings are ready."""
+    def run(embeddings):
+        view = embeddings[positions]
+        labels, km = cluster_with_kmeans(view, n_clusters=n_clusters)
+        # Top terms from the keyword index's document-term matrix, samples nearest each centroid
+        return labels, label_clusters_by_top_terms(df, labels, embeddings=view, centers=km.cluster_centers_,
+                                                   doc_terms=kw_index.doc_terms[positions], vocab=kw_index.vocab)
+    return runner.submit(f"clusters:{key}:{n_clusters}", run, after=[emb_job.name])
+
+
+def submit_forecast(runner, key, daily):
+    def run():
+        from src.forecast import forecast_emotions
+        return forecast_emotions(daily)
+    return runner.submit(f"forecast:{key}", run)
+
+
+def job_ready(job, label, wait=False):
+    """True once the job has a result; until then a progress bar (or its error) stands in."""
+    if job is None:
+        return True
+    if wait and not job.done():
+        with st.spinner(f"{label}..."):
+            futures.wait([job.future])
+    if job.state == "failed":
+        st.error(f"{label} failed: {job.error}")
+        return False
+    if not job.done():
+        st.progress(job.progress, text=f"{label}... ({job.elapsed():.0f}s)")
+        return False
+    return True
+
+
+def job_result(job, default):
+    return job.result() if job is not None and job.state == "done" else default
+
+
+def retry_failed_jobs(runner):
+    """A button that drops the failed jobs, so the rerun submits them again."""
+    failed = [j.name for j in runner.jobs() if j.state == "failed"]
+    if failed and st.button(f"🔁 Retry failed analyses ({len(failed)})", key="retry_failed_jobs"):
+        for name in failed:
+            runner.forget(name)
+        st.rerun()
+
+
+@st.fragment(run_every=1.0)
+def background_progress(runner):
+    """Polls the running jobs and reruns the page whenever one of them finishes."""
+    finished = {j.name for j in runner.jobs() if j.done()}
+    if finished - st.session_state.get("jobs_shown", set()):
+        st.rerun()
+    pending = sorted({j.name.split(":")[0] for j in runner.pending()})
+    if pending:
+        st.caption("⏳ Still analyzing in the background: " + ", ".join(pending))
+
+
+@st.cache_resource(max_entries=8)
+def get_rollups(key, _scores, columns):
+    return Rollups.from_frame(_scores, columns)
+
+
+@st.cache_data(max_entries=8)
+def get_anomalies(key, _scores, columns):
+    return detect_anomalies(_scores)
+
+
+@st.cache_data(max_entries=8)
+def get_top_keywords(key, _df):
+    return top_keywords(_df, n=30)
+
+
+@st.cache_data(max_entries=8, show_spinner="Counting dream symbols...")
+def get_symbol_totals(key, _df):
+    return symbol_summary_for_df(_df, load_symbol_lexicon())[1]
+
+
+@st.cache_resource(max_entries=8, show_spinner="Analyzing symbols...")
+def get_symbol_stats(key, _symbol_df, score_cols):
+    return symbol_analytics(_symbol_df, load_symbol_lexicon(), score_cols=score_cols)
+
+
+@st.cache_resource(max_entries=8, show_spinner="Linking similar dreams...")
+def get_knn_graph(key, _embeddings):
+    return build_knn_graph(_embeddings, k=10)
+
+
+@st.cache_data(max_entries=8, show_spinner="Detecting emotional triggers...")
+def get_triggers(key, _df_sent, _emo_df):
+    from src.triggers import detect_emotion_triggers
+    return detect_emotion_triggers(_df_sent, _emo_df)
+
+
+@st.cache_data(max_entries=8, show_spinner="Building keyword network...")
+def get_network_html(key, _kw_df, _emo_df):
+    with open(plot_keyword_emotion_network(_kw_df, _emo_df)) as f:
+        return f.read()
+
+
+# --- Sections with their own widgets ---
+# Each is a fragment: interacting with its widgets reruns only that section.
+@st.fragment
+def sentiment_trend_section(rollups):
+    st.markdown("**Sentiment Trend**")
+    resolution = st.radio("Resolution", ["Day", "Week", "Month"], horizontal=True,
+                          label_visibility="collapsed")
+    st.line_chart(rollups.frame(resolution[0], series=["sentiment"]).set_index("date"))
+
+
+@st.fragment
+def semantic_search_section(df, emb_job, embeddings):
+    st.subheader("🧠 Semantic Search (Meaning-based)")
+    if not job_ready(emb_job, "Building semantic embeddings"):
+        return
+    query = st.text_input("Enter a phrase to search semantically (e.g., 'fear', 'ocean', 'falling'):")
+    if query:
+        results = semantic_search(query, df, embeddings, top_k=8, model=get_embedding_model())
+        st.write(f"Top semantic matches for **'{query}'**:")
+        st.dataframe(results[["date", "text", "score"]], use_container_width=True)
+
+
+@st.fragment
+def recurring_dreams_section(key, df, emb_job, embeddings):
+    st.subheader("🔁 Recurring Dreams")
+    if not job_ready(emb_job, "Building semantic embeddings"):
+        return
+    graph = get_knn_graph(key, embeddings)
+
+    min_sim = st.slider("Similarity threshold", 0.5, 0.95, 0.75, 0.05)
+    chains = recurring_chains(graph, min_similarity=min_sim)
+    if chains.empty:
+        st.info("No recurring dreams above this similarity.")
+    else:
+        st.write(f"Found **{len(chains)}** recurring dream chains.")
+        for _, chain in chains.head(5).iterrows():
+            members = df.iloc[chain["rows"]]
+            first, last = members["date"].min(), members["date"].max()
+            with st.expander(f"{chain['size']} dreams, {first:%Y-%m-%d} → {last:%Y-%m-%d}"):
+                st.dataframe(members[["date", "text"]], use_container_width=True)
+
+    pick = st.selectbox("Show earlier dreams similar to:", range(len(df)), index=len(df) - 1,
+                        format_func=lambda i: f"{df['date'].iloc[i]:%Y-%m-%d} — {str(df['text'].iloc[i])[:60]}")
+    similar = similar_dreams(graph, df, pick)
+    if similar.empty:
+        st.caption("No earlier dreams to compare with.")
+    else:
+        st.dataframe(similar, use_container_width=True)
+
+
+@st.fragment
+def clustering_section(runner, key, df, emb_job, positions, kw_index):
+    st.subheader("🌌 Thematic Clustering of Dreams")
+    n_clusters = st.slider("Number of clusters (KMeans)", 2, 12, 6, key="n_clusters")
+    job = submit_clusters(runner, key, emb_job, positions, df, n_clusters, kw_index)
+    # Wait for a re-clustering asked for here, not for the embeddings themselves
+    if not job_ready(job, "Clustering dreams", wait=emb_job.done()):
+        return
+    _, cluster_summary = job.result()
+
+    if not cluster_summary.empty:
+        st.dataframe(cluster_summary[["cluster", "label", "size"]], use_container_width=True)
+        selected_cluster = st.selectbox("Select cluster to view example dreams:",
+                                        options=cluster_summary["cluster"].tolist())
+        if selected_cluster is not None:
+            examples = cluster_summary.loc[cluster_summary["cluster"] == selected_cluster, "samples"].explode().tolist()
+            st.write("**Dreams closest to the center of this cluster:**")
+            for e in examples[:8]:
+                st.markdown(f"- {e}")
+    else:
+        st.info("Not enough data to form meaningful clusters.")
+
+
+@st.fragment
+def visual_analytics_section(runner, key, score_key, df, emo_job, emb_job, embeddings, positions, kw_index,
+                             rollups, emotion_cols, kw_df, emo_df):
+    st.subheader("📊 Interactive Visual Analytics")
+    # Only the selected view is computed; nothing is until one is opened
+    view = st.radio("View", ["Emotion Trends", "Dream Frequency", "Keyword–Emotion Network", "Cluster Map"],
+                    index=None, horizontal=True, label_visibility="collapsed")
+    if view == "Emotion Trends":
+        emotions_note(emo_job)
+        st.plotly_chart(plot_emotion_trends(rollups.frame("D", series=emotion_cols)), use_container_width=True)
+    elif view == "Dream Frequency":
+        st.image(plot_dream_frequency(df), use_container_width=True)
+    elif view == "Keyword–Emotion Network":
+        emotions_note(emo_job)
+        st.components.v1.html(get_network_html(score_key, kw_df, emo_df), height=520, scrolling=True)
+    elif view == "Cluster Map":
+        job = submit_clusters(runner, key, emb_job, positions, df, st.session_state.get("n_clusters", 6),
+                              kw_index)
+        if job_ready(job, "Clustering dreams", wait=emb_job.done()):
+            st.plotly_chart(plot_cluster_projection(df, embeddings, job.result()[0]), use_container_width=True)
+    else:
+        st.caption("Pick a view to render it.")
+
+
+def forecast_section(forecast_job):
+    st.subheader("🔮 Emotional Forecasting")
+    if not job_ready(forecast_job, "Forecasting sentiment"):
+        return
+    buf, summary = forecast_job.result()
+    buf.seek(0)
+    st.image(buf, use_container_width=True)
+    st.success(summary)
+
+
+@st.fragment
+def triggers_section(key, df_sent, emo_df):
+    st.subheader("🎯 Emotional Triggers in Dreams")
+    if not st.toggle("Show emotional triggers", key="show_triggers"):
+        return
+    try:
+        triggers = get_triggers(key, df_sent, emo_df)
+        st.dataframe(triggers, use_container_width=True)
+        st.markdown("**Interpretation:** Words with higher positive coefficients "
+                    "are linked to happier dreams, while negative ones indicate stressors or anxieties.")
+    except Exception as e:
+        st.error(f"Trigger detection failed: {e}")
+
+
+@st.fragment
+def pdf_export_section(runner, key, df, emb_job, positions, kw_index, df_sent, daily, avg, kw_df, topics,
+                       symbol_totals, symbol_stats, anomalies=None):
+    st.subheader("📄 Export Report")
+    if st.button("Generate PDF Report"):
+        job = submit_clusters(runner, key, emb_job, positions, df, st.session_state.get("n_clusters", 6),
+                              kw_index)
+        futures.wait([job.future])
+        cluster_summary = job_result(job, (None, pd.DataFrame()))[1]
+        pdf_buffer = build_pdf(df_sent, daily, avg, kw_df, topics, symbol_totals, cluster_summary,
+                               symbol_stats=symbol_report_table(symbol_stats) if symbol_stats else None,
+                               anomalies=anomalies)
+        st.download_button(
+            label="⬇️ Download PDF",
+            data=pdf_buffer,
+            file_name="dream_journal_report.pdf",
+            mime="application/pdf",
+        )
+
+
+@st.fragment
+def assistant_section(df, emb_job, embeddings):
+    import src.ai_assistant as assistant  # ✅ make sure this file exists in src/
+
+    st.markdown("---")
+    st.header("💬 Dream AI Assistant")
+    st.caption("Ask the AI to interpret your dreams, find patterns, or summarize insights.")
+    # Relevant dreams are picked by similarity, so the assistant waits for the embeddings
+    if not job_ready(emb_job, "Building semantic embeddings"):
+        return
+
+    # User input
+    user_input = st.text_area(
+        "Ask something about your dreams:",
+        placeholder="e.g., What does it mean that I keep dreaming about water?"
+    )
+
+    # How many relevant dreams (at most) to include in context
+    context_depth = st.slider("Maximum number of relevant dreams to include in analysis:", 3, 20, 5)
+
+    # Initialize assistant history in session state
+    if "assistant_history" not in st.session_state:
+        st.session_state["assistant_history"] = []
+
+    # Create the Ask Assistant button (enabled only when input exists)
+    ask_button = st.button("Ask Assistant", disabled=not bool(user_input.strip()))
+
+    if ask_button:
+        try:
+            if "text" not in df.columns:
+                st.error("❌ The uploaded CSV must have a 'text' column.")
+            else:
+                # Most relevant dreams for this question, packed into a token budget
+                context, _ = select_context(user_input, df, embeddings, token_budget=600,
+                                            max_entries=context_depth, model=get_embedding_model())
+                # Stream tokens to the page as they arrive
+                st.markdown(f"**You:** {user_input}")
+                response = st.write_stream(assistant.stream_ai_response(user_input, context))
+                st.session_state["assistant_history"].append((user_input, response))
+                st.success("✅ Response generated successfully!")
+        except Exception as e:
+            st.error(f"⚠️ AI Assistant failed: {e}")
+
+    # Display the chat history
+    if st.session_state["assistant_history"]:
+        st.subheader("Conversation History")
+        for q, a in st.session_state["assistant_history"]:
+            st.markdown(f"**You:** {q}")
+            st.markdown(f"**AI Assistant:** {a}")
+            st.markdown("---")
 
 
 # --- Main Analysis Pipeline ---
-def run_analysis(df: pd.DataFrame):
+def run_analysis(df: pd.DataFrame, store=None, snapshot=None):
     df["date"] = ensure_datetime(df["date"])
     df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
+    n_total = len(df)
+    dataset_key = str(pd.util.hash_pandas_object(df[["date", "text"]], index=False).sum())
+    kw_index = get_keyword_index(dataset_key, df)
+    # Columnar journal scored with sentiment up front: filters below are views over it
+    if snapshot is not None and snapshot["manifest"]["n"] != n_total:
+        snapshot = None
+    source = ("store" if store is not None else "snapshot" if snapshot is not None
+              else "service" if os.getenv("DREAM_NLP_SERVICE_URL") else "local")
+    corpus = get_scored_corpus(dataset_key, source, df, snapshot)
+
+    # Heavy whole-journal stages start in the background straight away
+    runner = get_job_runner()
+    runner.prune(dataset_key)
+    if snapshot is not None:
+        # The sample's full-view stages come precomputed (see src/snapshot.py)
+        seed_jobs(runner, snapshot, dataset_key, view_key(dataset_key, corpus))
+    texts = corpus.texts.tolist()
+    emb_job = runner.submit(f"embeddings:{dataset_key}", embed_job, texts)
+    if store is not None:
+        emo_job, emotion_cols = None, store.emotion_labels()
+    else:
+        emo_job = runner.submit(f"emotions:{dataset_key}", score_emotions_job, texts)
+        if emo_job.state == "done":
+            emotion_cols, emotion_matrix = emo_job.result()
+            emotion_tier = "model"
+        else:
+            # Lexicon estimates stand in until the model has scored every entry;
+            # the rerun after its job finishes swaps in the model's columns
+            emotion_cols, emotion_matrix = get_fast_emotions(dataset_key, texts)
+            emotion_tier = "lexicon"
+        # The scored corpus is shared by every session, and sessions can be at
+        # different tiers: the emotion columns go on this session's copy only
+        corpus = corpus.with_columns({label: emotion_matrix[:, j] for j, label in enumerate(emotion_cols)})
+    full_embeddings = job_result(emb_job, None)
+    st.session_state["jobs_shown"] = {j.name for j in runner.jobs() if j.done()}
 
     # --- Search / Filter Dreams ---
     st.subheader("🔎 Search Dreams")
     search_term = st.text_input("Enter a keyword to filter dreams (leave empty to see all):").strip()
 
     if search_term:
-        filtered = df[df["text"].str.contains(search_term, case=False, na=False)]
-        if filtered.empty:
+        filtered = corpus.contains(search_term)
+        if not len(filtered):
             st.warning(f"No dreams found with keyword: '{search_term}'")
             return
         else:
             st.info(f"Showing {len(filtered)} dreams containing '{search_term}'.")
-            df = filtered
+            corpus = filtered
+            df = corpus.to_frame([])
 
     # --- Date Range Filter ---
     st.subheader("📅 Date Range Filter")
@@ -75,10 +515,46 @@ def run_analysis(df: pd.DataFrame):
         st.error("Start date must be before end date.")
         return
 
-    df = df[(df["date"].dt.date >= start_date) & (df["date"].dt.date <= end_date)]
+    corpus = corpus.between(start_date, end_date)
+    df = corpus.to_frame([])
     if df.empty:
         st.warning(f"No dreams found between {start_date} and {end_date}.")
         return
+    key = view_key(dataset_key, corpus)
+    # Emotion-derived results are cached per scoring tier so they upgrade with it
+    score_key = key if emo_job is None else f"{key}:{emotion_tier}"
+    positions = corpus.positions()
+    embeddings = full_embeddings[positions] if full_embeddings is not None else None
+
+    # Journal-store aggregates cover the whole journal, so only use them unfiltered
+    use_aggregates = store is not None and len(df) == n_total
+
+    # --- Scores of the filtered view ---
+    df_sent = corpus.to_frame(["sentiment"])
+    emo_df = corpus.to_frame(emotion_cols)
+
+    # Day / week / month rollups of every score; charts, forecast, insights
+    # and the summary read from these instead of re-aggregating rows
+    scores = corpus.to_frame(["sentiment"] + emotion_cols)
+    rollups = get_rollups(score_key, scores, ["sentiment"] + emotion_cols)
+
+    if use_aggregates:
+        daily = store.daily()
+        avg = store.avg_emotions()
+    else:
+        daily = rollups.daily()
+        avg = (rollups.means(emotion_cols).sort_values(ascending=False)
+               .rename_axis("emotion").reset_index(name="average_score"))
+
+    # Everything below the cheap sections: started now, shown as each finishes
+    topics_job = runner.submit(f"topics:{key}", topic_model, df_sent, n_topics=4, n_top_words=8)
+    forecast_job = submit_forecast(runner, key, daily)
+    cluster_job = submit_clusters(runner, key, emb_job, positions, df, st.session_state.get("n_clusters", 6),
+                                  kw_index)
+
+    if runner.pending():
+        background_progress(runner)
+    retry_failed_jobs(runner)
 
     # --- Summary Metrics ---
     st.subheader("📊 Dream Journal Summary")
@@ -88,7 +564,11 @@ def run_analysis(df: pd.DataFrame):
     with col2:
         st.metric("Date Range", f"{df['date'].min().date()} → {df['date'].max().date()}")
     with col3:
-        st.metric("Most Frequent Word", df["text"].str.split().explode().value_counts().index[0])
+        if search_term:
+            top_word = get_top_keywords(key, df)["token"].head(1).tolist()
+            st.metric("Most Frequent Word", top_word[0] if top_word else "—")
+        else:
+            st.metric("Most Frequent Word", kw_index.most_frequent_word(start_date, end_date) or "—")
 
     st.divider()
 
@@ -97,26 +577,25 @@ def run_analysis(df: pd.DataFrame):
     st.dataframe(df.head(10), use_container_width=True)
 
     # --- Sentiment & Emotions ---
-    df_sent = compute_sentiment(df)
-    daily = df_sent.groupby("date", as_index=False)["sentiment"].mean()
-
-    emo_df = analyze_emotions(df)
-    avg = emo_df.drop(columns=["date", "text"]).mean().sort_values(ascending=False).reset_index()
-    avg.columns = ["emotion", "average_score"]
-
     col1, col2 = st.columns(2)
     with col1:
-        st.markdown("**Daily Sentiment Trend**")
-        st.line_chart(daily.set_index("date"))
+        sentiment_trend_section(rollups)
     with col2:
         st.markdown("**Average Emotion Scores**")
+        emotions_note(emo_job)
         st.bar_chart(avg.set_index("emotion"))
 
     st.divider()
 
     # --- Keywords ---
     st.subheader("💡 Top Keywords")
-    kw_df = top_keywords(df_sent, n=30)
+    if use_aggregates:
+        kw_df = store.top_keywords(30)
+    elif not search_term:
+        # Date-range counts straight from the prefix-summed keyword index
+        kw_df = kw_index.top_keywords(30, start_date, end_date)
+    else:
+        kw_df = get_top_keywords(key, df)
     st.dataframe(kw_df, use_container_width=True)
     if len(kw_df):
         freq = {row.token: int(row["count"]) for _, row in kw_df.iterrows()}
@@ -126,20 +605,23 @@ def run_analysis(df: pd.DataFrame):
 
     # --- Topics ---
     st.subheader("📂 Topics")
-    topics = topic_model(df_sent, n_topics=4, n_top_words=8)
-    if topics:
-        for t in topics:
-            st.write(f"**Topic {t['topic']}**: {', '.join(t['keywords'])}")
-    else:
-        st.info("Not enough data for topics. Add more entries.")
+    topics = job_result(topics_job, [])
+    if job_ready(topics_job, "Finding topics"):
+        if topics:
+            for t in topics:
+                st.write(f"**Topic {t['topic']}**: {', '.join(t['keywords'])}")
+        else:
+            st.info("Not enough data for topics. Add more entries.")
 
     st.divider()
 
     # --- 🔮 Dream Symbol Analysis ---
     st.subheader("🔮 Dream Symbol Analysis")
     try:
-        lexicon = load_symbol_lexicon()
-        per_entry_counts, symbol_totals = symbol_summary_for_df(df, lexicon)
+        if use_aggregates:
+            symbol_totals = store.symbol_totals()
+        else:
+            symbol_totals = get_symbol_totals(key, df)
     except Exception as e:
         st.error(f"Error loading dream symbols: {e}")
         symbol_totals = pd.DataFrame()
@@ -149,177 +631,80 @@ def run_analysis(df: pd.DataFrame):
     else:
         st.info("No dream symbols detected in your entries.")
 
-    st.divider()
-
-    # --- 🧠 Semantic Search ---
-    st.subheader("🧠 Semantic Search (Meaning-based)")
-    model = get_model()
-
-    if "embeddings" not in st.session_state or st.session_state.get("embeddings_len") != len(df):
-        with st.spinner("Building semantic embeddings..."):
-            embeddings = build_embeddings_index(df, model=model)
-            st.session_state["embeddings"] = embeddings
-            st.session_state["embeddings_len"] = len(df)
-    else:
-        embeddings = st.session_state["embeddings"]
+    # Co-occurrence, trends and per-symbol scores from the sparse symbol matrix
+    symbol_stats = None
+    try:
+        symbol_stats = get_symbol_stats(score_key, scores, ["sentiment"] + emotion_cols)
+    except Exception as e:
+        st.warning(f"Symbol analytics unavailable: {e}")
 
-    query = st.text_input("Enter a phrase to search semantically (e.g., 'fear', 'ocean', 'falling'):")
-    if query:
-        results = semantic_search(query, df, embeddings, top_k=8, model=model)
-        st.write(f"Top semantic matches for **'{query}'**:")
-        st.dataframe(results[["date", "text", "score"]], use_container_width=True)
+    if symbol_stats is not None and not symbol_totals.empty:
+        with st.expander("Symbol co-occurrence, trends and moods"):
+            st.markdown("**Entries where symbols appear together**")
+            st.dataframe(symbol_stats["cooccurrence"], use_container_width=True)
+            st.markdown("**Weekly symbol frequency (4-week rolling mean)**")
+            st.line_chart(symbol_stats["weekly_rolling"])
+            st.markdown("**Average sentiment and emotions per symbol**")
+            st.dataframe(symbol_stats["scores"], use_container_width=True)
 
     st.divider()
 
-    # --- 🌌 Thematic Clustering ---
-    st.subheader("🌌 Thematic Clustering of Dreams")
-    n_clusters = st.slider("Number of clusters (KMeans)", 2, 12, 6)
-    labels, km = cluster_with_kmeans(embeddings, n_clusters=n_clusters)
-    cluster_summary = label_clusters_by_top_terms(df, labels)
-
-    if not cluster_summary.empty:
-        st.dataframe(cluster_summary[["cluster", "size"]], use_container_width=True)
-        selected_cluster = st.selectbox("Select cluster to view example dreams:",
-                                        options=cluster_summary["cluster"].tolist())
-        if selected_cluster is not None:
-            examples = cluster_summary.loc[cluster_summary["cluster"] == selected_cluster, "samples"].explode().tolist()
-            st.write("**Sample dreams in this cluster:**")
-            for e in examples[:8]:
-                st.markdown(f"- {e}")
-    else:
-        st.info("Not enough data to form meaningful clusters.")
-
+    semantic_search_section(df, emb_job, embeddings)
     st.divider()
-
-    # --- 📊 Interactive Visual Analytics ---
-    st.subheader("📊 Interactive Visual Analytics")
-    tabs = st.tabs(["Emotion Trends", "Dream Frequency", "Keyword–Emotion Network", "Cluster Map"])
-
-    with tabs[0]:
-        st.plotly_chart(plot_emotion_trends(emo_df), use_container_width=True)
-    with tabs[1]:
-        buf = plot_dream_frequency(df)
-        st.image(buf, use_container_width=True)
-    with tabs[2]:
-        html_path = plot_keyword_emotion_network(kw_df, emo_df)
-        st.components.v1.html(open(html_path).read(), height=520, scrolling=True)
-    with tabs[3]:
-        st.plotly_chart(plot_cluster_projection(df, embeddings, labels), use_container_width=True)
-
+    recurring_dreams_section(key, df, emb_job, embeddings)
     st.divider()
-
-    # --- 🔮 Emotional Forecasting ---
-    from src.forecast import forecast_emotions
-
-    st.subheader("🔮 Emotional Forecasting")
-    try:
-        buf, summary = forecast_emotions(daily)
-        st.image(buf, use_container_width=True)
-        st.success(summary)
-    except Exception as e:
-        st.error(f"Forecasting failed: {e}")
-
+    clustering_section(runner, key, df, emb_job, positions, kw_index)
     st.divider()
-
-    # --- 🎯 Emotional Triggers ---
-    from src.triggers import detect_emotion_triggers
-
-    st.subheader("🎯 Emotional Triggers in Dreams")
-
-    try:
-        triggers = detect_emotion_triggers(df_sent, emo_df)
-        st.dataframe(triggers, use_container_width=True)
-        st.markdown("**Interpretation:** Words with higher positive coefficients "
-                    "are linked to happier dreams, while negative ones indicate stressors or anxieties.")
-    except Exception as e:
-        st.error(f"Trigger detection failed: {e}")
-
+    visual_analytics_section(runner, key, score_key, df, emo_job, emb_job, embeddings, positions, kw_index,
+                             rollups, emotion_cols, kw_df, emo_df)
+    st.divider()
+    forecast_section(forecast_job)
+    st.divider()
+    triggers_section(score_key, df_sent, emo_df)
     st.divider()
 
     # --- 🧘 Automated Insight Generation ---
     from src.insights import generate_insights
 
     st.subheader("🧘 Automated Insights & Recommendations")
+    waiting = [j for j in (emo_job, topics_job, cluster_job) if j is not None and not j.done()]
+    if waiting:
+        st.info("Insights, the narrative summary and the PDF report appear once emotions, "
+                "topics and clusters are ready.")
+    else:
+        cluster_summary = job_result(cluster_job, (None, pd.DataFrame()))[1]
+        anomalies = get_anomalies(score_key, scores, ["sentiment"] + emotion_cols)
+        try:
+            insights = generate_insights(
+                df=df_sent,
+                daily=daily,
+                avg_emotions=avg,
+                keywords=kw_df,
+                topics=topics,
+                symbol_summary=symbol_totals,
+                cluster_summary=cluster_summary,
+                anomalies=anomalies
+            )
+            for ins in insights:
+                st.markdown(f"- {ins}")
+        except Exception as e:
+            st.error(f"⚠️ Insight generation failed: {e}")
+            st.write("DEBUG: Symbol Summary Columns ->", list(symbol_totals.columns))
+            st.dataframe(symbol_totals.head())
 
-    try:
-        insights = generate_insights(
-            df=df_sent,
-            daily=daily,
-            avg_emotions=avg,
-            keywords=kw_df,
-            topics=topics,
-            symbol_summary=symbol_totals,
-            cluster_summary=cluster_summary
-        )
-        for ins in insights:
-            st.markdown(f"- {ins}")
-    except Exception as e:
-        st.error(f"⚠️ Insight generation failed: {e}")
-        st.write("DEBUG: Symbol Summary Columns ->", list(symbol_totals.columns))
-        st.dataframe(symbol_totals.head())
-
-
-
-    # --- 📝 Narrative Summary ---
-    st.subheader("📝 Narrative Summary")
-    summary_text = generate_summary(daily, avg, kw_df, topics)
-    st.markdown(summary_text)
-
-    # --- 📄 PDF Export ---
-    st.subheader("📄 Export Report")
-    if st.button("Generate PDF Report"):
-        pdf_buffer = build_pdf(df_sent, daily, avg, kw_df, topics, symbol_totals, cluster_summary)
-        st.download_button(
-            label="⬇️ Download PDF",
-            data=pdf_buffer,
-            file_name="dream_journal_report.pdf",
-            mime="application/pdf",
-        )
-
-        # --- 💬 Dream AI Assistant ---
-    import src.ai_assistant as assistant  # ✅ make sure this file exists in src/
-
-    st.markdown("---")
-    st.header("💬 Dream AI Assistant")
-    st.caption("Ask the AI to interpret your dreams, find patterns, or summarize insights.")
-
-    # User input
-    user_input = st.text_area(
-        "Ask something about your dreams:",
-        placeholder="e.g., What does it mean that I keep dreaming about water?"
-    )
 
-    # How many recent dreams to include in context
-    context_depth = st.slider("Number of recent dreams to include in analysis:", 3, 20, 5)
 
-    # Initialize assistant history in session state
-    if "assistant_history" not in st.session_state:
-        st.session_state["assistant_history"] = []
+        # --- 📝 Narrative Summary ---
+        st.subheader("📝 Narrative Summary")
+        summary_text = generate_summary(daily, avg, kw_df, topics)
+        st.markdown(summary_text)
 
-    # Create the Ask Assistant button (enabled only when input exists)
-    ask_button = st.button("Ask Assistant", disabled=not bool(user_input.strip()))
+        # --- 📄 PDF Export ---
+        pdf_export_section(runner, key, df, emb_job, positions, kw_index, df_sent, daily, avg, kw_df, topics,
+                           symbol_totals, symbol_stats, anomalies)
 
-    if ask_button:
-        with st.spinner("✨ The AI is analyzing your dreams..."):
-            try:
-                # Use the most recent N dreams as context
-                if "text" not in df.columns:
-                    st.error("❌ The uploaded CSV must have a 'text' column.")
-                else:
-                    context = "\n\n".join(df["text"].astype(str).tail(context_depth).tolist())
-                    response = assistant.get_ai_response(user_input, context)
-                    st.session_state["assistant_history"].append((user_input, response))
-                    st.success("✅ Response generated successfully!")
-            except Exception as e:
-                st.error(f"⚠️ AI Assistant failed: {e}")
-
-    # Display the chat history
-    if st.session_state["assistant_history"]:
-        st.subheader("Conversation History")
-        for q, a in st.session_state["assistant_history"]:
-            st.markdown(f"**You:** {q}")
-            st.markdown(f"**AI Assistant:** {a}")
-            st.markdown("---")
+    # --- 💬 Dream AI Assistant ---
+    assistant_section(df, emb_job, embeddings)
 
 
 
@@ -328,20 +713,51 @@ import reportlab
 st.write()
 
 # --- Main Logic ---
-uploaded = st.file_uploader("Upload dream journal CSV", type=["csv"])
+uploaded = st.file_uploader("Upload dream journal", type=["csv", "tsv", "jsonl", "json", "md", "txt"])
+
+# Optional persistent journal (see src/store.py): uploads are appended once and
+# the dashboards read its incrementally maintained aggregates.
+store = None
+if os.getenv("DREAM_JOURNAL_DB"):
+    from src.store import JournalStore
+
+    @st.cache_resource
+    def get_journal_store(path):
+        return JournalStore(path)
+
+    store = get_journal_store(os.getenv("DREAM_JOURNAL_DB"))
 
 if uploaded:
-    df = pd.read_csv(uploaded)
-    if not {"date", "text"}.issubset(df.columns):
-        st.error("CSV must contain columns: date, text")
+    try:
+        df, rejected = load_journal(uploaded)
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    if len(rejected):
+        with st.expander(f"⚠️ Skipped {len(rejected)} rows that could not be read"):
+            st.dataframe(rejected, use_container_width=True)
+    if df.empty:
+        st.error("No dated dream entries found in the upload.")
         st.stop()
-    run_analysis(df)
+    df, merged = remove_duplicates(df)
+    if len(merged):
+        with st.expander(f"🧹 Merged {len(merged)} duplicate entries"):
+            st.dataframe(merged, use_container_width=True)
+    if store is not None:
+        added = store.add_entries(df)
+        if added:
+            st.success(f"Added {added} new dreams to your journal.")
+        run_analysis(store.entries(), store=store)
+    else:
+        run_analysis(df)
+elif store is not None and len(store):
+    run_analysis(store.entries(), store=store)
 else:
-    sample_path = os.path.join("data", "sample_dreams.csv")
+    sample_path = os.getenv("DREAM_NLP_SAMPLE_PATH", os.path.join("data", "sample_dreams.csv"))
     if os.path.exists(sample_path):
         st.info("No file uploaded. Using sample dataset for demo.")
-        df = pd.read_csv(sample_path)
-        run_analysis(df)
+        df, _ = load_journal(sample_path)
+        run_analysis(df, snapshot=get_sample_snapshot(sample_path, os.path.getmtime(sample_path)))
     else:
         st.warning("No CSV uploaded and no sample dataset found. Please upload a file.")
 
@@ -1,18 +1,88 @@
-from openai import OpenAI
-import os
+import hashlib
+from collections import OrderedDict
+
+from . import llm_client
+from .llm_client import MissingAPIKey
+
+MODEL = llm_client.DEFAULT_MODEL
+SYSTEM_PROMPT = "You are a helpful dream interpretation assistant. Respond thoughtfully and insightfully."
+MISSING_KEY_MESSAGE = "⚠️ Missing OpenAI API key. Please set it in your environment or Streamlit secrets."
+
+# Answers keyed by a hash of (model, question, context); an unchanged journal
+# and the same question return instantly without another API call.
+_RESPONSE_CACHE = OrderedDict()
+_CACHE_SIZE = 256
+
+def cache_key(prompt: str, context: str = "") -> str:
+    payload = "\0".join([MODEL, " ".join(prompt.lower().split()), context])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def clear_cache():
+    _RESPONSE_CACHE.clear()
+
+def _remember(key, answer):
+    _RESPONSE_CACHE[key] = answer
+    if len(_RESPONSE_CACHE) > _CACHE_SIZE:
+        _RESPONSE_CACHE.popitem(last=False)
+
+def _messages(prompt, context):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Dream context:\n{context}\n\nUser question:\n{prompt}"}
+    ]
 
 def get_ai_response(prompt: str, context: str = ""):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return "⚠️ Missing OpenAI API key. Please set it in your environment or Streamlit secrets."
-
-    client = OpenAI(api_key=api_key)
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a helpful dream interpretation assistant. Respond thoughtfully and insightfully."},
-            {"role": "user", "content": f"Dream context:\n{context}\n\nUser question:\n{prompt}"}
-        ]
-    )
-    return response.choices[0].message.content.strip()
+    key = cache_key(prompt, context)
+    if key in _RESPONSE_CACHE:
+        _RESPONSE_CACHE.move_to_end(key)
+        return _RESPONSE_CACHE[key]
+    try:
+        answer = llm_client.chat(_messages(prompt, context), model=MODEL)
+    except MissingAPIKey:
+        return MISSING_KEY_MESSAGE
+    _remember(key, answer)
+    return answer
+
+def stream_ai_response(prompt: str, context: str = ""):
+    """Like get_ai_response, but yields the answer as it is generated."""
+    key = cache_key(prompt, context)
+    if key in _RESPONSE_CACHE:
+        yield _RESPONSE_CACHE[key]
+        return
+    try:
+        chunks = []
+        for chunk in llm_client.stream_chat(_messages(prompt, context), model=MODEL):
+            chunks.append(chunk)
+            yield chunk
+    except MissingAPIKey:
+        yield MISSING_KEY_MESSAGE
+        return
+    _remember(key, "".join(chunks).strip())
+
+def get_ai_responses(requests, concurrency=8):
+    """
+    Batch interpretation: answer many (prompt, context) pairs concurrently.
+    Cached answers are reused; failures come back as error strings.
+    """
+    requests = list(requests)
+    answers = [None] * len(requests)
+    pending = []
+    for i, (prompt, context) in enumerate(requests):
+        key = cache_key(prompt, context)
+        if key in _RESPONSE_CACHE:
+            answers[i] = _RESPONSE_CACHE[key]
+        else:
+            pending.append((i, key, _messages(prompt, context)))
+    if not pending:
+        return answers
+    try:
+        results = llm_client.chat_many([m for _, _, m in pending], model=MODEL, concurrency=concurrency)
+    except MissingAPIKey:
+        return [a if a is not None else MISSING_KEY_MESSAGE for a in answers]
+    for (i, key, _), result in zip(pending, results):
+        if isinstance(result, Exception):
+            answers[i] = f"⚠️ AI Assistant failed: {result}"
+        else:
+            answers[i] = result
+            _remember(key, result)
+    return answers
@@ -1,12 +1,15 @@
 import argparse
 import os
 import json
+import numpy as np
 import pandas as pd
 from collections import Counter
-from nltk.sentiment import SentimentIntensityAnalyzer
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
 from .preprocess import preprocess_text, clean_text
+from .rollups import Rollups
+from .ingest import add_input_args, load_journal_cli
+from .vader_fast import compound_scores
 
 def ensure_datetime(s: pd.Series) -> pd.Series:
     return pd.to_datetime(s, errors="coerce")
@@ -20,10 +23,14 @@ nltk.download('punkt', quiet=True)
 nltk.download('wordnet', quiet=True)
 
 
+def sentiment_scores(texts) -> np.ndarray:
+    # Batched VADER (same compound scores as SentimentIntensityAnalyzer, see src/vader_fast.py)
+    return compound_scores([str(t) for t in texts])
+
 def compute_sentiment(df: pd.DataFrame) -> pd.DataFrame:
-    sia = SentimentIntensityAnalyzer()
-    df = df.copy()
-    df["sentiment"] = df["text"].apply(lambda t: sia.polarity_scores(str(t))["compound"])
+    # Shallow copy: the new column is added without duplicating the caller's data
+    df = df.copy(deep=False)
+    df["sentiment"] = sentiment_scores(df["text"])
     return df
 
 def top_keywords(df: pd.DataFrame, n: int = 30) -> pd.DataFrame:
@@ -56,18 +63,27 @@ def save_csv(df: pd.DataFrame, path: str):
 
 def main():
     parser = argparse.ArgumentParser(description="Dream Journal NLP baseline analysis")
-    parser.add_argument("--input", required=True, help="Path to CSV with columns: date,text")
+    add_input_args(parser, dedup=True)
     parser.add_argument("--outdir", default="reports", help="Output directory")
     parser.add_argument("--topics", type=int, default=4, help="Number of LDA topics")
+    parser.add_argument("--watch", action="store_true",
+                    help="Keep the reports current as the input grows (see src/watch.py)")
+    # None tells an explicit --dedup-threshold apart from the default
+    parser.set_defaults(dedup_threshold=None)
     args = parser.parse_args()
 
-    os.makedirs(args.outdir, exist_ok=True)
-    dreams = pd.read_csv(args.input)
-    if "date" not in dreams.columns or "text" not in dreams.columns:
-        raise ValueError("Input CSV must have columns: date,text")
+    if args.watch:
+        if args.dedup_threshold is not None:
+            parser.error("--dedup-threshold does not apply to --watch "
+                         "(the journal store only skips exact repeats)")
+        from .watch import watch_journal
+        watch_journal(args.input, args.outdir, n_topics=args.topics)
+        return
+    if args.dedup_threshold is None:
+        args.dedup_threshold = 0.9
 
-    dreams["date"] = ensure_datetime(dreams["date"])
-    dreams = dreams.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
+    os.makedirs(args.outdir, exist_ok=True)
+    dreams = load_journal_cli(args)
 
     # Sentiment
     dreams = compute_sentiment(dreams)
@@ -84,7 +100,7 @@ def main():
         json.dump(topics, f, ensure_ascii=False, indent=2)
 
     # Daily aggregation
-    daily = dreams.groupby("date", as_index=False)["sentiment"].mean()
+    daily = Rollups.from_frame(dreams, ["sentiment"]).daily()
     save_csv(daily, os.path.join(args.outdir, "daily_sentiment.csv"))
 
     print("Analysis complete.")
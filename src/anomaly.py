@@ -0,0 +1,243 @@
+# src/anomaly.py
+"""Streaming detection of nightmare spikes and mood shifts.
+
+Every watched signal (negative sentiment, a lift in sentiment, fear /
+sadness / anger scores) keeps an exponentially weighted mean and variance
+of its per-entry values. Each new entry is scored as a z-value against the
+baseline *before* it and fed to a one-sided CUSUM, S = max(0, S + z - k).
+A run of entries with S > 0 whose peak passes h is a flagged episode, from
+the entry where S last rose above h / 2 to the entry where it peaked (S only
+decays after that), so mildly high entries before a sudden jump are not part
+of it. One or two entries make a spike, longer runs a shift.
+
+The state per signal is a handful of floats, so appending an entry is O(1)
+and never revisits history. A batch of entries is processed with
+vectorized filters: the EWMA / EWMV recurrences are linear (lfilter) and the
+CUSUM has the closed form S_t = C_t - min(0, min_{j<=t} C_j) over the
+running sum C, so a decade of entries takes milliseconds. Entries are
+expected in date order.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# (score column, direction): +1 flags unusually high values, -1 unusually low ones
+DEFAULT_SIGNALS = [("sentiment", -1), ("sentiment", 1), ("fear", 1), ("sadness", 1), ("anger", 1)]
+SIGNAL_NAMES = {
+    ("sentiment", -1): "negative dreams",
+    ("sentiment", 1): "unusually positive dreams",
+    ("fear", 1): "fear-heavy dreams",
+    ("sadness", 1): "sad dreams",
+    ("anger", 1): "angry dreams",
+}
+EPISODE_COLUMNS = ["signal", "direction", "kind", "start", "end", "entries", "peak", "mean", "baseline",
+                   "ongoing"]
+
+
+def _new_state():
+    return {"n": 0, "mean": 0.0, "var": 0.0, "cusum": 0.0, "run": None}
+
+
+class AnomalyDetector:
+    def __init__(self, signals=None, half_life=30, k=0.5, h=5.0, warmup=30, min_std=0.05):
+        self.signals = [tuple(s) for s in (signals or DEFAULT_SIGNALS)]
+        self.half_life = half_life
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.k, self.h = k, h
+        self.warmup = warmup
+        self.min_std = min_std
+        self.state = {f"{c}:{d}": _new_state() for c, d in self.signals}
+        self.closed = []  # flagged episodes that have ended
+
+    @classmethod
+    def from_frame(cls, df, date_col="date", **kwargs):
+        return cls(**kwargs).append(df, date_col=date_col)
+
+    def append(self, df, date_col="date"):
+        """Fold new entries (date + score columns) into every watched signal."""
+        df = df.dropna(subset=[date_col])
+        dates = pd.to_datetime(df[date_col]).to_numpy()
+        for column, direction in self.signals:
+            if column not in df.columns:
+                continue
+            values = df[column].to_numpy(dtype=np.float64)
+            ok = ~np.isnan(values)
+            if ok.any():
+                self._update(f"{column}:{direction}", column, direction, values[ok], dates[ok])
+        return self
+
+    def _update(self, key, column, direction, x, dates):
+        st, a = self.state[key], self.alpha
+        if st["n"] == 0:
+            st["mean"], st["var"] = float(x[0]), 0.0
+
+        # EWMA / EWMV: baselines before each entry are the previous outputs
+        mean = lfilter([a], [1, -(1 - a)], x, zi=[(1 - a) * st["mean"]])[0]
+        mean_prev = np.r_[st["mean"], mean[:-1]]
+        dev = x - mean_prev
+        var = lfilter([(1 - a) * a], [1, -(1 - a)], dev ** 2, zi=[(1 - a) * st["var"]])[0]
+        var_prev = np.r_[st["var"], var[:-1]]
+
+        z = direction * dev / np.maximum(np.sqrt(var_prev), self.min_std)
+        z[st["n"] + np.arange(len(x)) < self.warmup] = 0.0  # no alarms while the baseline forms
+        c = st["cusum"] + np.cumsum(z - self.k)
+        s = c - np.minimum(np.minimum.accumulate(c), 0.0)
+        self._collect_runs(st, column, direction, x, dates, s, mean_prev)
+
+        st["n"] += len(x)
+        st["mean"], st["var"], st["cusum"] = float(mean[-1]), float(var[-1]), float(s[-1])
+
+    def _collect_runs(self, st, column, direction, x, dates, s, baseline):
+        """Close or extend the runs of S > 0 in this batch; keep the last one open."""
+        pos = s > 0
+        if st["run"] is not None and not pos[0]:
+            self._close(st, column, direction)
+        continues = st["run"] is not None
+        starts = np.flatnonzero(pos & ~np.r_[continues, pos[:-1]])
+        if continues:
+            starts = np.r_[0, starts]
+        ends = np.flatnonzero(pos & ~np.r_[pos[1:], False])
+        if not len(starts):
+            return
+        # Most runs are short blips below h: only flagged, continued or still open runs are walked
+        peaks = np.maximum.reduceat(s, starts)
+        keep = peaks > self.h
+        keep[0] |= continues
+        keep[-1] |= ends[-1] == len(x) - 1
+
+        def onset(i):
+            return [str(pd.Timestamp(dates[i]).date()), float(baseline[i])]
+
+        for a, b in zip(starts[keep], ends[keep]):
+            seg = slice(a, b + 1)
+            run = st["run"] if (a == 0 and continues) else {"onset": None, "seen": 0, "seen_sum": 0.0,
+                                                             "peak": 0.0}
+            if run["onset"] is None:
+                run["onset"] = onset(a)
+            top = a + int(np.argmax(s[seg]))
+            if s[top] > run["peak"]:
+                # The episode runs from where S last sat below h / 2 up to the CUSUM peak
+                low = a + np.flatnonzero(s[a:top] <= self.h / 2)
+                if len(low):
+                    o, (start, base), seen, seen_sum = low[-1] + 1, onset(low[-1] + 1), 0, 0.0
+                else:
+                    o, (start, base), seen, seen_sum = a, run["onset"], run["seen"], run["seen_sum"]
+                run.update(peak=float(s[top]), start=start, baseline=base,
+                           end=str(pd.Timestamp(dates[top]).date()), entries=int(seen + top + 1 - o),
+                           sum=seen_sum + float(x[o:top + 1].sum()))
+            low = a + np.flatnonzero(s[seg] <= self.h / 2)
+            if not len(low):
+                run["seen"] += int(b + 1 - a)
+                run["seen_sum"] += float(x[seg].sum())
+            elif low[-1] < b:
+                o = low[-1] + 1
+                run.update(onset=onset(o), seen=int(b + 1 - o), seen_sum=float(x[o:b + 1].sum()))
+            else:
+                run.update(onset=None, seen=0, seen_sum=0.0)
+            st["run"] = run
+            if b < len(x) - 1:
+                self._close(st, column, direction)
+
+    def _close(self, st, column, direction):
+        run, st["run"] = st["run"], None
+        if run["peak"] > self.h:
+            self.closed.append(self._episode(column, direction, run, ongoing=False))
+
+    def _episode(self, column, direction, run, ongoing):
+        return {"signal": column, "direction": direction, "kind": "spike" if run["entries"] <= 2 else "shift",
+                "start": run["start"], "end": run["end"], "entries": run["entries"],
+                "peak": round(run["peak"], 2), "mean": round(run["sum"] / run["entries"], 3),
+                "baseline": round(run["baseline"], 3), "ongoing": ongoing}
+
+    def episodes(self) -> pd.DataFrame:
+        """Flagged episodes, including any still in progress (ongoing=True)."""
+        rows = list(self.closed)
+        for column, direction in self.signals:
+            run = self.state[f"{column}:{direction}"]["run"]
+            if run is not None and run["peak"] > self.h:
+                rows.append(self._episode(column, direction, run, ongoing=True))
+        out = pd.DataFrame(rows, columns=EPISODE_COLUMNS)
+        return out.sort_values(["start", "signal"]).reset_index(drop=True)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"params": {"signals": self.signals, "half_life": self.half_life, "k": self.k,
+                                  "h": self.h, "warmup": self.warmup, "min_std": self.min_std},
+                       "state": self.state, "closed": self.closed}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        detector = cls(**data["params"])
+        detector.state.update(data["state"])
+        detector.closed = data["closed"]
+        return detector
+
+
+def detect_anomalies(df, date_col="date", **kwargs) -> pd.DataFrame:
+    """Flagged episodes over a scored journal (sorted by date first).
+
+    A single outlier is a one-entry spike scored by its own value:
+
+    >>> fear = 0.1 * np.sin(np.arange(60))
+    >>> fear[47] = 0.9
+    >>> df = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=60), "fear": fear})
+    >>> detect_anomalies(df)[["kind", "start", "entries", "mean"]].values.tolist()
+    [['spike', '2024-02-17', 1, 0.9]]
+    """
+    return AnomalyDetector.from_frame(df.sort_values(date_col, kind="stable"), date_col=date_col,
+                                      **kwargs).episodes()
+
+
+def describe_episodes(episodes, limit=5):
+    """Insight sentences for the most pronounced episodes, newest first."""
+    lines = []
+    top = episodes.sort_values("peak", ascending=False).head(limit).sort_values("start", ascending=False)
+    for ep in top.itertuples():
+        what = SIGNAL_NAMES.get((ep.signal, ep.direction), f"unusual {ep.signal} scores")
+        scores = f"{ep.signal} {ep.mean:+.2f} vs a usual {ep.baseline:+.2f}"
+        if ep.kind == "spike":
+            when = f"On {ep.start}" if ep.start == ep.end else f"Between {ep.start} and {ep.end}"
+            lines.append(f"⚡ {when}, a sudden spike of {what} ({scores}).")
+        elif ep.ongoing:
+            lines.append(f"🚨 Since {ep.start}, a run of {ep.entries} {what} is still going on ({scores}).")
+        else:
+            lines.append(f"🚨 Between {ep.start} and {ep.end}, a run of {ep.entries} {what} ({scores}).")
+    return lines
+
+
+def main():
+    from .ingest import add_input_args, load_journal_cli
+    ap = argparse.ArgumentParser(description="Flag nightmare spikes and mood shifts in a journal")
+    add_input_args(ap)
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--emotions", action="store_true", help="Also score emotions (loads the emotion model)")
+    ap.add_argument("--half-life", type=float, default=30, help="Baseline half-life in entries")
+    ap.add_argument("--h", type=float, default=5.0, help="CUSUM alarm threshold")
+    args = ap.parse_args()
+
+    from .analyze import sentiment_scores
+    df = load_journal_cli(args)
+    df["sentiment"] = sentiment_scores(df["text"])
+    if args.emotions:
+        from .emotions import emotion_scores
+        labels, scores = emotion_scores(df["text"])
+        for j, label in enumerate(labels):
+            df[label] = scores[:, j]
+
+    episodes = detect_anomalies(df, half_life=args.half_life, h=args.h)
+    os.makedirs(args.outdir, exist_ok=True)
+    out_path = os.path.join(args.outdir, "anomalies.csv")
+    episodes.to_csv(out_path, index=False)
+    for line in describe_episodes(episodes):
+        print(line)
+    print(f"Saved: {out_path} ({len(episodes)} episodes)")
+
+
+if __name__ == "__main__":
+    main()
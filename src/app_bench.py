@@ -0,0 +1,249 @@
+# src/app_bench.py
+"""Interaction latency and memory regression harness for the Streamlit app.
+
+Drives app/streamlit_app.py headlessly with Streamlit's ``AppTest`` over
+synthetic journals of several sizes. Small stand-in models are registered in
+place of the real ones (hashed bag-of-words embeddings, a keyword emotion
+scorer, a canned LLM reply), so the numbers measure the app rather than model
+inference. Every scripted interaction records:
+
+- the rerun latency (what the user waits for before the page updates)
+- the settled latency (until the background jobs it started have finished)
+- the peak Python memory allocated during it (tracemalloc, which also slows
+  every run, so only compare results taken with this harness)
+
+Results go to a JSON file. Passing ``--baseline`` compares them and exits
+non-zero when a metric regresses beyond ``--threshold``.
+
+    python -m src.app_bench --sizes 200 2000 --update-baseline
+    python -m src.app_bench --sizes 200 2000 --baseline reports/app_latency_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "streamlit_app.py")
+EMOTIONS = {
+    "joy": ["happy", "free", "laughing", "flying", "sunlight", "wedding"],
+    "fear": ["chased", "falling", "dark", "monster", "lost", "drowning"],
+    "sadness": ["alone", "crying", "empty", "funeral", "abandoned"],
+    "anger": ["argued", "fight", "shouting", "boss", "broken"],
+    "disgust": ["rotten", "vomit", "slime", "filthy"],
+    "surprise": ["suddenly", "strange", "door", "appeared"],
+    "neutral": ["house", "street", "car", "school", "water"],
+}
+FILLER = ["I", "was", "in", "a", "the", "with", "my", "and", "then", "old", "friend", "ocean", "forest",
+          "teeth", "exam", "train", "snake", "mirror", "city", "mother", "dog", "stairs", "night"]
+# Absolute slack under which a difference is treated as noise
+MIN_LATENCY_DELTA_S = 0.05
+MIN_MEMORY_DELTA_MB = 2.0
+
+
+def synthetic_journal(n, seed=0) -> pd.DataFrame:
+    """n dated entries of 8-40 words mixing emotion cue words and filler."""
+    rng = np.random.default_rng(seed)
+    vocab = FILLER + [w for words in EMOTIONS.values() for w in words]
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(np.sort(rng.integers(0, max(n, 30) * 2, n)), unit="D")
+    texts = [" ".join(rng.choice(vocab, rng.integers(8, 40))) + "." for _ in range(n)]
+    return pd.DataFrame({"date": dates.strftime("%Y-%m-%d"), "text": texts})
+
+
+# --- stand-in models ---
+class HashingEncoder:
+    """Sentence-transformer stand-in: L2-normalized hashed bag of words."""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        vec = HashingVectorizer(n_features=self.dim, alternate_sign=False, norm="l2")
+        return vec.transform([str(t) for t in texts]).toarray().astype(np.float32)
+
+
+class KeywordEmotions:
+    """Text-classification pipeline stand-in: softmax over emotion cue-word counts."""
+
+    def __call__(self, texts, top_k=None, **kwargs):
+        labels = list(EMOTIONS)
+        out = []
+        for text in texts:
+            words = str(text).lower().split()
+            counts = np.array([sum(w.strip(".,") in cues for w in words) for cues in EMOTIONS.values()], float)
+            scores = np.exp(counts) / np.exp(counts).sum()
+            out.append(sorted(({"label": l, "score": float(s)} for l, s in zip(labels, scores)),
+                              key=lambda d: -d["score"]))
+        return out
+
+
+def install_stand_ins():
+    """Register the stand-in models and a canned LLM reply in this process."""
+    from . import llm_client, models
+    models.register_loader("embedding", lambda name: HashingEncoder())
+    models.register_loader("emotion", lambda name: KeywordEmotions())
+    models.get_registry().clear()
+
+    def stream_chat(messages, model=None, **kwargs):
+        for word in "Water in dreams often stands for emotions you are working through.".split():
+            yield word + " "
+
+    llm_client.stream_chat = stream_chat
+    llm_client.chat = lambda messages, model=None, **kwargs: "".join(stream_chat(messages))
+
+
+# --- driving the app ---
+def _settle(at, timeout):
+    """Wait for the session's background jobs, then rerun so every section renders."""
+    runner = at.session_state["job_runner"] if "job_runner" in at.session_state else None
+    deadline = time.perf_counter() + timeout
+    while runner is not None and runner.pending() and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    at.run()
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+
+
+def _measure(at, action, timeout):
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    action()
+    rerun = time.perf_counter() - started
+    # Checked before settling too: the settling rerun can clear an exception the interaction raised
+    _check(at)
+    _settle(at, timeout)
+    settled = time.perf_counter() - started
+    _check(at)
+    return {"rerun_s": rerun, "settled_s": settled, "peak_mb": tracemalloc.get_traced_memory()[1] / 2 ** 20}
+
+
+def _interactions(at, df):
+    dates = pd.to_datetime(df["date"])
+    mid = dates.min() + (dates.max() - dates.min()) / 2
+    return [
+        ("first_run", lambda: at.run()),
+        ("keyword_search", lambda: at.text_input[0].input("water").run()),
+        ("clear_search", lambda: at.text_input[0].input("").run()),
+        ("date_range", lambda: at.date_input[0].set_value((dates.min().date(), mid.date())).run()),
+        ("cluster_slider", lambda: at.slider(key="n_clusters").set_value(4).run()),
+        ("assistant_question", lambda: (at.text_area[0].input("Why do I keep dreaming about water?").run(),
+                                        next(b for b in at.button if b.label == "Ask Assistant").click().run())),
+    ]
+
+
+def run_session(df, timeout=600):
+    """One fresh app session over df: {interaction: metrics}."""
+    from streamlit.testing.v1 import AppTest
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.csv")
+        df.to_csv(path, index=False)
+        os.environ["DREAM_NLP_SAMPLE_PATH"] = path
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        results = {}
+        for name, action in _interactions(at, df):
+            results[name] = _measure(at, action, timeout)
+        return results
+
+
+def _clear_caches():
+    # Every measured session starts cold, as the first visitor after a deploy would
+    import streamlit as st
+    from .render_cache import get_render_cache
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    get_render_cache().clear()
+
+
+def _session(df, timeout):
+    _clear_caches()
+    return run_session(df, timeout)
+
+
+def run_bench(sizes, repeat=3, timeout=600):
+    """Median metrics per journal size and interaction (a warm-up session runs first)."""
+    install_stand_ins()
+    run_session(synthetic_journal(50, seed=1), timeout)  # imports and first-use setup
+    tracemalloc.start()
+    out = {}
+    try:
+        for n in sizes:
+            df = synthetic_journal(n)
+            sessions = [_session(df, timeout) for _ in range(repeat)]
+            out[str(n)] = {name: {metric: round(statistics.median(s[name][metric] for s in sessions), 4)
+                                  for metric in sessions[0][name]}
+                           for name in sessions[0]}
+    finally:
+        tracemalloc.stop()
+    return out
+
+
+def compare(results, baseline, threshold=0.25):
+    """Regressions beyond threshold (relative, plus an absolute noise floor)."""
+    failures = []
+    for size, interactions in results.items():
+        for name, metrics in interactions.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric, value in metrics.items():
+                if metric not in base:
+                    continue
+                floor = MIN_MEMORY_DELTA_MB if metric.endswith("_mb") else MIN_LATENCY_DELTA_S
+                limit = base[metric] * (1 + threshold) + floor
+                if value > limit:
+                    failures.append(f"{size} entries / {name} / {metric}: {value:.3f} > {limit:.3f} "
+                                    f"(baseline {base[metric]:.3f})")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streamlit app interaction latency / memory regression harness")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[200, 2000], help="Synthetic journal sizes")
+    ap.add_argument("--repeat", type=int, default=3, help="Sessions per size (median is kept)")
+    ap.add_argument("--out", default="reports/app_latency.json")
+    ap.add_argument("--baseline", default="reports/app_latency_baseline.json")
+    ap.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression")
+    ap.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    ap.add_argument("--timeout", type=float, default=600, help="Seconds allowed per script run")
+    args = ap.parse_args()
+
+    results = run_bench(args.sizes, repeat=args.repeat, timeout=args.timeout)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Saved: {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        failures = compare(results, json.load(f), args.threshold)
+    if failures:
+        print("Regressions:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
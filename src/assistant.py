@@ -1,9 +1,9 @@
-import openai
-import os
 import pandas as pd
 
-# Make sure your OpenAI API key is set in the environment
-openai.api_key = os.getenv("OPENAI_API_KEY")
+from . import llm_client
+from .retrieval import format_snippet
+
+# The OpenAI API key is read from the environment by src/llm_client.py
 
 SYSTEM_PROMPT = """
 You are an empathetic and insightful Dream Analysis AI.
@@ -21,10 +21,8 @@ def generate_ai_response(prompt, df: pd.DataFrame):
 
     # Summarize recent dreams as grounding context
     context = []
-    for _, row in df.iterrows():
-        date = str(row["date"])[:10]
-        snippet = row["text"][:250].replace("\n", " ")
-        context.append(f"- ({date}) {snippet}...")
+    for date, text in zip(df["date"], df["text"]):
+        context.append(format_snippet(date, text))
     dreams_context = "\n".join(context)
 
     user_prompt = f"""
@@ -36,15 +34,13 @@ User request:
 """
 
     try:
-        completion = openai.ChatCompletion.create(
-            model="gpt-4o-mini",  # Or gpt-4-turbo / gpt-5 if available
-            messages=[
+        return llm_client.chat(
+            [
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
         )
-        return completion.choices[0].message["content"]
 
     except Exception as e:
         return f"Error during AI analysis: {e}"
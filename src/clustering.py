@@ -1,10 +1,13 @@
 # src/clustering.py
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.cluster import KMeans
 # optional: from hdbscan import HDBSCAN
 from sklearn.decomposition import PCA
 
+from .keyword_index import document_term_matrix
+
 def cluster_with_kmeans(embeddings, n_clusters=6, random_state=42):
     km = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
     labels = km.fit_predict(embeddings)
@@ -16,17 +19,87 @@ def cluster_with_kmeans(embeddings, n_clusters=6, random_state=42):
 #     labels = clusterer.fit_predict(embeddings)
 #     return labels, clusterer
 
-def label_clusters_by_top_terms(df, labels, top_n_terms=5):
-    # returns a summary dataframe: cluster -> size -> sample texts
-    df2 = df.reset_index(drop=True).copy()
-    df2["cluster"] = labels
-    summary = []
-    for c in sorted(df2["cluster"].unique()):
-        sub = df2[df2["cluster"]==c]
-        sample_texts = sub["text"].head(5).tolist()
-        summary.append({
-            "cluster": int(c),
-            "size": len(sub),
-            "samples": sample_texts
-        })
-    return pd.DataFrame(summary)
+def _top_per_group(groups, scores, n, group_starts):
+    """Positions of the n best-scoring (lowest) items of each group, best first, in one sort."""
+    order = np.lexsort((scores, groups))
+    rank = np.arange(len(order)) - group_starts[groups[order]]
+    return order[rank < n]
+
+
+def class_tfidf(doc_terms, groups, n_groups):
+    """c-TF-IDF (groups x vocab): tf within each group times log(1 + mean group length / term frequency)."""
+    n = doc_terms.shape[0]
+    member = sp.csr_matrix((np.ones(n, dtype=doc_terms.dtype), (groups, np.arange(n))), shape=(n_groups, n))
+    counts = (member @ doc_terms).tocsr()
+    weights = sp.csr_matrix((counts.data.astype(np.float32), counts.indices, counts.indptr), shape=counts.shape)
+    lengths = np.asarray(weights.sum(axis=1)).ravel()
+    term_freq = np.bincount(weights.indices, weights=weights.data, minlength=weights.shape[1])
+    idf = np.log1p(lengths.mean() / np.maximum(term_freq, 1)).astype(np.float32)
+    # Scale the stored counts in place: tf (row-normalized) times idf (per column)
+    rows = np.repeat(np.arange(n_groups), np.diff(weights.indptr))
+    weights.data *= (1 / np.maximum(lengths, 1)).astype(np.float32)[rows] * idf[weights.indices]
+    return weights
+
+
+def top_terms(weights, vocab, n=5):
+    """The n highest-weighted terms of every row of a sparse weight matrix."""
+    out = []
+    for a, b in zip(weights.indptr[:-1], weights.indptr[1:]):
+        data, cols = weights.data[a:b], weights.indices[a:b]
+        if len(data) > n:
+            part = np.argpartition(-data, n - 1)[:n]
+            data, cols = data[part], cols[part]
+        out.append([vocab[j] for j in cols[np.lexsort((cols, -data))]])
+    return out
+
+
+def centroid_exemplars(embeddings, groups, n_groups, centers=None, n=5, chunk_size=65536):
+    """Row positions of the n entries nearest each group's centroid (its mean if centers is None)."""
+    counts = np.bincount(groups, minlength=n_groups)
+    if centers is None:
+        member = sp.csr_matrix((np.ones(len(groups), dtype=np.float32), (groups, np.arange(len(groups)))),
+                               shape=(n_groups, len(groups)))
+        centers = (member @ embeddings) / np.maximum(counts, 1)[:, None]
+    centers = np.asarray(centers, dtype=np.float32)
+    dist = np.empty(len(groups), dtype=np.float32)
+    for i in range(0, len(groups), chunk_size):
+        diff = embeddings[i:i + chunk_size] - centers[groups[i:i + chunk_size]]
+        dist[i:i + chunk_size] = np.einsum("ij,ij->i", diff, diff)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    best = _top_per_group(groups, dist, n, starts)
+    return np.split(best, np.cumsum(np.minimum(counts, n))[:-1])
+
+
+def label_clusters_by_top_terms(df, labels, top_n_terms=5, embeddings=None, centers=None,
+                                doc_terms=None, vocab=None, n_samples=5, text_col="text"):
+    """
+    Summary frame: cluster, size, label (top terms joined), terms, samples.
+    Terms are each cluster's top c-TF-IDF terms over doc_terms (rows aligned
+    with df; built from df's texts if not given, see keyword_index). Samples
+    are the entries nearest the cluster centroid when embeddings are given,
+    else the first entries of the cluster.
+    """
+    labels = np.asarray(labels)
+    if not len(labels):
+        return pd.DataFrame(columns=["cluster", "size", "label", "terms", "samples"])
+    clusters, groups = np.unique(labels, return_inverse=True)
+    if doc_terms is None:
+        from .preprocess import preprocess_text
+        doc_terms, vocab = document_term_matrix(df[text_col].astype(str).apply(preprocess_text))
+    terms = top_terms(class_tfidf(doc_terms, groups, len(clusters)), vocab, top_n_terms)
+
+    if embeddings is not None:
+        nearest = centroid_exemplars(np.asarray(embeddings, dtype=np.float32), groups, len(clusters),
+                                     centers=centers, n=n_samples)
+    else:
+        order = np.argsort(groups, kind="stable")
+        counts = np.bincount(groups, minlength=len(clusters))
+        nearest = [rows[:n_samples] for rows in np.split(order, np.cumsum(counts)[:-1])]
+    texts = df[text_col].to_numpy()
+    return pd.DataFrame({
+        "cluster": clusters.astype(int),
+        "size": np.bincount(groups, minlength=len(clusters)),
+        "label": [", ".join(t) for t in terms],
+        "terms": terms,
+        "samples": [texts[rows].tolist() for rows in nearest],
+    })
@@ -0,0 +1,176 @@
+# src/corpus.py
+"""Columnar journal container shared by the analysis stages.
+
+A ``DreamCorpus`` holds one aligned column per field: a stable entry id,
+datetime64 dates, Arrow-backed text, and compact float32 / int32 arrays for
+scores, labels and embeddings (2-D columns). Stages attach their results in
+place instead of returning new frames, and filters return views that share
+the same columns: a view only records which rows it covers, and results
+attached through a view land in the shared columns at those rows.
+``with_columns`` adds columns to a copy of the column table instead, for
+results that must not reach other holders of the corpus.
+"""
+import numpy as np
+import pandas as pd
+
+
+class DreamCorpus:
+    def __init__(self, ids, dates, texts, columns=None, rows=None):
+        self._base = {"id": ids, "date": dates, "text": texts}
+        self._base.update(columns or {})
+        self._rows = rows  # None (all rows), a slice, or int64 positions into the columns
+
+    @classmethod
+    def from_frame(cls, df, text_col="text", date_col="date", id_col="id"):
+        """Corpus from a date/text frame; other numeric columns become float32 score columns."""
+        n = len(df)
+        ids = df[id_col].to_numpy(dtype=np.int64) if id_col in df.columns else np.arange(n, dtype=np.int64)
+        dates = pd.to_datetime(df[date_col], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        texts = pd.array(df[text_col].fillna("").astype(str), dtype="string[pyarrow]")
+        columns = {c: df[c].to_numpy(dtype=np.float32) for c in df.columns
+                   if c not in (id_col, date_col, text_col) and pd.api.types.is_numeric_dtype(df[c])}
+        return cls(ids, dates, texts, columns)
+
+    # --- row selection ---
+    def _n_base(self):
+        return len(self._base["id"])
+
+    def positions(self):
+        """Row positions of this view in the shared columns."""
+        if self._rows is None:
+            return np.arange(self._n_base())
+        if isinstance(self._rows, slice):
+            return np.arange(self._n_base())[self._rows]
+        return self._rows
+
+    def __len__(self):
+        if self._rows is None:
+            return self._n_base()
+        if isinstance(self._rows, slice):
+            return len(range(*self._rows.indices(self._n_base())))
+        return len(self._rows)
+
+    def _view(self, rows):
+        view = DreamCorpus.__new__(DreamCorpus)
+        view._base, view._rows = self._base, rows
+        return view
+
+    def where(self, mask):
+        """View of the rows where mask (aligned with this view) is true."""
+        return self._view(self.positions()[np.asarray(mask, dtype=bool)])
+
+    def between(self, start=None, end=None):
+        """View of entries dated within [start, end] (inclusive days)."""
+        dates = self.dates
+        lo = None if start is None else np.datetime64(pd.Timestamp(start).normalize(), "ns")
+        hi = None if end is None else np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1), "ns")
+        if self._rows is None or isinstance(self._rows, slice) and self._rows.step in (None, 1):
+            if not np.isnat(dates).any() and (np.diff(dates.view(np.int64)) >= 0).all():
+                # Date-sorted rows: a contiguous slice, so every column stays a view
+                first = 0 if self._rows is None else self._rows.indices(self._n_base())[0]
+                a = 0 if lo is None else int(np.searchsorted(dates, lo, "left"))
+                b = len(dates) if hi is None else int(np.searchsorted(dates, hi, "left"))
+                return self._view(slice(first + a, first + max(a, b)))
+        mask = np.ones(len(dates), dtype=bool)
+        if lo is not None:
+            mask &= dates >= lo
+        if hi is not None:
+            mask &= dates < hi
+        return self.where(mask)
+
+    def contains(self, term, case=False):
+        """View of entries whose text contains term."""
+        return self.where(self.texts.str.contains(term, case=case, regex=False).to_numpy(dtype=bool, na_value=False))
+
+    # --- columns ---
+    def _take(self, arr):
+        if self._rows is None:
+            return arr
+        return arr[self._rows]
+
+    def column(self, name):
+        return self._take(self._base[name])
+
+    def __contains__(self, name):
+        return name in self._base
+
+    @property
+    def columns(self):
+        return list(self._base)
+
+    @property
+    def ids(self):
+        return self.column("id")
+
+    @property
+    def dates(self):
+        return self.column("date")
+
+    @property
+    def texts(self):
+        return pd.Series(self.column("text"), copy=False)
+
+    def attach(self, name, values):
+        """Store a stage result (aligned with this view) as a shared column."""
+        values = np.asarray(values)
+        dtype = np.int32 if np.issubdtype(values.dtype, np.integer) else np.float32
+        if len(values) != len(self):
+            raise ValueError(f"Column '{name}' has {len(values)} rows, corpus view has {len(self)}")
+        if self._rows is None:
+            self._base[name] = values.astype(dtype, copy=False)
+            return self
+        if name not in self._base:
+            shape = (self._n_base(),) + values.shape[1:]
+            self._base[name] = np.full(shape, -1 if dtype is np.int32 else np.nan, dtype=dtype)
+        self._base[name][self._rows] = values
+        return self
+
+    def with_columns(self, columns):
+        """
+        This view with extra (or replaced) columns, leaving this corpus untouched.
+        The other columns stay shared, so a cached corpus can take
+        per-session results without copying its arrays.
+        """
+        view = self._view(self._rows)
+        view._base = {k: v for k, v in self._base.items() if k not in columns}
+        for name, values in columns.items():
+            view.attach(name, values)
+        return view
+
+    def attach_frame(self, frame):
+        """Attach every column of a frame aligned with this view."""
+        for col in frame.columns:
+            self.attach(col, frame[col].to_numpy())
+        return self
+
+    def to_frame(self, columns=None):
+        """date/text (+ the given 1-D columns) as a frame for the frame-based stages."""
+        columns = [c for c in (columns if columns is not None else self.columns)
+                   if c not in ("id", "date", "text") and self._base[c].ndim == 1]
+        data = {"date": self.dates, "text": self.column("text")}
+        data.update({c: self.column(c) for c in columns})
+        return pd.DataFrame(data, copy=False)
+
+    def nbytes(self):
+        """Memory held by the shared columns."""
+        return int(sum(col.nbytes for col in self._base.values()))
+
+
+# --- stages that attach their results in place ---
+def score_sentiment(corpus):
+    from .analyze import sentiment_scores
+    return corpus.attach("sentiment", sentiment_scores(corpus.texts))
+
+
+def score_emotions(corpus):
+    """Attach one float32 column per emotion label; returns the labels."""
+    from .emotions import emotion_scores
+    labels, scores = emotion_scores(corpus.texts)
+    for j, label in enumerate(labels):
+        corpus.attach(label, scores[:, j])
+    return labels
+
+
+def embed(corpus, model=None):
+    from .semantic import embed_texts
+    return corpus.attach("embedding", embed_texts(corpus.texts.tolist(), model=model))
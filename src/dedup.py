@@ -0,0 +1,164 @@
+# src/dedup.py
+"""Ingest-time detection of exact and near-duplicate journal entries.
+
+Entries are normalized and split into word shingles, summarized as MinHash
+signatures and grouped with LSH banding, so candidate pairs are found in
+roughly linear time instead of comparing every pair. Each candidate is
+verified against its bucket representative by estimated Jaccard similarity,
+and connected entries are merged into the first occurrence.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .preprocess import clean_text
+
+_MASK = np.uint64((1 << 32) - 1)
+
+
+def _choose_bands(num_perm, threshold):
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or err < best[0]:
+            best = (err, bands, rows)
+    return best[1], best[2]
+
+
+def _shingle_ids(texts, shingle_size):
+    """Flat uint64 shingle hashes (unique per text) and per-text offsets into them."""
+    tokens = pd.Series(texts).str.split()
+    tokens = tokens.where(tokens.str.len() > 0, pd.Series([[""]] * len(tokens)))
+    lengths = tokens.str.len().to_numpy()
+    ids = (pd.factorize(np.concatenate(tokens.to_numpy()))[0] + 1).astype(np.uint64)
+    doc = np.repeat(np.arange(len(lengths)), lengths)
+    doc_end = np.repeat(np.cumsum(lengths), lengths)
+    pos = np.arange(len(ids))
+
+    # Shingle starting at each token; texts shorter than the shingle size get one
+    # shingle of all their tokens
+    k = np.minimum(shingle_size, lengths)[doc]
+    valid = doc_end - pos >= k
+    valid &= (pos == doc_end - lengths[doc]) | (k == shingle_size)
+    mult = np.uint64(0x9E3779B97F4A7C15)
+    h = np.zeros(len(ids), dtype=np.uint64)
+    padded = np.concatenate([ids, np.zeros(shingle_size, dtype=np.uint64)])
+    for j in range(shingle_size):
+        step = np.where(j < k, padded[pos + j], np.uint64(0))
+        h = np.where(j < k, h * mult + step, h)  # uint64 wrap-around is the hash
+    h, doc = h[valid], doc[valid]
+
+    order = np.lexsort((h, doc))
+    h, doc = h[order], doc[order]
+    keep = np.r_[True, (np.diff(doc) != 0) | (np.diff(h) != 0)]
+    h, doc = h[keep], doc[keep]
+    offsets = np.r_[0, np.cumsum(np.bincount(doc, minlength=len(lengths)))]
+    return h, offsets
+
+
+def minhash_signatures(texts, num_perm=128, shingle_size=3, seed=42, chunk=20000):
+    """(n_texts x num_perm) uint32 MinHash signatures of word shingles."""
+    shingles, offsets = _shingle_ids(texts, shingle_size)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+    sig = np.empty((len(offsets) - 1, num_perm), dtype=np.uint32)
+    start_doc = 0
+    while start_doc < len(offsets) - 1:
+        # Whole documents per chunk, ~chunk shingles at a time to bound memory
+        end_doc = max(int(np.searchsorted(offsets, offsets[start_doc] + chunk, "right")) - 1, start_doc + 1)
+        end_doc = min(end_doc, len(offsets) - 1)
+        lo, hi = offsets[start_doc], offsets[end_doc]
+        hv = ((shingles[lo:hi, None] * a + b) >> np.uint64(32)) & _MASK
+        sig[start_doc:end_doc] = np.minimum.reduceat(hv, offsets[start_doc:end_doc] - lo, axis=0)
+        start_doc = end_doc
+    return sig
+
+
+def _day_keys(dates):
+    """Calendar day of each entry as int64 (unparseable dates share one key)."""
+    parsed = pd.to_datetime(pd.Series(dates), errors="coerce", format="mixed")
+    days = parsed.dt.normalize().to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), np.iinfo(np.int64).min, days)
+
+
+def deduplicate(df, threshold=0.9, num_perm=128, shingle_size=3, text_col="text", same_day=True, seed=42):
+    """
+    Drop exact and near-duplicate entries (estimated Jaccard >= threshold),
+    keeping the first occurrence. Returns (deduplicated df, report of merged rows);
+    row numbers in the report are positions in the input frame.
+
+    With ``same_day`` (default) only entries dated on the same day are merged:
+    re-imports and double pastes, not a dream that genuinely recurs.
+    """
+    report_cols = ["kept_row", "dropped_row", "kind", "similarity", "kept_date", "dropped_date", "dropped_text"]
+    if df.empty:
+        return df, pd.DataFrame(columns=report_cols)
+    norm = df[text_col].fillna("").astype(str).map(clean_text).tolist()
+    n = len(norm)
+    rows, cols, kinds = [], [], {}
+
+    days = _day_keys(df["date"]) if same_day and "date" in df.columns else np.zeros(n, dtype=np.int64)
+
+    # Exact duplicates of the normalized text (on the same day)
+    codes = pd.DataFrame({"day": days, "text": norm}).groupby(["day", "text"], sort=False).ngroup().to_numpy()
+    first_of = np.full(codes.max() + 1, n)
+    np.minimum.at(first_of, codes, np.arange(n))
+    first = first_of[codes]
+    exact = np.flatnonzero(first != np.arange(n))
+    rows.extend(first[exact]); cols.extend(exact)
+    kinds.update({int(j): "exact" for j in exact})
+
+    # Near duplicates among the remaining unique texts
+    unique_idx = np.flatnonzero(first == np.arange(n))
+    sim = {}
+    if threshold < 1.0 and len(unique_idx) > 1:
+        sig = minhash_signatures([norm[i] for i in unique_idx], num_perm, shingle_size, seed)
+        bands, r = _choose_bands(num_perm, threshold)
+        day_cols = days[unique_idx].view(np.uint32).reshape(-1, 2)
+        for band in range(bands):
+            # Bucket key = band of the signature + the day, so only same-day entries collide
+            block = np.ascontiguousarray(np.hstack([sig[:, band * r:(band + 1) * r], day_cols]))
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * block.shape[1]))).ravel()
+            _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+            members = np.flatnonzero(counts[inverse] > 1)
+            if not len(members):
+                continue
+            # Verify each member against its bucket representative (first member)
+            order = members[np.argsort(inverse[members], kind="stable")]
+            new_bucket = np.r_[True, np.diff(inverse[order]) != 0]
+            reps = order[new_bucket][np.cumsum(new_bucket) - 1]
+            mask = reps != order
+            est = (sig[reps[mask]] == sig[order[mask]]).mean(axis=1)
+            ok = est >= threshold
+            for i, j, s in zip(reps[mask][ok], order[mask][ok], est[ok]):
+                i, j = int(unique_idx[i]), int(unique_idx[j])
+                rows.append(i); cols.append(j)
+                sim[(min(i, j), max(i, j))] = float(s)
+
+    if not rows:
+        return df, pd.DataFrame(columns=report_cols)
+
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    keep_of = pd.Series(np.arange(n)).groupby(labels).transform("min").to_numpy()
+    dropped = np.flatnonzero(keep_of != np.arange(n))
+
+    dates = df["date"].tolist() if "date" in df.columns else [None] * n
+    texts = df[text_col].astype(str).tolist()
+    report = pd.DataFrame({
+        "kept_row": keep_of[dropped],
+        "dropped_row": dropped,
+        "kind": [kinds.get(int(j), "near") for j in dropped],
+        "similarity": [1.0 if int(j) in kinds else sim.get((min(k, j), max(k, j)), threshold)
+                       for k, j in zip(keep_of[dropped], dropped)],
+        "kept_date": [dates[k] for k in keep_of[dropped]],
+        "dropped_date": [dates[j] for j in dropped],
+        "dropped_text": [texts[j][:120] for j in dropped],
+    }, columns=report_cols)
+    return df.iloc[np.flatnonzero(keep_of == np.arange(n))].reset_index(drop=True), report
@@ -0,0 +1,177 @@
+# src/embed_job.py
+"""Parallel, resumable embedding backfill.
+
+Texts are sorted by length (so each batch pads to similar lengths) and split
+into fixed-size chunks that worker processes encode independently. Every
+finished chunk is written to ``<outdir>/chunk_NNNNN.npy`` and recorded in
+``manifest.json``; a restarted job with the same corpus, model and chunk size
+skips the chunks already on disk. ``load_embeddings`` reassembles the chunks
+in the original row order (kept in ``order.npy``).
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+
+import numpy as np
+
+from .models import DEFAULT_EMBEDDING_MODEL, encode
+from .ingest import add_input_args, load_journal_cli
+
+MANIFEST = "manifest.json"
+
+
+def corpus_fingerprint(texts) -> str:
+    h = hashlib.sha1()
+    for t in texts:
+        h.update(t.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _write_atomic(path, write, mode="wb"):
+    tmp = f"{path}.tmp"
+    with open(tmp, mode) as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _save_array(path, arr):
+    _write_atomic(path, lambda f: np.save(f, arr))
+
+
+def _save_manifest(outdir, manifest):
+    _write_atomic(os.path.join(outdir, MANIFEST), lambda f: json.dump(manifest, f), mode="w")
+
+
+def _chunk_path(outdir, i):
+    return os.path.join(outdir, f"chunk_{i:05d}.npy")
+
+
+def _load_manifest(outdir):
+    path = os.path.join(outdir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- worker side: one model per process ---
+_WORKER = {}
+
+
+def _init_worker(name, threads, batch_size):
+    # Split the cores between workers instead of every process using all of them
+    os.environ["DREAM_NLP_ORT_THREADS"] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _WORKER.update(name=name, batch_size=batch_size)
+
+
+def _encode_chunk(i, texts):
+    return i, encode(texts, name=_WORKER["name"], batch_size=_WORKER["batch_size"])
+
+
+def run_embedding_job(texts, outdir, name=DEFAULT_EMBEDDING_MODEL, chunk_size=4096,
+                      workers=None, batch_size=64, progress=print):
+    """
+    Encode texts into outdir, resuming any earlier run over the same corpus.
+    ``workers=0`` encodes in this process (e.g. on a single GPU).
+    Returns the (n x dim) float32 embeddings in the original order.
+    """
+    texts = [str(t) for t in texts]
+    os.makedirs(outdir, exist_ok=True)
+    order = np.argsort(np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts)), kind="stable")
+    n_chunks = -(-len(texts) // chunk_size)
+    job = {"model": name, "n": len(texts), "chunk_size": chunk_size, "corpus": corpus_fingerprint(texts)}
+
+    manifest = _load_manifest(outdir)
+    if manifest is None or {k: manifest.get(k) for k in job} != job:
+        manifest = dict(job, done=[])
+        _save_array(os.path.join(outdir, "order.npy"), order)
+    done = {i for i in manifest["done"] if os.path.exists(_chunk_path(outdir, i))}
+    manifest["done"] = sorted(done)
+    _save_manifest(outdir, manifest)
+
+    todo = [i for i in range(n_chunks) if i not in done]
+    if done and progress:
+        progress(f"Resuming: {len(done)}/{n_chunks} chunks already encoded")
+    chunk_texts = lambda i: [texts[j] for j in order[i * chunk_size:(i + 1) * chunk_size]]
+
+    started, encoded = time.perf_counter(), 0
+
+    def finish(i, emb):
+        nonlocal encoded
+        _save_array(_chunk_path(outdir, i), np.asarray(emb, dtype=np.float32))
+        done.add(i)
+        manifest["done"] = sorted(done)
+        _save_manifest(outdir, manifest)
+        encoded += len(emb)
+        if progress:
+            rate = encoded / max(time.perf_counter() - started, 1e-9)
+            left = len(texts) - min(len(done) * chunk_size, len(texts))
+            progress(f"{len(done)}/{n_chunks} chunks, {rate:,.0f} texts/s, ~{left / rate:,.0f}s left")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(todo))
+    if todo and workers == 0:
+        for i in todo:
+            finish(i, encode(chunk_texts(i), name=name, batch_size=batch_size))
+    elif todo:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        # spawn: forking a process that already runs torch / BLAS threads can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(name, threads, batch_size)) as ex:
+            futures = [ex.submit(_encode_chunk, i, chunk_texts(i)) for i in todo]
+            for fut in as_completed(futures):
+                finish(*fut.result())
+
+    return load_embeddings(outdir)
+
+
+def load_embeddings(outdir, texts=None):
+    """Reassemble a finished job's chunks in the original order (checked against texts if given)."""
+    manifest = _load_manifest(outdir)
+    if manifest is None:
+        raise FileNotFoundError(f"No embedding job in {outdir}")
+    n_chunks = -(-manifest["n"] // manifest["chunk_size"])
+    missing = sorted(set(range(n_chunks)) - set(manifest["done"]))
+    if missing:
+        raise RuntimeError(f"Embedding job in {outdir} is incomplete ({len(missing)} chunks missing)")
+    if texts is not None and corpus_fingerprint([str(t) for t in texts]) != manifest["corpus"]:
+        raise ValueError("Texts do not match the corpus this job encoded")
+    if n_chunks == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    sorted_emb = np.concatenate([np.load(_chunk_path(outdir, i)) for i in range(n_chunks)])
+    out = np.empty_like(sorted_emb)
+    out[np.load(os.path.join(outdir, "order.npy"))] = sorted_emb
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel, resumable embedding backfill")
+    add_input_args(ap)
+    ap.add_argument("--outdir", default="reports/embeddings", help="Chunk + manifest directory")
+    ap.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    ap.add_argument("--chunk-size", type=int, default=4096)
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes (0 = in-process)")
+    ap.add_argument("--batch-size", type=int, default=64)
+    args = ap.parse_args()
+
+    df = load_journal_cli(args, sort=False)
+    emb = run_embedding_job(df["text"].astype(str).tolist(), args.outdir, name=args.model,
+                            chunk_size=args.chunk_size, workers=args.workers, batch_size=args.batch_size)
+    out_path = os.path.join(args.outdir, "embeddings.npy")
+    np.save(out_path, emb)
+    print(f"Saved: {out_path} {emb.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+# src/emotion_arcs.py
+"""Sentence-level emotion scores and per-entry emotion arcs.
+
+Whole-entry scoring truncates long dreams at the model's 512 tokens and
+averages away how a dream turns (calm beach, then the wave). Here entries are
+split into sentences and each sentence is scored separately:
+
+- sentences are deduplicated first (journals repeat "I woke up." and
+  "I was back in my old school." constantly), so the model sees each distinct
+  sentence once, in length-sorted chunks that pad to similar lengths
+- scores are cached by sentence hash per model configuration, in memory
+  (LRU of ``DREAM_NLP_SENTENCE_CACHE_SIZE`` sentences, default 200000) and,
+  when ``DREAM_NLP_SENTENCE_CACHE_DB`` names a SQLite file, on disk
+- ``emotion_arcs`` folds them back into one row per entry: the token-weighted
+  mean score of every label, plus the start, peak and end emotion
+
+``analyze_emotions(df, mode="sentence")`` (src/emotions.py) returns both.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .jobs import map_chunks
+
+# Sentence ends: . ! ? or … (optionally closed by a quote or bracket) followed
+# by spaces, except after common abbreviations; line breaks always end one.
+# The punctuation comes first so the abbreviation checks only run after it.
+_SENTENCE_END = re.compile(
+    r"([.!?…])(?<!\bMr\.)(?<!\bMs\.)(?<!\bDr\.)(?<!\bSt\.)(?<!\bMrs\.)([\"'”’)\]]?)[ \t]+")
+CHUNK_SENTENCES = 1024
+
+
+def split_sentences(texts):
+    """(flat list of sentences, entry index of each); every entry gets at least one sentence."""
+    sentences, doc = [], []
+    for i, text in enumerate(texts):
+        parts = [" ".join(p.split()) for p in _SENTENCE_END.sub("\\1\\2\\n", str(text)).splitlines()]
+        parts = [p for p in parts if p] or [" ".join(str(text).split())]
+        sentences.extend(parts)
+        doc.extend([i] * len(parts))
+    return sentences, np.asarray(doc, dtype=np.int64)
+
+
+def _namespace(tier):
+    """What a cached score depends on besides the sentence."""
+    from .models import DEFAULT_EMOTION_MODEL
+    from .onnx_backend import backend, use_quantized
+    parts = {"tier": tier}
+    if tier != "fast":
+        parts.update(model=DEFAULT_EMOTION_MODEL, backend=backend(),
+                     quantized=backend() == "onnx" and use_quantized())
+    if tier != "accurate":
+        from .emotion_lexicon import DEFAULT_LEXICON
+        path = os.getenv("DREAM_NLP_EMOTION_LEXICON", DEFAULT_LEXICON)
+        parts["lexicon_mtime"] = os.stat(path).st_mtime_ns
+    if tier == "cascade":
+        parts.update(min_confidence=os.getenv("DREAM_NLP_EMOTION_MIN_CONFIDENCE", "0.6"),
+                     max_fast_tokens=os.getenv("DREAM_NLP_EMOTION_MAX_FAST_TOKENS", "120"))
+    return json.dumps(parts, sort_keys=True)
+
+
+class SentenceEmotionCache:
+    """Emotion scores by (model configuration, sentence) hash: an LRU in memory, optionally backed by SQLite."""
+
+    def __init__(self, max_sentences=None, db_path=None):
+        self.max_sentences = max_sentences if max_sentences is not None else \
+            int(os.getenv("DREAM_NLP_SENTENCE_CACHE_SIZE", "200000"))
+        self.db_path = db_path if db_path is not None else os.getenv("DREAM_NLP_SENTENCE_CACHE_DB")
+        self._items = OrderedDict()
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = self.misses = 0
+        if self.db_path:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS sentence_labels (namespace TEXT PRIMARY KEY, labels TEXT)")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS sentence_emotions (key TEXT PRIMARY KEY, scores BLOB)")
+
+    @staticmethod
+    def keys(namespace, sentences):
+        ns = hashlib.sha1(namespace.encode("utf-8")).digest()
+        return [hashlib.sha1(ns + s.encode("utf-8")).hexdigest() for s in sentences]
+
+    def labels(self, namespace):
+        if namespace not in self._labels and self._conn is not None:
+            with self._lock:
+                row = self._conn.execute("SELECT labels FROM sentence_labels WHERE namespace = ?",
+                                         (namespace,)).fetchone()
+            if row:
+                self._labels[namespace] = json.loads(row[0])
+        return self._labels.get(namespace)
+
+    def get_many(self, keys):
+        """{key: scores} for the keys that are cached."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._items:
+                    self._items.move_to_end(key)
+                    found[key] = self._items[key]
+        missing = [k for k in keys if k not in found]
+        if missing and self._conn is not None:
+            with self._lock:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, scores FROM sentence_emotions WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                    found.update((k, np.frombuffer(b, dtype=np.float32)) for k, b in rows)
+            self._remember({k: found[k] for k in missing if k in found})
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def _remember(self, items):
+        with self._lock:
+            self._items.update(items)
+            for key in items:
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_sentences:
+                self._items.popitem(last=False)
+
+    def put_many(self, namespace, labels, keys, scores):
+        self._labels[namespace] = list(labels)
+        self._remember(dict(zip(keys, scores)))
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO sentence_labels VALUES (?, ?)",
+                                   (namespace, json.dumps(list(labels))))
+                self._conn.executemany("INSERT OR REPLACE INTO sentence_emotions VALUES (?, ?)",
+                                       [(k, s.astype(np.float32).tobytes()) for k, s in zip(keys, scores)])
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        return {"sentences": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+_CACHE = None
+
+
+def get_sentence_cache():
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SentenceEmotionCache()
+    return _CACHE
+
+
+def sentence_emotion_scores(texts, tier=None, cache=None, chunk_size=CHUNK_SENTENCES):
+    """
+    (sorted labels, sentences x labels float32 scores, sentences, entry index of
+    each sentence). Only distinct sentences missing from the cache are scored.
+    """
+    from .emotions import default_tier, emotion_scores
+    tier = tier or default_tier()
+    cache = cache or get_sentence_cache()
+    sentences, doc = split_sentences(texts)
+    codes, unique = pd.factorize(pd.Series(sentences, dtype=object))
+    unique = list(unique)
+
+    namespace = _namespace(tier)
+    keys = cache.keys(namespace, unique)
+    cached = cache.get_many(keys)
+    labels = cache.labels(namespace)
+    todo = [i for i, k in enumerate(keys) if k not in cached]
+    if todo:
+        # Length-sorted so each model batch pads to similar lengths
+        todo.sort(key=lambda i: len(unique[i]))
+        results = map_chunks(lambda idx: emotion_scores([unique[i] for i in idx], tier=tier), todo, chunk_size)
+        labels = results[0][0]
+        scored = np.concatenate([s for _, s in results]) if len(results) > 1 else results[0][1]
+        cache.put_many(namespace, labels, [keys[i] for i in todo], scored)
+        cached.update(zip((keys[i] for i in todo), scored))
+    if labels is None:  # nothing to score at all
+        labels = []
+    table = np.stack([cached[k] for k in keys]) if keys else np.zeros((0, len(labels)), dtype=np.float32)
+    return labels, table[codes].astype(np.float32, copy=False), sentences, doc
+
+
+def emotion_arcs(labels, scores, sentences, doc, n_entries):
+    """
+    One row per entry: every label's token-weighted mean over its sentences,
+    n_sentences, and the arc: emotion_start / emotion_end (top label of the
+    first / last sentence), emotion_peak with its score and relative position
+    emotion_peak_at (0 = first sentence, 1 = last): the strongest non-neutral
+    emotion of a sentence where it beats that sentence's neutral score, or
+    "neutral" (at the most neutral sentence) when no sentence has one.
+    """
+    labels = list(labels)
+    weights = np.fromiter((max(len(s.split()), 1) for s in sentences), dtype=np.float64, count=len(sentences))
+    totals = np.zeros((n_entries, len(labels)))
+    np.add.at(totals, doc, scores * weights[:, None])
+    mass = np.bincount(doc, weights=weights, minlength=n_entries)
+    mean = totals / np.maximum(mass, 1e-12)[:, None]
+
+    counts = np.bincount(doc, minlength=n_entries)
+    first = np.searchsorted(doc, np.arange(n_entries))
+    last = first + np.maximum(counts, 1) - 1
+    has = counts > 0
+    top = np.asarray(labels, dtype=object)[scores.argmax(axis=1)] if len(scores) else np.array([], dtype=object)
+
+    # Peak: among sentences whose strongest non-neutral emotion beats their own
+    # neutral score, the strongest (earliest on ties); an entry without one
+    # peaks at its most neutral sentence
+    emotional = [j for j, label in enumerate(labels) if label != "neutral"] or list(range(len(labels)))
+    strength = scores[:, emotional].max(axis=1) if len(scores) else np.zeros(0)
+    peak_label = np.asarray(labels, dtype=object)[np.asarray(emotional)[scores[:, emotional].argmax(axis=1)]] \
+        if len(scores) else np.array([], dtype=object)
+    peak_score = strength.copy()
+    candidate = np.ones(len(strength), dtype=bool)
+    if "neutral" in labels and len(scores):
+        neutral = scores[:, labels.index("neutral")]
+        candidate = strength > neutral
+        peak_label[~candidate] = "neutral"
+        peak_score[~candidate] = neutral[~candidate]
+    order = np.lexsort((np.arange(len(doc)), -peak_score, ~candidate, doc))
+    peak = order[first[has]]
+
+    out = pd.DataFrame(mean.astype(np.float32), columns=labels)
+    out["n_sentences"] = counts
+    for name in ("emotion_start", "emotion_peak", "emotion_end"):
+        out[name] = None
+    out["emotion_peak_score"] = np.nan
+    out["emotion_peak_at"] = np.nan
+    rows = np.flatnonzero(has)
+    out.loc[rows, "emotion_start"] = top[first[has]]
+    out.loc[rows, "emotion_end"] = top[last[has]]
+    out.loc[rows, "emotion_peak"] = peak_label[peak]
+    out.loc[rows, "emotion_peak_score"] = peak_score[peak]
+    out.loc[rows, "emotion_peak_at"] = (peak - first[has]) / np.maximum(counts[has] - 1, 1)
+    return out
+
+
+def entry_emotion_arcs(texts, tier=None, cache=None):
+    """(per-entry arcs as in emotion_arcs, per-sentence frame: entry, sentence, label scores)."""
+    texts = list(texts)
+    labels, scores, sentences, doc = sentence_emotion_scores(texts, tier=tier, cache=cache)
+    arcs = emotion_arcs(labels, scores, sentences, doc, len(texts))
+    per_sentence = pd.DataFrame(scores, columns=labels)
+    per_sentence.insert(0, "sentence", sentences)
+    per_sentence.insert(0, "entry", doc)
+    return arcs, per_sentence
+
+
+def main():
+    from .ingest import add_input_args, load_journal_cli
+    ap = argparse.ArgumentParser(description="Sentence-level emotion scores and per-entry emotion arcs")
+    add_input_args(ap)
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--tier", choices=["fast", "accurate", "cascade"], default=None,
+                    help="Scoring tier (default: DREAM_NLP_EMOTION_TIER, else accurate)")
+    ap.add_argument("--compare", action="store_true", help="Also time whole-entry scoring of the same journal")
+    args = ap.parse_args()
+
+    df = load_journal_cli(args)
+    texts = df["text"].astype(str).tolist()
+
+    started = time.perf_counter()
+    arcs, per_sentence = entry_emotion_arcs(texts, tier=args.tier)
+    sentence_s = time.perf_counter() - started
+    n_unique = per_sentence["sentence"].nunique()
+    print(f"Sentence mode: {len(texts)} entries, {len(per_sentence)} sentences "
+          f"({n_unique} distinct) in {sentence_s:.2f}s")
+
+    os.makedirs(args.outdir, exist_ok=True)
+    arcs_path = os.path.join(args.outdir, "dreams_emotion_arcs.csv")
+    sentences_path = os.path.join(args.outdir, "sentence_emotions.csv")
+    pd.concat([df[["date", "text"]], arcs], axis=1).to_csv(arcs_path, index=False)
+    per_sentence.insert(1, "date", df["date"].to_numpy()[per_sentence["entry"].to_numpy()])
+    per_sentence.to_csv(sentences_path, index=False)
+
+    if args.compare:
+        from .emotions import emotion_scores
+        started = time.perf_counter()
+        emotion_scores(texts, tier=args.tier)
+        entry_s = time.perf_counter() - started
+        print(f"Entry mode: {entry_s:.2f}s (sentence mode {sentence_s / max(entry_s, 1e-9):.2f}x the time)")
+    print(f"Saved: {arcs_path}, {sentences_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# src/emotion_lexicon.py
+"""Fast-tier emotion scoring from a cue-word lexicon.
+
+Scores the same seven labels as the transformer emotion model (see
+src/emotions.py) about two orders of magnitude faster, at some cost in
+accuracy. A batch of entries is lower-cased and cleaned with Arrow string
+kernels and split into one flat token array. The word rules (lexicon lookup
+through simple stemming, negations, intensifiers) run once per distinct
+token, and the negation window, intensifiers and per-entry sums are NumPy
+passes over all tokens at once.
+
+Each label's logit is ``weight`` per cue word (scaled down for long entries),
+"neutral" has a fixed prior, and a softmax turns the logits into scores that
+sum to one like the pipeline's. The lexicon lives in config/emotions.yaml.
+"""
+import argparse
+import os
+import time
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Resolved from the package, so scoring does not depend on the working directory
+DEFAULT_LEXICON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "emotions.yaml")
+_SUFFIXES = ("ing", "ed", "es", "s", "ly", "d")
+
+
+@lru_cache(maxsize=4)
+def load_emotion_lexicon(path=None):
+    path = path or os.getenv("DREAM_NLP_EMOTION_LEXICON", DEFAULT_LEXICON)
+    with open(path, encoding="utf-8") as f:
+        lex = yaml.safe_load(f)
+    labels = sorted(lex["labels"])
+    cues = {}
+    for label, words in lex["emotions"].items():
+        for w in words:
+            cues.setdefault(str(w).lower(), set()).add(labels.index(label))
+    lex.update(labels=labels, cues=cues, negations=set(lex.get("negations", [])),
+               intensifiers=set(lex.get("intensifiers", [])))
+    return lex
+
+
+def _lookup(word, cues):
+    """Lexicon entry of a word, directly or through a stripped suffix (chased -> chase, running -> run)."""
+    if word in cues:
+        return cues[word]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            stem = word[:-len(suffix)]
+            for candidate in (stem, stem + "e", stem[:-1] if stem[-1:] == stem[-2:-1] else None):
+                if candidate in cues:
+                    return cues[candidate]
+    return None
+
+
+def _tokens(texts):
+    """Token ids, their vocabulary and the entry of each token."""
+    cleaned = (pd.Series([str(t) for t in texts], dtype="string[pyarrow]")
+               .str.lower().str.replace(r"[^a-z']+", " ", regex=True))
+    split = [t.split() for t in cleaned.tolist()]
+    lengths = np.fromiter(map(len, split), dtype=np.int64, count=len(split))
+    flat = np.fromiter(chain.from_iterable(split), dtype=object, count=int(lengths.sum()))
+    ids, vocab = pd.factorize(flat)
+    return ids, list(vocab), np.repeat(np.arange(len(split)), lengths), lengths
+
+
+def _vocab_tables(vocab, lex):
+    """Per distinct token: cue weight per label, negation flag, intensity."""
+    cue = np.zeros((len(vocab), len(lex["labels"])), dtype=np.float32)
+    neg = np.zeros(len(vocab), dtype=bool)
+    boost = np.ones(len(vocab), dtype=np.float32)
+    for v, word in enumerate(vocab):
+        word = word.strip("'")
+        hit = _lookup(word, lex["cues"])
+        if hit:
+            cue[v, list(hit)] = 1.0
+        neg[v] = word in lex["negations"] or word.endswith("n't")
+        if word in lex["intensifiers"]:
+            boost[v] = lex.get("intensity", 1.5)
+    return cue, neg, boost
+
+
+def lexicon_emotion_scores(texts, lexicon=None, return_lengths=False):
+    """(sorted labels, n x labels float32 scores), plus token counts if return_lengths."""
+    lex = load_emotion_lexicon(lexicon)
+    labels = lex["labels"]
+    ids, vocab, doc, lengths = _tokens(texts)
+    evidence = np.zeros((len(lengths), len(labels)), dtype=np.float64)
+
+    if len(ids):
+        cue, neg, boost = _vocab_tables(vocab, lex)
+        hits = np.flatnonzero(cue[ids].any(axis=1))
+        # Negations / intensifiers before each cue, within the same entry
+        weight = np.ones(len(hits))
+        for k in range(1, int(lex.get("negation_window", 3)) + 1):
+            prev = hits - k
+            ok = (prev >= 0) & (doc[np.maximum(prev, 0)] == doc[hits])
+            weight[ok & neg[ids[np.maximum(prev, 0)]]] = 0.0
+            if k == 1:
+                weight[ok] *= boost[ids[prev[ok]]]
+        np.add.at(evidence, doc[hits], cue[ids[hits]] * weight[:, None])
+
+    ref = float(lex.get("reference_length", 40))
+    scale = np.sqrt(ref / np.maximum(lengths, ref))[:, None]
+    logits = evidence * float(lex.get("weight", 1.5)) * scale
+    logits[:, labels.index("neutral")] = float(lex.get("neutral_prior", 1.0))
+    logits -= logits.max(axis=1, keepdims=True)
+    scores = np.exp(logits)
+    scores = (scores / scores.sum(axis=1, keepdims=True)).astype(np.float32)
+    return (labels, scores, lengths) if return_lengths else (labels, scores)
+
+
+def main():
+    from .ingest import add_input_args, load_journal_cli
+    ap = argparse.ArgumentParser(description="Fast-tier lexicon emotion scores (optionally timed against the transformer)")
+    add_input_args(ap)
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--compare", action="store_true", help="Also run the transformer and report agreement / speedup")
+    args = ap.parse_args()
+
+    df = load_journal_cli(args, sort=False)
+    texts = df["text"].astype(str).tolist()
+
+    started = time.perf_counter()
+    labels, scores = lexicon_emotion_scores(texts)
+    fast_s = time.perf_counter() - started
+    out = df.reset_index(drop=True)
+    for j, label in enumerate(labels):
+        out[label] = scores[:, j]
+    os.makedirs(args.outdir, exist_ok=True)
+    out_path = os.path.join(args.outdir, "dreams_with_fast_emotions.csv")
+    out.to_csv(out_path, index=False)
+    print(f"Lexicon tier: {len(texts)} entries in {fast_s:.3f}s")
+
+    if args.compare:
+        from .emotions import emotion_scores
+        started = time.perf_counter()
+        acc_labels, acc = emotion_scores(texts, tier="accurate")
+        acc_s = time.perf_counter() - started
+        agree = np.mean(np.array(labels)[scores.argmax(1)] == np.array(acc_labels)[acc.argmax(1)])
+        print(f"Transformer tier: {acc_s:.2f}s ({acc_s / max(fast_s, 1e-9):.0f}x slower); "
+              f"top-label agreement {agree:.1%}")
+    print(f"Saved: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
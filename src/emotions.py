@@ -1,40 +1,104 @@
 import argparse
 import os
+import numpy as np
 import pandas as pd
-from transformers import pipeline
+
+from .models import DEFAULT_EMOTION_MODEL, get_model
+from .ingest import add_input_args, load_journal_cli
+from .emotion_lexicon import lexicon_emotion_scores
 
 def ensure_datetime(s: pd.Series) -> pd.Series:
     return pd.to_datetime(s, errors="coerce")
 
-def load_emotion_model():
-    # ✅ Use top_k=None instead of return_all_scores=True
-    return pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=None)
+def load_emotion_model(name=DEFAULT_EMOTION_MODEL):
+    # Shared through the model registry; the pipeline is built with top_k=None
+    return get_model("emotion", name)
+
+def default_tier():
+    return os.getenv("DREAM_NLP_EMOTION_TIER", "accurate")
+
+def emotion_scores(texts, tier=None):
+    """
+    (sorted labels, n x labels float32 scores) for a sequence of texts.
+    tier: "fast" (lexicon, see src/emotion_lexicon.py), "accurate" (transformer)
+    or "cascade" (lexicon first; low-confidence and long entries go to the
+    transformer). Defaults to DREAM_NLP_EMOTION_TIER, else "accurate".
+    """
+    tier = tier or default_tier()
+    if tier == "fast":
+        return lexicon_emotion_scores(texts)
+    if tier == "cascade":
+        return cascade_emotion_scores(texts)
+    if tier != "accurate":
+        raise ValueError(f"Unknown emotion tier: {tier!r} (expected fast, accurate or cascade)")
+    return transformer_emotion_scores(texts)
 
-def analyze_emotions(df: pd.DataFrame, text_col="text"):
+def cascade_emotion_scores(texts, min_confidence=None, max_fast_tokens=None):
+    """Lexicon scores, with entries whose top score is below min_confidence or longer than max_fast_tokens re-scored by the transformer."""
+    if min_confidence is None:
+        min_confidence = float(os.getenv("DREAM_NLP_EMOTION_MIN_CONFIDENCE", "0.6"))
+    if max_fast_tokens is None:
+        max_fast_tokens = int(os.getenv("DREAM_NLP_EMOTION_MAX_FAST_TOKENS", "120"))
+    texts = [str(t) for t in texts]
+    labels, scores, lengths = lexicon_emotion_scores(texts, return_lengths=True)
+    hard = np.flatnonzero((scores.max(axis=1) < min_confidence) | (lengths > max_fast_tokens))
+    if len(hard):
+        acc_labels, acc = transformer_emotion_scores([texts[i] for i in hard])
+        if sorted(acc_labels) != labels:
+            raise ValueError(f"Emotion model labels {acc_labels} do not match the lexicon's {labels}")
+        scores[hard] = acc[:, [acc_labels.index(label) for label in labels]]
+    return labels, scores
+
+def transformer_emotion_scores(texts, batch_size=None):
     model = load_emotion_model()
-    results = model(df[text_col].astype(str).tolist(), top_k=None)
+    batch_size = batch_size or int(os.getenv("DREAM_NLP_EMOTION_BATCH_SIZE", "32"))
+    results = model([str(t) for t in texts], top_k=None, batch_size=batch_size)
+    if not results:
+        return [], np.zeros((0, 0), dtype=np.float32)
 
-    # Each result is now a list of dicts: [{'label': 'joy', 'score': 0.7}, ...]
-    labels = [item["label"] for item in results[0]]
-    scores_df = pd.DataFrame([[item["score"] for item in r] for r in results], columns=labels)
+    # Each result is a list of dicts sorted by score: [{'label': 'joy', 'score': 0.7}, ...]
+    # so columns are keyed by label rather than by position
+    labels = sorted(item["label"] for item in results[0])
+    col = {label: j for j, label in enumerate(labels)}
+    scores = np.empty((len(results), len(labels)), dtype=np.float32)
+    for i, r in enumerate(results):
+        for item in r:
+            scores[i, col[item["label"]]] = item["score"]
+    return labels, scores
 
-    return pd.concat([df.reset_index(drop=True), scores_df], axis=1)
+def analyze_emotions(df: pd.DataFrame, text_col="text", tier=None, mode="entry"):
+    """
+    df with one score column per emotion label. mode="sentence" scores each
+    sentence and aggregates (see src/emotion_arcs.py), adding n_sentences and
+    the arc columns emotion_start / emotion_peak / emotion_peak_score /
+    emotion_peak_at / emotion_end.
+    """
+    out = df.reset_index(drop=True)
+    if mode == "sentence":
+        from .emotion_arcs import entry_emotion_arcs
+        arcs, _ = entry_emotion_arcs(out[text_col], tier=tier)
+        return pd.concat([out, arcs], axis=1)
+    if mode != "entry":
+        raise ValueError(f"Unknown emotion mode: {mode!r} (expected entry or sentence)")
+    labels, scores = emotion_scores(out[text_col], tier=tier)
+    for j, label in enumerate(labels):
+        out[label] = scores[:, j]
+    return out
 
 def main():
     ap = argparse.ArgumentParser(description="Emotion classifier")
-    ap.add_argument("--input", required=True, help="CSV with date,text")
+    add_input_args(ap, dedup=True)
     ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--tier", choices=["fast", "accurate", "cascade"], default=None,
+                    help="Scoring tier (default: DREAM_NLP_EMOTION_TIER, else accurate)")
+    ap.add_argument("--mode", choices=["entry", "sentence"], default="entry",
+                    help="Score whole entries, or sentences aggregated into per-entry emotion arcs")
     args = ap.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
-    df = pd.read_csv(args.input)
-    if not {"date","text"}.issubset(df.columns):
-        raise ValueError("CSV must contain date,text")
-
-    df["date"] = ensure_datetime(df["date"])
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
+    df = load_journal_cli(args)
 
-    out = analyze_emotions(df)
+    out = analyze_emotions(df, tier=args.tier, mode=args.mode)
     out.to_csv(os.path.join(args.outdir, "dreams_with_emotions.csv"), index=False)
 
     print(f"✅ Saved {os.path.join(args.outdir, 'dreams_with_emotions.csv')}")
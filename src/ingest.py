@@ -0,0 +1,289 @@
+# src/ingest.py
+"""Journal ingestion from CSV, JSONL, Markdown folders and plain-text diaries.
+
+Every source is streamed in chunks into the ``date,text`` schema (CSV / JSONL
+keep any extra columns). The date format is inferred once, from a sample of
+the first chunk, and every chunk is then parsed with that explicit format,
+which is vectorized; only the values that do not fit it fall back to
+per-element parsing. Rows without text or with an unparseable date are
+dropped and listed in an error report instead of aborting the load.
+"""
+import io
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# On a tie the earlier format wins: month-first comes before day-first, as in
+# pandas' own parsing, so 01/05/2023 is Jan 5 unless some day in the sample is > 12
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+    "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y", "%m/%d/%y", "%d/%m/%y",
+    "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%A, %B %d, %Y", "%Y%m%d",
+]
+DATE_ALIASES = ["date", "day", "timestamp", "created", "created_at", "datetime", "time"]
+TEXT_ALIASES = ["text", "dream", "entry", "content", "body", "description", "note"]
+CHUNK_ROWS = 50000
+ERROR_COLUMNS = ["source", "row", "error", "value"]
+INPUT_HELP = "Journal file (CSV/JSONL with date,text, Markdown, .txt diary) or Markdown folder"
+
+# A diary line that starts a new entry: "2023-01-05", "2023-01-05: ...", "Jan 5, 2023 - ..."
+_DATE_PREFIX = re.compile(
+    r"^\s*(?:#+\s*)?("
+    r"\d{4}[-/.]\d{1,2}[-/.]\d{1,2}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?"
+    r"|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}"
+    r"|(?:[A-Z][a-z]+,\s+)?[A-Z][a-z]{2,8}\.?\s+\d{1,2},?\s+\d{4}"
+    r"|\d{1,2}\s+[A-Z][a-z]{2,8}\.?\s+\d{4}"
+    r")\s*(?:[:\-–—|]\s*|$)(.*)$"
+)
+_FILENAME_DATE = re.compile(r"(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})")
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.S)
+
+
+def infer_date_format(values, sample_size=1000):
+    """The candidate format that parses most of a sample (None if none fits well)."""
+    sample = pd.Series(values).dropna().astype(str).str.strip()
+    sample = sample[sample != ""]
+    if sample.empty:
+        return None
+    sample = sample.sample(min(sample_size, len(sample)), random_state=0) if len(sample) > sample_size else sample
+    best, best_ok = None, 0
+    for fmt in DATE_FORMATS:
+        ok = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if ok > best_ok:
+            best, best_ok = fmt, ok
+    return best if best_ok >= 0.5 * len(sample) else None
+
+
+def parse_dates(values, fmt=None):
+    """Parse with one explicit format (vectorized); only misfits are parsed one by one."""
+    s = pd.Series(values)
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        return s.dt.tz_convert(None)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    s = s.astype("string").str.strip()
+    fmt = fmt or infer_date_format(s) or "mixed"
+    # Parsed as UTC so mixed offsets still give one naive datetime64 column (naive values are kept as is)
+    parsed = pd.to_datetime(s, format=fmt, errors="coerce", utc=True)
+    misfit = parsed.isna() & s.notna() & (s != "")
+    if misfit.any() and fmt != "mixed":
+        parsed[misfit] = pd.to_datetime(s[misfit], format="mixed", errors="coerce", utc=True)
+    return parsed.dt.tz_convert(None)
+
+
+def _pick(columns, aliases):
+    lower = {str(c).strip().lower(): c for c in columns}
+    return next((lower[a] for a in aliases if a in lower), None)
+
+
+# --- readers: each yields (first_row, frame) chunks with raw date / text columns ---
+def _name(source):
+    return getattr(source, "name", None) or (source if isinstance(source, str) else "upload")
+
+
+def _tabular_chunks(frames, source):
+    row = 0
+    for frame in frames:
+        date_col, text_col = _pick(frame.columns, DATE_ALIASES), _pick(frame.columns, TEXT_ALIASES)
+        if date_col is None or text_col is None:
+            raise ValueError(f"{_name(source)}: need a date and a text column (got {list(frame.columns)})")
+        frame = frame.rename(columns={date_col: "date", text_col: "text"})
+        yield row, frame
+        row += len(frame)
+
+
+def _read_csv(source, chunk_rows):
+    sep = "\t" if _name(source).lower().endswith(".tsv") else ","
+    return _tabular_chunks(pd.read_csv(source, sep=sep, chunksize=chunk_rows), source)
+
+
+def _read_jsonl(source, chunk_rows):
+    return _tabular_chunks(pd.read_json(source, lines=True, chunksize=chunk_rows, convert_dates=False,
+                                        dtype=False), source)
+
+
+def _read_json(source, chunk_rows):
+    """A JSON array of entries (or JSON Lines saved as .json)."""
+    try:
+        frame = pd.read_json(source, convert_dates=False, dtype=False)
+    except ValueError:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return _read_jsonl(source, chunk_rows)
+    return _tabular_chunks([frame[i:i + chunk_rows] for i in range(0, len(frame), chunk_rows)], source)
+
+
+def is_entry_start(line):
+    """True for a diary line that starts a new dated entry."""
+    return _DATE_PREFIX.match(line) is not None
+
+
+def _split_diary(lines):
+    """(date string, text) entries from diary lines; text before the first date is dropped."""
+    entries, date, body = [], None, []
+    for line in lines:
+        m = _DATE_PREFIX.match(line)
+        if m:
+            if date is not None:
+                entries.append((date, "\n".join(body).strip()))
+            date, body = m.group(1), [m.group(2)] if m.group(2).strip() else []
+        elif date is not None:
+            body.append(line.rstrip("\n"))
+    if date is not None:
+        entries.append((date, "\n".join(body).strip()))
+    return entries
+
+
+def _read_text(source, chunk_rows):
+    if isinstance(source, str):
+        handle = open(source, encoding="utf-8", errors="replace")
+    else:
+        raw = source.read()
+        handle = io.StringIO(raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw)
+    with handle:
+        entries = _split_diary(handle)
+    for start in range(0, max(len(entries), 1), chunk_rows):
+        yield start, pd.DataFrame(entries[start:start + chunk_rows], columns=["date", "text"])
+
+
+def _markdown_entry(path_name, content):
+    """Entries of one Markdown file: date-headed sections, else one entry dated by front matter / file name."""
+    front = _FRONT_MATTER.match(content)
+    date = None
+    if front:
+        content = content[front.end():]
+        m = re.search(r"^date:\s*['\"]?([^'\"\n]+)", front.group(1), re.M)
+        date = m.group(1).strip() if m else None
+    sections = _split_diary(content.splitlines())
+    if sections:
+        return sections
+    if date is None:
+        m = _FILENAME_DATE.search(os.path.basename(path_name))
+        date = "-".join(m.groups()) if m else None
+    text = re.sub(r"^#+\s.*$", "", content, count=1, flags=re.M).strip()
+    return [(date, text)]
+
+
+def _read_markdown(source, chunk_rows):
+    if isinstance(source, str) and os.path.isdir(source):
+        paths = sorted(os.path.join(root, f) for root, _, files in os.walk(source)
+                       for f in files if f.lower().endswith((".md", ".markdown")))
+    else:
+        paths = [source]
+    entries = []
+    for path in paths:
+        if isinstance(path, str):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                content = f.read()
+        else:
+            raw = path.read()
+            content = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+        entries.extend(_markdown_entry(_name(path), content))
+    for start in range(0, max(len(entries), 1), chunk_rows):
+        yield start, pd.DataFrame(entries[start:start + chunk_rows], columns=["date", "text"])
+
+
+_READERS = {
+    ".csv": _read_csv, ".tsv": _read_csv,
+    ".jsonl": _read_jsonl, ".ndjson": _read_jsonl, ".json": _read_json,
+    ".md": _read_markdown, ".markdown": _read_markdown,
+    ".txt": _read_text,
+}
+
+
+def _reader(source):
+    if isinstance(source, str) and os.path.isdir(source):
+        return _read_markdown
+    ext = os.path.splitext(_name(source))[1].lower()
+    if ext not in _READERS:
+        raise ValueError(f"Unsupported journal format '{ext}' (use CSV, JSONL, Markdown or .txt)")
+    return _READERS[ext]
+
+
+def iter_journal(source, fmt=None, chunk_rows=CHUNK_ROWS):
+    """
+    Yield (entries, errors) chunks: entries with a parsed ``date`` and non-empty
+    ``text``; errors in ERROR_COLUMNS for every rejected row. ``source`` is a
+    path, a Markdown folder or an uploaded file object with a ``name``. The
+    date format used is kept in each entries frame's ``attrs["date_format"]``.
+    """
+    name = _name(source)
+    for first_row, frame in _reader(source)(source, chunk_rows):
+        if frame.empty:
+            continue
+        frame = frame.reset_index(drop=True)
+        if fmt is None:
+            # Inferred once, from the first chunk, and reused for the rest of the stream
+            fmt = infer_date_format(frame["date"]) or "mixed"
+        dates = parse_dates(frame["date"], fmt=fmt)
+        text = frame["text"].astype("string").str.strip()
+
+        raw_date = frame["date"].astype("string").str.strip()
+        no_text = (text.isna() | (text == "")).to_numpy(dtype=bool)
+        no_date = (raw_date.isna() | (raw_date == "")).to_numpy(dtype=bool) & ~no_text
+        bad_date = dates.isna().to_numpy() & ~no_text & ~no_date
+        rows = first_row + np.arange(len(frame)) + 1
+        error = np.select([no_text, no_date, bad_date], ["missing text", "missing date", "unparseable date"], "")
+        rejected = error != ""
+        errors = pd.DataFrame({"source": name, "row": rows[rejected], "error": error[rejected],
+                               "value": np.where(no_text, text.fillna("").to_numpy(dtype=object),
+                                                 raw_date.fillna("").to_numpy(dtype=object))[rejected]},
+                              columns=ERROR_COLUMNS)
+
+        frame = frame.assign(date=dates, text=text.astype(object))[~rejected].reset_index(drop=True)
+        frame.attrs["date_format"] = fmt
+        yield frame, errors
+
+
+def load_journal(source, fmt=None, chunk_rows=CHUNK_ROWS):
+    """Whole journal as (entries frame, error report)."""
+    parts, errors = [], []
+    for frame, errs in iter_journal(source, fmt=fmt, chunk_rows=chunk_rows):
+        parts.append(frame)
+        if len(errs):
+            errors.append(errs)
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["date", "text"])
+    report = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+    return df, report
+
+
+def report_errors(report, limit=5):
+    """Short console summary of rejected rows (used by the CLIs)."""
+    if report.empty:
+        return
+    print(f"Skipped {len(report)} rows: " + json.dumps(report["error"].value_counts().to_dict()))
+    for row in report.head(limit).itertuples():
+        print(f"  {row.source}:{row.row} {row.error} ({row.value!r})")
+
+
+def add_input_args(ap, dedup=False, default=None):
+    """--input (and with dedup=True, --dedup-threshold) for a CLI that reads a journal."""
+    if default is None:
+        ap.add_argument("--input", required=True, help=INPUT_HELP)
+    else:
+        ap.add_argument("--input", default=default, help=INPUT_HELP)
+    if dedup:
+        ap.add_argument("--dedup-threshold", type=float, default=0.9,
+                        help="Merge same-day entries at least this similar (0 disables)")
+
+
+def load_journal_cli(args, sort=True):
+    """
+    The journal named by args.input, for a CLI: rejected rows are reported,
+    same-day near-duplicates merged when the CLI has --dedup-threshold, and
+    with sort=True the entries come in date order.
+    """
+    df, rejected = load_journal(args.input)
+    report_errors(rejected)
+    threshold = getattr(args, "dedup_threshold", 0)
+    if threshold > 0:
+        from .dedup import deduplicate
+        df, merged = deduplicate(df, threshold=threshold)
+        if len(merged):
+            print(f"Merged {len(merged)} duplicate entries")
+    if sort:
+        df = df.dropna(subset=["date"]).sort_values("date", kind="stable").reset_index(drop=True)
+    return df
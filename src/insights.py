@@ -1,7 +1,7 @@
 import pandas as pd
 
 
-def generate_insights(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster_summary):
+def generate_insights(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster_summary, anomalies=None):
     """Generate intelligent textual insights about the user's dreams."""
     insights = []
 
@@ -51,10 +51,16 @@ def generate_insights(df, daily, avg_emotions, keywords, topics, symbol_summary,
         # 6️⃣ Clusters
         if cluster_summary is not None and not cluster_summary.empty:
             largest_cluster = cluster_summary.sort_values("size", ascending=False).iloc[0]
+            themes = f": {largest_cluster['label']}" if largest_cluster.get("label") else ""
             insights.append(
-                f"🌌 The largest dream cluster (Cluster {largest_cluster['cluster']}) contains {largest_cluster['size']} dreams."
+                f"🌌 The largest dream cluster (Cluster {largest_cluster['cluster']}{themes}) contains {largest_cluster['size']} dreams."
             )
 
+        # 7️⃣ Nightmare spikes and mood shifts (see src/anomaly.py)
+        if anomalies is not None and not anomalies.empty:
+            from .anomaly import describe_episodes
+            insights.extend(describe_episodes(anomalies))
+
     except Exception as e:
         insights.append(f"⚠️ Insight generation failed: {e}")
 
@@ -0,0 +1,160 @@
+# src/jobs.py
+"""Background jobs for the heavy analysis stages.
+
+A ``JobRunner`` runs named jobs on a small thread pool so a page can show
+its cheap results immediately and fill in the rest as jobs finish.
+Submitting a name that is already known returns the existing job, so a
+script rerun never starts a stage twice. ``after=`` names the jobs whose
+results are passed (in order) to the new job, which starts as soon as
+they have all finished. Independent jobs therefore overlap, and dependent
+ones chain without blocking a worker.
+
+Threads are used rather than processes because the models are shared
+through the in-process registry (see src/models.py) and release the GIL
+while they run. A job reports its progress from the worker thread with
+``report_progress`` (or ``map_chunks``).
+"""
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_current = threading.local()
+
+
+class Job:
+    def __init__(self, name):
+        self.name = name
+        self.future = Future()
+        self.progress = 0.0
+        self.started = self.finished = None
+
+    @property
+    def state(self):
+        if self.future.done():
+            return "failed" if self.future.exception() is not None else "done"
+        return "running" if self.started is not None else "queued"
+
+    @property
+    def error(self):
+        return self.future.exception() if self.future.done() else None
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+def report_progress(done, total=1.0):
+    """Record the progress of the job running on this thread (no-op elsewhere)."""
+    job = getattr(_current, "job", None)
+    if job is not None and total:
+        job.progress = min(1.0, done / total)
+
+
+def map_chunks(fn, items, chunk_size=256):
+    """[fn(chunk) for each chunk of items], reporting progress after each chunk."""
+    out = []
+    for i in range(0, len(items), chunk_size):
+        out.append(fn(items[i:i + chunk_size]))
+        report_progress(min(i + chunk_size, len(items)), len(items))
+    return out
+
+
+class JobRunner:
+    def __init__(self, max_workers=None):
+        workers = max_workers or int(os.getenv("DREAM_NLP_JOB_WORKERS", "4"))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dream-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        # Queued work is dropped when the owner (e.g. a browser session) goes away
+        weakref.finalize(self, self._pool.shutdown, wait=False, cancel_futures=True)
+
+    def submit(self, name, fn, *args, after=(), **kwargs) -> Job:
+        """Run fn(*results of after, *args, **kwargs) as job `name` (once)."""
+        with self._lock:
+            if name in self._jobs:
+                return self._jobs[name]
+            deps = [self._jobs[d] for d in after]
+            job = self._jobs[name] = Job(name)
+
+        def run():
+            job.started = time.perf_counter()
+            _current.job = job
+            try:
+                result = fn(*[d.result() for d in deps], *args, **kwargs)
+            except BaseException as e:
+                job.finished = time.perf_counter()
+                job.future.set_exception(e)
+            else:
+                job.progress = 1.0
+                job.finished = time.perf_counter()
+                job.future.set_result(result)
+            finally:
+                _current.job = None
+
+        if not deps:
+            self._pool.submit(run)
+            return job
+
+        remaining = [len(deps)]
+        lock = threading.Lock()
+
+        def dep_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            failed = next((d for d in deps if d.error is not None), None)
+            if failed is not None:
+                job.future.set_exception(RuntimeError(f"'{failed.name}' failed: {failed.error}"))
+            else:
+                self._pool.submit(run)
+
+        for d in deps:
+            d.future.add_done_callback(dep_done)
+        return job
+
+    def put(self, name, result) -> Job:
+        """Record an already computed result (e.g. from a snapshot) as finished job `name`."""
+        with self._lock:
+            if name in self._jobs:
+                return self._jobs[name]
+            job = self._jobs[name] = Job(name)
+        job.started = job.finished = time.perf_counter()
+        job.progress = 1.0
+        job.future.set_result(result)
+        return job
+
+    def get(self, name):
+        return self._jobs.get(name)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending(self):
+        return [j for j in self.jobs() if not j.done()]
+
+    def forget(self, name):
+        """Drop a finished job so it can be submitted again (e.g. after a failure)."""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is not None and job.done():
+                del self._jobs[name]
+
+    def prune(self, keep):
+        """Drop finished jobs whose name does not contain `keep` (e.g. an older dataset's key)."""
+        with self._lock:
+            for name in [n for n, j in self._jobs.items() if keep not in n and j.done()]:
+                del self._jobs[name]
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,88 @@
+# src/keyword_index.py
+"""Date-range keyword counts from prefix-summed sparse term counts.
+
+Entries are tokenized once (same tokens as ``analyze.top_keywords``) into a
+sparse (days x vocab) count matrix. Cumulative counts are kept every
+``stride`` days, so the counts for any date window are the difference of two
+prefix rows plus at most ``2 * stride`` day rows, followed by an argpartition.
+``stride=1`` stores a full prefix row per day; larger strides bound memory on
+multi-year journals, where full prefix rows become nearly dense.
+
+The per-entry (entries x vocab) counts are kept as ``doc_terms`` for other
+sparse stages, e.g. cluster labeling in src/clustering.py.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from .preprocess import preprocess_text
+
+
+def document_term_matrix(token_lists):
+    """Sparse (documents x vocab) int32 counts of tokens longer than two characters, and the vocab."""
+    vocab, indices, indptr = {}, [], [0]
+    for tokens in token_lists:
+        indices.extend(vocab.setdefault(t, len(vocab)) for t in tokens if len(t) > 2)
+        indptr.append(len(indices))
+    X = sp.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                      shape=(len(indptr) - 1, len(vocab)))
+    X.sum_duplicates()
+    return X, np.array(list(vocab), dtype=object)
+
+
+class KeywordIndex:
+    def __init__(self, dates, token_lists, stride=16):
+        X, self.vocab = document_term_matrix(token_lists)
+        self.doc_terms = X
+
+        days = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        self.days, day_idx = np.unique(days.to_numpy(), return_inverse=True)
+        P = sp.csr_matrix((np.ones(len(day_idx), dtype=np.int32), (day_idx, np.arange(len(day_idx)))),
+                          shape=(len(self.days), len(day_idx)))
+        self.day_counts = (P @ X).tocsr()  # days x vocab
+
+        # prefix[k] = counts of all days before day k * stride
+        self.stride = max(int(stride), 1)
+        n_blocks = -(-len(self.days) // self.stride)
+        Q = sp.csr_matrix((np.ones(len(self.days), dtype=np.int32),
+                           (np.arange(len(self.days)) // self.stride, np.arange(len(self.days)))),
+                          shape=(n_blocks, len(self.days)))
+        blocks = (Q @ self.day_counts).tocsr()
+        rows = [sp.csr_matrix((1, len(self.vocab)), dtype=np.int32)]
+        for k in range(n_blocks):
+            rows.append(rows[-1] + blocks[k])
+        self.prefix = sp.vstack(rows, format="csr")
+
+    @classmethod
+    def from_frame(cls, df, text_col="text", stride=16):
+        tokens = df[text_col].astype(str).apply(preprocess_text)
+        return cls(df["date"], tokens, stride=stride)
+
+    def counts(self, start=None, end=None):
+        """Dense term counts for entries dated within [start, end] (inclusive days)."""
+        a = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(start).normalize()), "left"))
+        b = len(self.days) if end is None else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(end).normalize()), "right"))
+        if b <= a:
+            return np.zeros(len(self.vocab), dtype=np.int64)
+        ka, kb = -(-a // self.stride), b // self.stride
+        if ka >= kb:
+            total = self.day_counts[a:b].sum(axis=0)
+        else:
+            total = (self.prefix[kb] - self.prefix[ka]).toarray()
+            total = total + self.day_counts[a:ka * self.stride].sum(axis=0)
+            total = total + self.day_counts[kb * self.stride:b].sum(axis=0)
+        return np.asarray(total, dtype=np.int64).ravel()
+
+    def top_keywords(self, n=30, start=None, end=None) -> pd.DataFrame:
+        """Same output as analyze.top_keywords, for a date window."""
+        counts = self.counts(start, end)
+        k = min(n, int((counts > 0).sum()))
+        if k == 0:
+            return pd.DataFrame(columns=["token", "count"])
+        top = np.argpartition(-counts, k - 1)[:k]
+        top = top[np.lexsort((top, -counts[top]))]
+        return pd.DataFrame({"token": self.vocab[top], "count": counts[top]})
+
+    def most_frequent_word(self, start=None, end=None):
+        top = self.top_keywords(1, start, end)
+        return top["token"].iloc[0] if len(top) else ""
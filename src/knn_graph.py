@@ -0,0 +1,166 @@
+# src/knn_graph.py
+"""Sparse "similar past dreams" graph from the semantic embeddings.
+
+Cosine similarities are computed block by block (a block of rows against the
+entries before it), so memory stays within a fixed budget instead of the
+O(n^2) of a full similarity matrix. Each row keeps its top-k most similar
+*earlier* entries, which makes the graph append-only: new entries only add
+rows. Connected components over strong edges are recurring-dream chains.
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from .ingest import add_input_args, load_journal_cli
+from .models import encode
+from .store import entry_hash
+
+
+def _normalize(embeddings):
+    emb = np.asarray(embeddings, dtype=np.float32)
+    return emb / np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+
+
+def _empty():
+    return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+
+def _block_topk(emb, start, stop, k):
+    """(rows, cols, sims) of the top-k strictly earlier neighbours of rows start..stop."""
+    kk = min(k, stop - 1)
+    if kk <= 0:
+        return _empty()
+    rows = np.arange(start, stop)
+    dist = emb[start:stop] @ emb[:stop].T  # numpy matmul releases the GIL
+    np.negative(dist, out=dist)  # in place: smallest = most similar, without a second block
+    tail = dist[:, start:]  # only the diagonal sub-block holds same-or-later entries
+    tail[np.triu_indices(stop - start, m=tail.shape[1])] = np.inf
+    idx = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+    vals = -np.take_along_axis(dist, idx, axis=1)
+    ok = np.isfinite(vals)
+    return np.broadcast_to(rows[:, None], idx.shape)[ok], idx[ok], vals[ok]
+
+
+def _knn_rows(emb, first_row, k, memory_mb, n_jobs):
+    """Graph rows for emb[first_row:], each against all earlier rows of emb."""
+    n = len(emb)
+    n_jobs = n_jobs or min(4, os.cpu_count() or 1)
+    # Each worker holds a (block_rows x n) float32 similarity block plus the
+    # int64 index array argpartition returns for it: 12 bytes per element
+    block_rows = max(1, int(memory_mb * 1024 * 1024 / (12 * max(n, 1) * n_jobs)))
+    starts = range(first_row, n, block_rows)
+    with ThreadPoolExecutor(max_workers=n_jobs) as ex:
+        parts = list(ex.map(lambda s: _block_topk(emb, s, min(s + block_rows, n), k), starts))
+    if not parts:
+        return _empty()
+    return tuple(np.concatenate(p) for p in zip(*parts))
+
+
+def build_knn_graph(embeddings, k=10, memory_mb=256, n_jobs=None):
+    """
+    Sparse (n x n) graph: row i holds the similarities of its top-k most similar
+    earlier entries. Embeddings must be in chronological order.
+    """
+    emb = _normalize(embeddings)
+    r, c, v = _knn_rows(emb, 0, k, memory_mb, n_jobs)
+    return sp.csr_matrix((v, (r, c)), shape=(len(emb), len(emb)), dtype=np.float32)
+
+
+def update_knn_graph(graph, embeddings, k=10, memory_mb=256, n_jobs=None):
+    """Extend a graph with rows for entries appended after the ones it covers."""
+    emb = _normalize(embeddings)
+    n_old, n = graph.shape[0], len(emb)
+    r, c, v = _knn_rows(emb, n_old, k, memory_mb, n_jobs)
+    old = graph.tocoo()
+    return sp.csr_matrix((np.concatenate([old.data, v]),
+                          (np.concatenate([old.row, r]), np.concatenate([old.col, c]))),
+                         shape=(n, n), dtype=np.float32)
+
+
+def save_knn_graph(path, graph):
+    sp.save_npz(path, graph.tocsr())
+
+
+def load_knn_graph(path):
+    return sp.load_npz(path).tocsr()
+
+
+def similar_dreams(graph, df, i, min_similarity=0.0):
+    """Earlier dreams most similar to entry i (row position in df), best first."""
+    row = graph.getrow(i)
+    order = np.argsort(-row.data)
+    cols, scores = row.indices[order], row.data[order]
+    keep = scores >= min_similarity
+    out = df.iloc[cols[keep]][["date", "text"]].copy()
+    out["score"] = scores[keep]
+    return out.reset_index(drop=True)
+
+
+def recurring_chains(graph, min_similarity=0.8, min_size=2):
+    """
+    Connected components over edges with similarity >= min_similarity.
+    Returns a frame of (chain, size, rows) with chains ordered by size.
+    """
+    strong = graph.multiply(graph >= min_similarity).tocsr()
+    n_chains, labels = connected_components(strong, directed=False)
+    sizes = np.bincount(labels, minlength=n_chains)
+    order = np.argsort(labels, kind="stable")
+    groups = np.split(order, np.cumsum(sizes)[:-1])
+    chains = [(int(labels[g[0]]), len(g), g.tolist()) for g in groups if len(g) >= min_size]
+    chains.sort(key=lambda c: -c[1])
+    return pd.DataFrame([(i, size, rows) for i, (_, size, rows) in enumerate(chains)],
+                        columns=["chain", "size", "rows"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Similar / recurring dream graph")
+    add_input_args(ap, dedup=True)
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--k", type=int, default=10, help="Earlier neighbours kept per entry")
+    ap.add_argument("--threshold", type=float, default=0.8, help="Similarity linking a recurring chain")
+    ap.add_argument("--memory-mb", type=int, default=256, help="Budget for similarity blocks")
+    args = ap.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+    df = load_journal_cli(args)
+    hashes = np.array([entry_hash(d, t) for d, t in zip(df["date"], df["text"].astype(str))])
+
+    # Reuse the saved graph when the journal only grew at the end
+    graph_path = os.path.join(args.outdir, "knn_graph.npz")
+    state_path = os.path.join(args.outdir, "knn_state.npz")
+    graph, embeddings = None, None
+    if os.path.exists(graph_path) and os.path.exists(state_path):
+        state = np.load(state_path, allow_pickle=False)
+        old = state["hashes"]
+        if len(old) <= len(hashes) and (hashes[:len(old)] == old).all():
+            graph, embeddings = load_knn_graph(graph_path), state["embeddings"]
+
+    if graph is None:
+        embeddings = encode(df["text"].astype(str).tolist())
+        graph = build_knn_graph(embeddings, k=args.k, memory_mb=args.memory_mb)
+    elif len(embeddings) < len(df):
+        new = encode(df["text"].iloc[len(embeddings):].astype(str).tolist())
+        embeddings = np.vstack([embeddings, new])
+        graph = update_knn_graph(graph, embeddings, k=args.k, memory_mb=args.memory_mb)
+    print(f"Graph covers {graph.shape[0]} entries")
+    save_knn_graph(graph_path, graph)
+    np.savez(state_path, hashes=hashes, embeddings=embeddings.astype(np.float32))
+
+    chains = recurring_chains(graph, min_similarity=args.threshold)
+    rows = [(c.chain, c.size, df["date"].iloc[i], df["text"].iloc[i]) for c in chains.itertuples() for i in c.rows]
+    out = pd.DataFrame(rows, columns=["chain", "size", "date", "text"])
+    out_path = os.path.join(args.outdir, "recurring_dreams.csv")
+    out.to_csv(out_path, index=False)
+
+    print("Saved:")
+    for path in (graph_path, state_path, out_path):
+        print(f"- {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# src/llm_client.py
+"""Shared OpenAI-compatible client for the assistant modules.
+
+One pooled HTTP client per (api key, base url) is reused for every request, with
+bounded timeouts and retries. ``OPENAI_BASE_URL`` points it at any
+OpenAI-compatible server, e.g. a local mock during testing.
+"""
+import asyncio
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_MODEL = os.getenv("DREAM_NLP_LLM_MODEL", "gpt-4o-mini")
+TIMEOUT = httpx.Timeout(float(os.getenv("DREAM_NLP_LLM_TIMEOUT", "30")), connect=5.0)
+MAX_RETRIES = int(os.getenv("DREAM_NLP_LLM_RETRIES", "2"))
+LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60)
+
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+
+class MissingAPIKey(RuntimeError):
+    pass
+
+
+def _settings():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise MissingAPIKey("Missing OpenAI API key. Please set it in your environment or Streamlit secrets.")
+    return api_key, os.getenv("OPENAI_BASE_URL") or None
+
+
+def get_client() -> OpenAI:
+    """Process-wide synchronous client with a pooled, keep-alive HTTP connection."""
+    api_key, base_url = _settings()
+    key = (api_key, base_url)
+    with _LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=TIMEOUT,
+                max_retries=MAX_RETRIES,
+                http_client=httpx.Client(limits=LIMITS, timeout=TIMEOUT),
+            )
+        return _CLIENTS[key]
+
+
+def chat(messages, model=DEFAULT_MODEL, **kwargs) -> str:
+    response = get_client().chat.completions.create(model=model, messages=messages, **kwargs)
+    return (response.choices[0].message.content or "").strip()
+
+
+def stream_chat(messages, model=DEFAULT_MODEL, **kwargs):
+    """Yield the completion text chunk by chunk as tokens arrive."""
+    stream = get_client().chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _chat_many(batch, model, concurrency, **kwargs):
+    api_key, base_url = _settings()
+    sem = asyncio.Semaphore(concurrency)
+    # Async clients are bound to their event loop, so the pool lives for one batch
+    async with AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=TIMEOUT,
+        max_retries=MAX_RETRIES,
+        http_client=httpx.AsyncClient(limits=LIMITS, timeout=TIMEOUT),
+    ) as client:
+        async def one(messages):
+            async with sem:
+                response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+                return (response.choices[0].message.content or "").strip()
+
+        return await asyncio.gather(*(one(m) for m in batch), return_exceptions=True)
+
+
+def chat_many(batch, model=DEFAULT_MODEL, concurrency=8, **kwargs):
+    """
+    Run many chat requests concurrently (at most ``concurrency`` in flight).
+    Returns answers in input order; failed requests come back as exceptions.
+    """
+    return asyncio.run(_chat_many(list(batch), model, concurrency, **kwargs))
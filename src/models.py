@@ -0,0 +1,143 @@
+# src/models.py
+"""Process-wide model registry shared by every embedding and classifier call site.
+
+Each model is loaded once per process, looked up by ``(kind, name)`` and kept in
+an LRU order. When the estimated size of the loaded models exceeds the memory
+budget (``DREAM_NLP_MODEL_MEMORY_MB``, default 2048), the least recently used
+models are evicted.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+
+def _load_sentence_transformer(name):
+    from .onnx_backend import backend
+    if backend() == "onnx":
+        from .onnx_backend import load_onnx_encoder
+        return load_onnx_encoder(name)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def _load_text_classifier(name):
+    from .onnx_backend import backend
+    if backend() == "onnx":
+        from .onnx_backend import load_onnx_classifier
+        return load_onnx_classifier(name)
+    from transformers import pipeline
+    return pipeline("text-classification", model=name, top_k=None)
+
+
+_LOADERS = {
+    "embedding": _load_sentence_transformer,
+    "emotion": _load_text_classifier,
+}
+
+
+def register_loader(kind, loader):
+    """Register (or replace) the loader used for a model kind."""
+    _LOADERS[kind] = loader
+
+
+def model_nbytes(model):
+    """Rough in-memory size of a model: parameters + buffers of its torch module."""
+    module = model
+    if not hasattr(module, "parameters") and hasattr(module, "model"):
+        module = module.model  # transformers pipeline
+    if hasattr(module, "nbytes"):
+        return int(module.nbytes)
+    if not hasattr(module, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in module.parameters())
+    if hasattr(module, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+    return int(total)
+
+
+class ModelRegistry:
+    """Thread-safe, memory-budgeted LRU cache of loaded models."""
+
+    def __init__(self, memory_budget_mb=None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("DREAM_NLP_MODEL_MEMORY_MB", "2048"))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._models = OrderedDict()  # (kind, name) -> (model, nbytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, kind, name):
+        key = (kind, name)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available,
+        # but only once per key even when several threads ask at the same time.
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+            if kind not in _LOADERS:
+                raise ValueError(f"No loader registered for model kind '{kind}'")
+            model = _LOADERS[kind](name)
+            size = model_nbytes(model)
+            with self._lock:
+                self._models[key] = (model, size)
+                self._evict()
+                self._load_locks.pop(key, None)
+        return model
+
+    def _evict(self):
+        # Always keep the most recently used model, even if it alone is over budget
+        while len(self._models) > 1 and self.used_bytes() > self.memory_budget:
+            self._models.popitem(last=False)
+
+    def used_bytes(self):
+        return sum(size for _, size in self._models.values())
+
+    def set_memory_budget(self, memory_budget_mb):
+        with self._lock:
+            self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+            self._evict()
+
+    def loaded(self):
+        """List of (kind, name, nbytes) from least to most recently used."""
+        with self._lock:
+            return [(k, n, size) for (k, n), (_, size) in self._models.items()]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def encode(self, texts, name=DEFAULT_EMBEDDING_MODEL, batch_size=64):
+        """Batched sentence embeddings as a float32 numpy array (n x dim)."""
+        model = self.get("embedding", name)
+        texts = [str(t) for t in texts]
+        if not texts:
+            return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+        emb = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return np.asarray(emb, dtype=np.float32)
+
+
+_REGISTRY = ModelRegistry()
+
+
+def get_registry():
+    return _REGISTRY
+
+
+def get_model(kind, name):
+    return _REGISTRY.get(kind, name)
+
+
+def encode(texts, name=DEFAULT_EMBEDDING_MODEL, batch_size=64):
+    return _REGISTRY.encode(texts, name=name, batch_size=batch_size)
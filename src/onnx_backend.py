@@ -0,0 +1,304 @@
+# src/onnx_backend.py
+"""ONNX Runtime inference backend for the emotion classifier and the sentence encoder.
+
+PyTorch stays the default. Set ``DREAM_NLP_BACKEND=onnx`` to have the model
+registry load the exported models from ``DREAM_NLP_ONNX_DIR`` (default
+``models/onnx``) instead. Export, parity check and benchmark:
+
+    python -m src.onnx_backend export --emotion-model <dir> --embedding-model <dir>
+    python -m src.onnx_backend check --input data/sample_dreams.csv
+    python -m src.onnx_backend bench --input data/sample_dreams.csv
+
+``onnx`` and ``onnxruntime`` are optional dependencies, only imported here.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+ONNX_DIR = os.getenv("DREAM_NLP_ONNX_DIR", os.path.join("models", "onnx"))
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+
+
+def backend():
+    return os.getenv("DREAM_NLP_BACKEND", "torch").lower()
+
+
+def use_quantized():
+    return os.getenv("DREAM_NLP_ONNX_QUANTIZED", "1") not in ("0", "false", "no")
+
+
+def model_dir(name, root=None):
+    """Directory holding the exported copy of a model name or local path."""
+    slug = os.path.basename(os.path.normpath(name)) if os.path.isdir(name) else name.replace("/", "__")
+    return os.path.join(root or ONNX_DIR, slug)
+
+
+def _session(path, threads=None):
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    opts.intra_op_num_threads = int(threads or os.getenv("DREAM_NLP_ORT_THREADS", os.cpu_count() or 1))
+    opts.inter_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+
+def _pick_model_file(path, quantized=None):
+    quantized = use_quantized() if quantized is None else quantized
+    q = os.path.join(path, QUANTIZED_FILE)
+    if quantized and os.path.exists(q):
+        return q
+    return os.path.join(path, MODEL_FILE)
+
+
+def _batches(texts, batch_size):
+    # Length-sorted batches keep padding to a minimum; callers restore the order
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+
+class OnnxTextClassifier:
+    """Drop-in for the ``text-classification`` pipeline used in src/emotions.py."""
+
+    def __init__(self, path, quantized=None, threads=None, max_length=512):
+        from transformers import AutoTokenizer
+        self.path = path
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        with open(os.path.join(path, "labels.json"), "r", encoding="utf-8") as f:
+            self.labels = json.load(f)
+        model_file = _pick_model_file(path, quantized)
+        self.nbytes = os.path.getsize(model_file)
+        self.session = _session(model_file, threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_length = max_length
+
+    def predict_proba(self, texts, batch_size=32):
+        texts = [str(t) for t in texts]
+        out = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        for idx in _batches(texts, batch_size):
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+            feed = {k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names}
+            logits = self.session.run(None, feed)[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            out[idx] = probs / probs.sum(axis=1, keepdims=True)
+        return out
+
+    def __call__(self, texts, top_k=None, batch_size=32, **kwargs):
+        single = isinstance(texts, str)
+        probs = self.predict_proba([texts] if single else texts, batch_size=batch_size)
+        results = []
+        for row in probs:
+            order = np.argsort(-row)
+            if top_k is not None:
+                order = order[:top_k]
+            results.append([{"label": self.labels[i], "score": float(row[i])} for i in order])
+        return results[0] if single else results
+
+
+class OnnxSentenceEncoder:
+    """Drop-in for the parts of ``SentenceTransformer`` used in this repo."""
+
+    def __init__(self, path, quantized=None, threads=None):
+        from transformers import AutoTokenizer
+        self.path = path
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        with open(os.path.join(path, "pooling.json"), "r", encoding="utf-8") as f:
+            self.pooling = json.load(f)
+        model_file = _pick_model_file(path, quantized)
+        self.nbytes = os.path.getsize(model_file)
+        self.session = _session(model_file, threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return int(self.pooling["dimension"])
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else [str(t) for t in texts]
+        out = np.zeros((len(texts), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        for idx in _batches(texts, batch_size):
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                 max_length=self.pooling["max_seq_length"], return_tensors="np")
+            feed = {k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+            mask = enc["attention_mask"][..., None].astype(np.float32)
+            emb = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.pooling["normalize"]:
+                emb = emb / np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+            out[idx] = emb
+        return out[0] if single else out
+
+
+def load_onnx_classifier(name):
+    return OnnxTextClassifier(model_dir(name))
+
+
+def load_onnx_encoder(name):
+    return OnnxSentenceEncoder(model_dir(name))
+
+
+# --- Export ---
+def _quantize(path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(os.path.join(path, MODEL_FILE), os.path.join(path, QUANTIZED_FILE),
+                     weight_type=QuantType.QInt8)
+
+
+def _export(module, enc, output_name, out_path):
+    import torch
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in enc]
+    dynamic = {k: {0: "batch", 1: "sequence"} for k in names}
+    dynamic[output_name] = {0: "batch", 1: "sequence"} if output_name == "last_hidden_state" else {0: "batch"}
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(module, tuple(enc[k] for k in names), out_path,
+                          input_names=names, output_names=[output_name],
+                          dynamic_axes=dynamic, opset_version=17)
+
+
+def export_emotion_model(name, outdir=None, quantize=True):
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    local = os.path.isdir(name)
+    path = model_dir(name, outdir)
+    os.makedirs(path, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=local)
+    model = AutoModelForSequenceClassification.from_pretrained(name, local_files_only=local)
+    model.config.return_dict = False
+    enc = tokenizer(["a dream about the sea"], return_tensors="pt")
+    _export(model, enc, "logits", os.path.join(path, MODEL_FILE))
+    tokenizer.save_pretrained(path)
+    labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+    with open(os.path.join(path, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump(labels, f)
+    if quantize:
+        _quantize(path)
+    return path
+
+
+def export_embedding_model(name, outdir=None, quantize=True):
+    from sentence_transformers import SentenceTransformer
+    st_model = SentenceTransformer(name, device="cpu", local_files_only=os.path.isdir(name))
+    transformer = st_model[0].auto_model
+    transformer.config.return_dict = False
+    path = model_dir(name, outdir)
+    os.makedirs(path, exist_ok=True)
+    enc = st_model.tokenizer(["a dream about the sea"], return_tensors="pt")
+    _export(transformer, enc, "last_hidden_state", os.path.join(path, MODEL_FILE))
+    st_model.tokenizer.save_pretrained(path)
+    pooling = {
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": any(type(m).__name__ == "Normalize" for m in st_model),
+    }
+    with open(os.path.join(path, "pooling.json"), "w", encoding="utf-8") as f:
+        json.dump(pooling, f, indent=2)
+    if quantize:
+        _quantize(path)
+    return path
+
+
+# --- Parity & benchmark ---
+def _load_texts(path, limit=None):
+    from .ingest import load_journal
+    texts = load_journal(path)[0]["text"].tolist()
+    return texts[:limit] if limit else texts
+
+
+def _torch_models(emotion_name, embedding_name):
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+    clf = pipeline("text-classification", model=emotion_name, top_k=None)
+    enc = SentenceTransformer(embedding_name, device="cpu")
+    return clf, enc
+
+
+def _torch_proba(clf, texts, labels, batch_size=32):
+    results = clf(texts, top_k=None, batch_size=batch_size, truncation=True)
+    return np.array([[{d["label"]: d["score"] for d in r}[l] for l in labels] for r in results])
+
+
+def parity_check(texts, emotion_name, embedding_name, quantized=None, root=None):
+    """Compare ONNX outputs against the PyTorch models on the same texts."""
+    clf, enc = _torch_models(emotion_name, embedding_name)
+    onnx_clf = OnnxTextClassifier(model_dir(emotion_name, root), quantized=quantized)
+    onnx_enc = OnnxSentenceEncoder(model_dir(embedding_name, root), quantized=quantized)
+
+    p_ref = _torch_proba(clf, texts, onnx_clf.labels)
+    p_onnx = onnx_clf.predict_proba(texts)
+    e_ref = enc.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    e_onnx = onnx_enc.encode(texts)
+    cos = (e_ref * e_onnx).sum(axis=1) / (
+        np.linalg.norm(e_ref, axis=1) * np.linalg.norm(e_onnx, axis=1) + 1e-12)
+    return {
+        "n_texts": len(texts),
+        "emotion_top1_agreement": float((p_ref.argmax(axis=1) == p_onnx.argmax(axis=1)).mean()),
+        "emotion_max_abs_diff": float(np.abs(p_ref - p_onnx).max()),
+        "embedding_cosine_mean": float(cos.mean()),
+        "embedding_cosine_min": float(cos.min()),
+    }
+
+
+def _throughput(fn, texts, repeats=3):
+    fn(texts[:8])  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - t0)
+    return len(texts) / best
+
+
+def benchmark(texts, emotion_name, embedding_name, quantized=None, root=None):
+    """Entries per second for each model on the PyTorch and ONNX backends."""
+    clf, enc = _torch_models(emotion_name, embedding_name)
+    onnx_clf = OnnxTextClassifier(model_dir(emotion_name, root), quantized=quantized)
+    onnx_enc = OnnxSentenceEncoder(model_dir(embedding_name, root), quantized=quantized)
+    rows = {
+        "emotion_torch": _throughput(lambda t: clf(t, top_k=None, batch_size=32, truncation=True), texts),
+        "emotion_onnx": _throughput(onnx_clf.predict_proba, texts),
+        "embedding_torch": _throughput(lambda t: enc.encode(t, show_progress_bar=False), texts),
+        "embedding_onnx": _throughput(onnx_enc.encode, texts),
+    }
+    rows["emotion_speedup"] = rows["emotion_onnx"] / rows["emotion_torch"]
+    rows["embedding_speedup"] = rows["embedding_onnx"] / rows["embedding_torch"]
+    return rows
+
+
+def main():
+    from .ingest import add_input_args
+    from .models import DEFAULT_EMBEDDING_MODEL, DEFAULT_EMOTION_MODEL
+
+    ap = argparse.ArgumentParser(description="ONNX Runtime backend: export, parity check, benchmark")
+    ap.add_argument("command", choices=["export", "check", "bench"])
+    ap.add_argument("--emotion-model", default=DEFAULT_EMOTION_MODEL, help="Hub id or local model directory")
+    ap.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL, help="Hub id or local model directory")
+    ap.add_argument("--outdir", default=ONNX_DIR)
+    ap.add_argument("--no-quantize", action="store_true", help="Export / use fp32 models only")
+    add_input_args(ap, default=os.path.join("data", "sample_dreams.csv"))
+    ap.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.command == "export":
+        for path in (export_emotion_model(args.emotion_model, args.outdir, quantize=not args.no_quantize),
+                     export_embedding_model(args.embedding_model, args.outdir, quantize=not args.no_quantize)):
+            print(f"✅ Exported {path}")
+        return
+
+    texts = _load_texts(args.input, args.limit)
+    quantized = False if args.no_quantize else None
+    if args.command == "check":
+        report = parity_check(texts, args.emotion_model, args.embedding_model, quantized=quantized, root=args.outdir)
+    else:
+        report = benchmark(texts, args.emotion_model, args.embedding_model, quantized=quantized, root=args.outdir)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# src/render_cache.py
+"""Content-addressed cache for rendered figures (PNG bytes and Plotly JSON).
+
+Entries are keyed by a hash of the figure's kind, input data and parameters,
+so a figure whose inputs did not change is never re-rendered or re-rasterized,
+whether it is requested by the app or by the PDF report. The in-memory tier
+is an LRU bounded by ``DREAM_NLP_RENDER_CACHE_MB`` (default 64); setting
+``DREAM_NLP_RENDER_CACHE_DIR`` adds a disk tier that survives restarts.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(*parts, **params) -> str:
+    """Stable hash of frames, arrays, mappings and scalars."""
+    h = hashlib.sha256()
+
+    def feed(obj):
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            layout = (list(obj.columns), [str(d) for d in obj.dtypes]) if isinstance(obj, pd.DataFrame) \
+                else (obj.name, str(obj.dtype))
+            h.update(repr(layout).encode())
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif isinstance(obj, np.ndarray):
+            h.update(f"{obj.dtype}{obj.shape}".encode())
+            h.update(np.ascontiguousarray(obj).tobytes())
+        elif isinstance(obj, bytes):
+            h.update(obj)
+        else:
+            h.update(json.dumps(obj, sort_keys=True, default=str).encode())
+        h.update(b"\0")
+
+    for part in parts:
+        feed(part)
+    feed(params)
+    return h.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, max_mb=None, disk_dir=None):
+        self.max_bytes = int((max_mb if max_mb is not None else float(os.getenv("DREAM_NLP_RENDER_CACHE_MB", "64"))) * 1024 * 1024)
+        self.disk_dir = disk_dir if disk_dir is not None else os.getenv("DREAM_NLP_RENDER_CACHE_DIR")
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), "rb") as f:
+                data = f.read()
+            self._remember(key, data)
+            self.hits += 1
+            return data
+        self.misses += 1
+        return None
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._items:
+                self._bytes -= len(self._items.pop(key))
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= len(old)
+
+    def put(self, key, data: bytes):
+        self._remember(key, data)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    def get_or_render(self, key, render):
+        """Cached bytes for key, calling render() -> bytes only on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def png(self, kind, render, *inputs, **params) -> bytes:
+        """PNG bytes of a figure, rendered by render() only when its inputs changed."""
+        return self.get_or_render(fingerprint("png", kind, *inputs, **params), render)
+
+    def plotly(self, kind, build, *inputs, **params):
+        """Plotly figure stored as JSON; build() -> figure only when its inputs changed."""
+        import plotly.io as pio
+        key = fingerprint("plotly", kind, *inputs, **params)
+        data = self.get_or_render(key, lambda: build().to_json().encode("utf-8"))
+        return pio.from_json(data.decode("utf-8"))
+
+    def plotly_png(self, fig, scale=2) -> bytes:
+        """Rasterize a Plotly figure (kaleido) once per distinct figure."""
+        import plotly.io as pio
+        spec = fig.to_json().encode("utf-8")
+        return self.get_or_render(fingerprint("plotly_png", spec, scale=scale),
+                                  lambda: pio.to_image(fig, format="png", scale=scale))
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._items), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_CACHE = RenderCache()
+
+
+def get_render_cache():
+    return _CACHE
@@ -3,7 +3,6 @@ from io import BytesIO
 from datetime import datetime
 
 import matplotlib.pyplot as plt
-import plotly.io as pio
 import streamlit as st
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -12,6 +11,7 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 
 # --- Local Imports ---
 from src.summary import generate_summary
+from src.render_cache import get_render_cache
 from src.visuals import (
     plot_emotion_trends,
     plot_dream_frequency,
@@ -21,11 +21,9 @@ from src.visuals import (
 # --- Utility Functions ---
 def save_plotly(fig):
     """Convert a Plotly figure to PNG using Kaleido."""
-    buf = BytesIO()
     try:
-        pio.write_image(fig, buf, format="png", scale=2)
-        buf.seek(0)
-        return buf
+        # Rasterized once per distinct figure (see src/render_cache.py)
+        return BytesIO(get_render_cache().plotly_png(fig, scale=2))
     except Exception as e:
         # fallback if kaleido not available
         st.warning(f"Plotly export failed: {e}")
@@ -62,7 +60,8 @@ def add_table_to_story(story, df, title, color=colors.lightgrey):
 
 
 # --- Core PDF Builder ---
-def build_pdf(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster_summary, meta=None):
+def build_pdf(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster_summary, meta=None,
+              symbol_stats=None, anomalies=None):
     """Generate a detailed Dream Journal NLP PDF report."""
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
@@ -85,10 +84,14 @@ def build_pdf(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster
 
     # --- Sentiment Trend (Matplotlib) ---
     try:
-        fig, ax = plt.subplots()
-        daily.plot(x="date", y="sentiment", ax=ax, legend=False)
-        ax.set_title("Daily Sentiment Trend")
-        story.append(Image(save_plot(fig), width=400, height=200))
+        def render_sentiment():
+            fig, ax = plt.subplots()
+            daily.plot(x="date", y="sentiment", ax=ax, legend=False)
+            ax.set_title("Daily Sentiment Trend")
+            return save_plot(fig).getvalue()
+
+        png = get_render_cache().png("daily_sentiment", render_sentiment, daily[["date", "sentiment"]])
+        story.append(Image(BytesIO(png), width=400, height=200))
     except Exception as e:
         story.append(Paragraph(f"Sentiment plot error: {e}", styles["Normal"]))
     story.append(Spacer(1, 12))
@@ -139,9 +142,19 @@ def build_pdf(df, daily, avg_emotions, keywords, topics, symbol_summary, cluster
     # --- Dream Symbol Summary ---
     add_table_to_story(story, symbol_summary, "🌙 Dream Dictionary Summary")
 
+    # --- Symbol Moods & Trends ---
+    if symbol_stats is not None and not symbol_stats.empty:
+        add_table_to_story(story, symbol_stats, "🔗 Symbol Moods & Recent Lift", color=colors.lavender)
+
+    # --- Flagged Episodes ---
+    if anomalies is not None and not anomalies.empty:
+        cols = ["signal", "kind", "start", "end", "entries", "mean", "baseline"]
+        add_table_to_story(story, anomalies[cols], "🚨 Nightmare Spikes & Mood Shifts", color=colors.mistyrose)
+
     # --- Cluster Summary ---
     if cluster_summary is not None and not cluster_summary.empty:
-        add_table_to_story(story, cluster_summary[["cluster", "size"]], "🧭 Cluster Summary")
+        cols = [c for c in ("cluster", "label", "size") if c in cluster_summary.columns]
+        add_table_to_story(story, cluster_summary[cols].rename(columns={"label": "top terms"}), "🧭 Cluster Summary")
     else:
         story.append(Paragraph("No cluster data available.", styles["Normal"]))
 
@@ -0,0 +1,56 @@
+# src/retrieval.py
+"""Pick the dreams that are relevant to a question and pack them into a token budget."""
+import numpy as np
+
+from .semantic import embed_texts
+
+SNIPPET_CHARS = 250
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def format_snippet(date, text, max_chars=SNIPPET_CHARS) -> str:
+    """One context line: '- (YYYY-MM-DD) first N chars...'"""
+    snippet = str(text)[:max_chars].replace("\n", " ")
+    return f"- ({str(date)[:10]}) {snippet}..."
+
+
+def rank_entries(question, embeddings, model=None):
+    """Entry indices sorted by cosine similarity to the question (best first)."""
+    q = embed_texts([str(question)], model=model)[0]
+    emb = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(emb, axis=1) * (np.linalg.norm(q) + 1e-12) + 1e-12
+    sims = (emb @ q) / norms
+    return np.argsort(-sims), sims
+
+
+def select_context(question, df, embeddings, token_budget=600, max_entries=20,
+                   snippet_chars=SNIPPET_CHARS, model=None):
+    """
+    Build the assistant context from the entries most similar to the question.
+    Snippets are added best-first until the token budget is used up, then
+    listed chronologically. Returns (context, selected row positions).
+    """
+    if df is None or df.empty:
+        return "", []
+    if embeddings is None or len(embeddings) != len(df):
+        embeddings = embed_texts(df["text"].astype(str).tolist(), model=model)
+
+    order, _ = rank_entries(question, embeddings, model=model)
+    dates = df["date"].tolist()
+    texts = df["text"].tolist()
+    chosen, used = [], 0
+    for i in order[:max_entries]:
+        line = format_snippet(dates[i], texts[i], snippet_chars)
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            continue
+        chosen.append(int(i))
+        used += cost
+
+    chosen.sort()  # df is date-sorted, so positions give chronological order
+    context = "\n".join(format_snippet(dates[i], texts[i], snippet_chars) for i in chosen)
+    return context, chosen
@@ -0,0 +1,176 @@
+# src/rollups.py
+"""Day / week / month rollups of sentiment and emotion scores.
+
+For every resolution and score series, each bucket keeps count, sum, sum of
+squares, min and max of the non-missing scores as compact float arrays, plus running (prefix) sums so
+count / mean / std over any bucket range are O(1). Min and max over a range
+are a vectorized reduction over the covered buckets. New entries are folded
+in with ``append`` without touching older buckets.
+"""
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = ("D", "W", "M")
+
+
+class _Level:
+    """Aggregates for one resolution; bucket i covers period ordinal origin + i."""
+
+    def __init__(self, freq, n_series):
+        self.freq = freq
+        self.origin = None
+        self.count = np.zeros((0, n_series), dtype=np.int64)
+        self.sum = np.zeros((0, n_series), dtype=np.float64)
+        self.sumsq = np.zeros((0, n_series), dtype=np.float64)
+        self.min = np.zeros((0, n_series), dtype=np.float32)
+        self.max = np.zeros((0, n_series), dtype=np.float32)
+        self._cum = None
+
+    def _grow(self, lo, hi):
+        """Make ordinals lo..hi addressable, padding with empty buckets."""
+        if self.origin is None:
+            self.origin = lo
+        front = max(self.origin - lo, 0)
+        back = max(hi - (self.origin + len(self.count) - 1), 0)
+        if front or back:
+            self.count = np.pad(self.count, ((front, back), (0, 0)))
+            self.sum = np.pad(self.sum, ((front, back), (0, 0)))
+            self.sumsq = np.pad(self.sumsq, ((front, back), (0, 0)))
+            self.min = np.pad(self.min, ((front, back), (0, 0)), constant_values=np.inf)
+            self.max = np.pad(self.max, ((front, back), (0, 0)), constant_values=-np.inf)
+            self.origin -= front
+            self._cum = None
+
+    def add(self, dates, values):
+        ordinals = pd.DatetimeIndex(dates).to_period(self.freq).asi8
+        if not len(ordinals):
+            return
+        self._grow(int(ordinals.min()), int(ordinals.max()))
+        idx = ordinals - self.origin
+        # A missing score (NaN, e.g. an entry the emotion model has not scored) counts for none of the stats
+        np.add.at(self.count, idx, (~np.isnan(values)).astype(np.int64))
+        filled = np.nan_to_num(values)
+        np.add.at(self.sum, idx, filled)
+        np.add.at(self.sumsq, idx, filled ** 2)
+        np.fmin.at(self.min, idx, values.astype(np.float32))
+        np.fmax.at(self.max, idx, values.astype(np.float32))
+        first = int(idx.min())
+        if self._cum is not None and first == len(self.count) - 1 and len(self._cum[0]) == len(self.count) + 1:
+            # Appending to the newest bucket only moves the last running total
+            self._cum[0][-1] = self._cum[0][-2] + self.count[-1]
+            self._cum[1][-1] = self._cum[1][-2] + self.sum[-1]
+            self._cum[2][-1] = self._cum[2][-2] + self.sumsq[-1]
+        else:
+            self._cum = None
+
+    def cumulative(self):
+        if self._cum is None:
+            pad = lambda a: np.concatenate([np.zeros((1,) + a.shape[1:], dtype=np.float64), np.cumsum(a, axis=0)])
+            self._cum = (pad(self.count), pad(self.sum), pad(self.sumsq))
+        return self._cum
+
+    def bucket_range(self, start, end):
+        if self.origin is None:
+            return 0, 0
+        a = 0 if start is None else pd.Period(start, self.freq).ordinal - self.origin
+        b = len(self.count) if end is None else pd.Period(end, self.freq).ordinal - self.origin + 1
+        return int(np.clip(a, 0, len(self.count))), int(np.clip(b, 0, len(self.count)))
+
+    def starts(self):
+        return pd.period_range(pd.Period(ordinal=self.origin, freq=self.freq),
+                               periods=len(self.count), freq=self.freq).to_timestamp()
+
+
+class Rollups:
+    def __init__(self, series):
+        self.series = list(series)
+        self.levels = {freq: _Level(freq, len(self.series)) for freq in RESOLUTIONS}
+
+    @classmethod
+    def from_frame(cls, df, series, date_col="date"):
+        rollups = cls(series)
+        rollups.append(df, date_col=date_col)
+        return rollups
+
+    def append(self, df, date_col="date"):
+        """Fold new entries (date + series columns) into every resolution."""
+        df = df.dropna(subset=[date_col])
+        dates = pd.to_datetime(df[date_col])
+        values = df[self.series].to_numpy(dtype=np.float64)
+        for level in self.levels.values():
+            level.add(dates, values)
+        return self
+
+    def frame(self, freq="D", stat="mean", series=None):
+        """Non-empty buckets as a frame: date (bucket start) + one column per series."""
+        level = self.levels[freq]
+        series = series or self.series
+        cols = [self.series.index(s) for s in series]
+        if level.origin is None:
+            return pd.DataFrame(columns=["date"] + series)
+        n = level.count.astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = {
+                "count": n,
+                "sum": level.sum,
+                "mean": level.sum / n,
+                "std": np.sqrt(np.maximum((level.sumsq - level.sum ** 2 / n) / (n - 1), 0)),
+                "min": np.where(level.count > 0, level.min, np.nan),
+                "max": np.where(level.count > 0, level.max, np.nan),
+            }[stat][:, cols]
+        out = pd.DataFrame(values, columns=series)
+        out.insert(0, "date", level.starts())
+        return out[level.count.any(axis=1)].reset_index(drop=True)
+
+    def daily(self, series="sentiment"):
+        """Same shape as df.groupby('date', as_index=False)[series].mean()."""
+        return self.frame("D", "mean", [series])
+
+    def range_stats(self, start=None, end=None, freq="D"):
+        """count / mean / std (ddof=1, like pandas) / min / max per series over [start, end]."""
+        level = self.levels[freq]
+        a, b = level.bucket_range(start, end)
+        cnt, s, sq = level.cumulative()
+        n = cnt[b] - cnt[a]
+        total = s[b] - s[a]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / n
+            std = np.sqrt(np.maximum((sq[b] - sq[a] - n * mean ** 2) / (n - 1), 0))
+        empty = b <= a
+        return pd.DataFrame({
+            "count": n.astype(np.int64),
+            "mean": mean,
+            "std": std,
+            "min": np.full(len(self.series), np.nan) if empty else np.where(n > 0, level.min[a:b].min(axis=0), np.nan),
+            "max": np.full(len(self.series), np.nan) if empty else np.where(n > 0, level.max[a:b].max(axis=0), np.nan),
+        }, index=self.series)
+
+    def means(self, series=None, start=None, end=None):
+        """Mean per series over a range (defaults to everything)."""
+        stats = self.range_stats(start, end)["mean"]
+        return stats if series is None else stats.loc[series]
+
+    def save(self, path):
+        arrays = {"series": np.array(self.series)}
+        for freq, level in self.levels.items():
+            if level.origin is None:
+                continue
+            arrays[f"{freq}_origin"] = np.array(level.origin)
+            for name in ("count", "sum", "sumsq", "min", "max"):
+                arrays[f"{freq}_{name}"] = getattr(level, name)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        rollups = cls(data["series"].tolist())
+        for freq, level in rollups.levels.items():
+            if f"{freq}_origin" not in data:
+                continue
+            level.origin = int(data[f"{freq}_origin"])
+            for name in ("count", "sum", "sumsq", "min", "max"):
+                setattr(level, name, data[f"{freq}_{name}"])
+            if level.count.ndim == 1:
+                # Saved before counts were kept per series
+                level.count = np.repeat(level.count[:, None], len(rollups.series), axis=1)
+        return rollups
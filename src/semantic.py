@@ -1,30 +1,30 @@
 # src/semantic.py
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
 
-# Model (singleton style)
-_MODEL = None
-def get_model(name="all-MiniLM-L6-v2"):
-    global _MODEL
-    if _MODEL is None:
-        _MODEL = SentenceTransformer(name)
-    return _MODEL
+from .models import DEFAULT_EMBEDDING_MODEL, get_model as _get_registry_model, encode
 
-def embed_texts(texts, model=None):
-    model = model or get_model()
-    return model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+# Model is shared through the process-wide registry (see src/models.py)
+def get_model(name=DEFAULT_EMBEDDING_MODEL):
+    return _get_registry_model("embedding", name)
 
-def build_embeddings_index(df, text_col="text", model=None):
-    model = model or get_model()
+def embed_texts(texts, model=None, batch_size=64):
+    if model is None:
+        return encode(texts, batch_size=batch_size)
+    return model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+def build_embeddings_index(df, text_col="text", model=None, checkpoint_dir=None, workers=None):
     texts = df[text_col].astype(str).tolist()
+    if checkpoint_dir is not None and model is None:
+        # Large backfills: chunked over worker processes, resumable from checkpoint_dir
+        from .embed_job import run_embedding_job
+        return run_embedding_job(texts, checkpoint_dir, workers=workers)
     embeddings = embed_texts(texts, model=model)
     return embeddings  # numpy array (n x dim)
 
 def semantic_search(query, df, embeddings, top_k=5, model=None):
-    model = model or get_model()
-    q_emb = model.encode([str(query)], convert_to_numpy=True)
+    q_emb = embed_texts([str(query)], model=model)
     sims = cosine_similarity(q_emb, embeddings)[0]
     idx_sorted = np.argsort(-sims)[:top_k]
     results = df.reset_index().loc[idx_sorted].copy()
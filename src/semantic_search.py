@@ -1,16 +1,35 @@
-from sentence_transformers import SentenceTransformer, util
+import hashlib
+
 import pandas as pd
+from sentence_transformers import util
+
+from .models import encode
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Corpus embeddings are reused across queries as long as the texts are unchanged
+_CORPUS_CACHE = {"key": None, "embeddings": None}
+
+def _corpus_key(texts):
+    h = hashlib.sha1()
+    for t in texts:
+        h.update(str(t).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
 
 def embed_texts(texts):
-    return model.encode(texts, convert_to_tensor=True, show_progress_bar=False)
+    return encode(texts)
+
+def corpus_embeddings(texts):
+    key = _corpus_key(texts)
+    if _CORPUS_CACHE["key"] != key:
+        _CORPUS_CACHE["embeddings"] = embed_texts(texts)
+        _CORPUS_CACHE["key"] = key
+    return _CORPUS_CACHE["embeddings"]
 
 def semantic_search(df: pd.DataFrame, query: str, top_k=5):
     if "text" not in df.columns:
         raise ValueError("DataFrame must contain a 'text' column")
     query_emb = embed_texts([query])
-    corpus_emb = embed_texts(df["text"].tolist())
+    corpus_emb = corpus_embeddings(df["text"].tolist())
     hits = util.semantic_search(query_emb, corpus_emb, top_k=top_k)[0]
     results = df.iloc[[h["corpus_id"] for h in hits]].copy()
     results["score"] = [h["score"] for h in hits]
@@ -0,0 +1,232 @@
+# src/service.py
+"""Optional local analysis service shared by all Streamlit sessions.
+
+Runs the heavy ``src`` stages in one process with the models preloaded, and
+combines concurrent requests for the same stage into shared inference batches:
+
+    python -m src.service --port 8765 --workers 2
+
+Point the app at it with ``DREAM_NLP_SERVICE_URL=http://127.0.0.1:8765``;
+``ServiceClient`` exposes the same stage signatures as the local functions.
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+class MicroBatcher:
+    """Collects items from concurrent callers and runs ``fn`` on them in shared batches."""
+
+    def __init__(self, fn, workers=2, max_batch=64, max_wait=0.01):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        for _ in range(workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, items):
+        fut = Future()
+        self._queue.put((list(items), fut))
+        return fut.result()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+
+            flat = [item for items, _ in jobs for item in items]
+            try:
+                out = self.fn(flat)
+            except Exception as e:
+                for _, fut in jobs:
+                    fut.set_exception(e)
+                continue
+            pos = 0
+            for items, fut in jobs:
+                fut.set_result(out[pos:pos + len(items)])
+                pos += len(items)
+
+
+# --- Stage implementations (run inside the service) ---
+def _sentiment_stage():
+    from .analyze import sentiment_scores  # also downloads the VADER lexicon
+    return lambda texts: sentiment_scores(texts).tolist()
+
+
+def _emotion_stage():
+    # Same tiers and batch size as local scoring (DREAM_NLP_EMOTION_TIER / _BATCH_SIZE)
+    from .emotions import default_tier, emotion_scores, load_emotion_model
+    if default_tier() != "fast":
+        load_emotion_model()
+
+    def score(texts):
+        labels, scores = emotion_scores(texts)
+        return [dict(zip(labels, row)) for row in scores.tolist()]
+    return score
+
+
+def _embedding_stage():
+    from .models import encode, get_model, DEFAULT_EMBEDDING_MODEL
+    get_model("embedding", DEFAULT_EMBEDDING_MODEL)
+    return lambda texts: encode(texts).tolist()
+
+
+def _symbol_stage():
+    from .symbols_ext import load_symbol_lexicon, count_symbols_in_text
+    lexicon = load_symbol_lexicon()
+    return lambda texts: [count_symbols_in_text(t, lexicon) for t in texts]
+
+
+def _cluster(payload):
+    from .clustering import cluster_with_kmeans
+    labels, km = cluster_with_kmeans(np.asarray(payload["embeddings"], dtype=np.float32),
+                                     n_clusters=int(payload.get("n_clusters", 6)))
+    return {"labels": labels.tolist(), "centers": km.cluster_centers_.tolist()}
+
+
+def build_batchers(workers=2, max_batch=64, max_wait=0.01):
+    """Preload every model and start a fixed worker pool per batched stage."""
+    stages = {
+        "sentiment": _sentiment_stage(),
+        "emotions": _emotion_stage(),
+        "embeddings": _embedding_stage(),
+        "symbols": _symbol_stage(),
+    }
+    return {name: MicroBatcher(fn, workers=workers, max_batch=max_batch, max_wait=max_wait)
+            for name, fn in stages.items()}
+
+
+def make_handler(batchers, cluster_slots):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "stages": sorted(batchers) + ["cluster"]})
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            stage = self.path.rstrip("/").rsplit("/", 1)[-1]
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if stage == "cluster":
+                    with cluster_slots:
+                        self._send(200, _cluster(payload))
+                elif stage in batchers:
+                    self._send(200, {"results": batchers[stage].submit(payload.get("texts", []))})
+                else:
+                    self._send(404, {"error": f"Unknown stage '{stage}'"})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8765, workers=2, max_batch=64, max_wait=0.01):
+    batchers = build_batchers(workers=workers, max_batch=max_batch, max_wait=max_wait)
+    server = ThreadingHTTPServer((host, port), make_handler(batchers, threading.Semaphore(workers)))
+    print(f"✅ Analysis service listening on http://{host}:{port}")
+    server.serve_forever()
+
+
+# --- Thin client used by the app ---
+class ServiceClient:
+    """Same signatures as the local stage functions, backed by the service."""
+
+    def __init__(self, url, timeout=300.0):
+        import httpx
+        self.url = url.rstrip("/")
+        self._http = httpx.Client(timeout=timeout)
+
+    def _post(self, stage, payload):
+        r = self._http.post(f"{self.url}/v1/{stage}", json=payload)
+        if r.status_code != 200:
+            # A proxy or gateway in front of the service may answer with HTML or plain text
+            try:
+                body = r.json()
+            except ValueError:
+                body = None
+            error = body.get("error") if isinstance(body, dict) else None
+            raise RuntimeError(f"Analysis service error ({stage}): HTTP {r.status_code}: "
+                               f"{error or r.text[:200] or r.reason_phrase}")
+        return r.json()
+
+    def _texts(self, stage, df, text_col="text"):
+        return self._post(stage, {"texts": df[text_col].astype(str).tolist()})["results"]
+
+    def compute_sentiment(self, df):
+        df = df.copy()
+        df["sentiment"] = self._texts("sentiment", df)
+        return df
+
+    def analyze_emotions(self, df, text_col="text"):
+        scores_df = pd.DataFrame(self._texts("emotions", df, text_col))
+        scores_df = scores_df[sorted(scores_df.columns)]
+        return pd.concat([df.reset_index(drop=True), scores_df], axis=1)
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True, show_progress_bar=False):
+        # Lets the client stand in for the sentence-transformer `model` argument
+        return np.asarray(self._post("embeddings", {"texts": [str(t) for t in texts]})["results"],
+                          dtype=np.float32)
+
+    def build_embeddings_index(self, df, text_col="text", model=None):
+        return np.asarray(self._texts("embeddings", df, text_col), dtype=np.float32)
+
+    def symbol_summary_for_df(self, df, lexicon=None):
+        from .symbols_ext import load_symbol_lexicon, symbol_totals
+        if lexicon is None:
+            lexicon = load_symbol_lexicon()
+        counts_df = pd.DataFrame(self._texts("symbols", df)).fillna(0).astype(int)
+        return counts_df, symbol_totals(counts_df, lexicon)
+
+    def cluster_with_kmeans(self, embeddings, n_clusters=6, random_state=42):
+        from types import SimpleNamespace
+        body = self._post("cluster", {"embeddings": np.asarray(embeddings).tolist(), "n_clusters": n_clusters})
+        return np.asarray(body["labels"]), SimpleNamespace(cluster_centers_=np.asarray(body["centers"]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Shared Dream Journal NLP analysis service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=2, help="Worker threads per stage")
+    ap.add_argument("--max-batch", type=int, default=64, help="Max texts per shared inference batch")
+    ap.add_argument("--max-wait-ms", type=float, default=10.0, help="How long to wait to fill a batch")
+    args = ap.parse_args()
+    serve(args.host, args.port, args.workers, args.max_batch, args.max_wait_ms / 1000.0)
+
+
+if __name__ == "__main__":
+    main()
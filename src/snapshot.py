@@ -0,0 +1,197 @@
+# src/snapshot.py
+"""Precomputed analysis snapshot of the bundled sample journal.
+
+Without an upload the app analyzes data/sample_dreams.csv, which on a cold
+container means downloading models and running the transformer, LDA and
+Prophet before the demo shows anything. ``python -m src.snapshot`` runs those
+stages once at build time, exactly as the app's full (unfiltered) view does,
+and writes them to a snapshot directory:
+
+- manifest.json: format version, sample file hash, model / library versions,
+  emotion labels, topics, forecast summary
+- arrays.npz: sentiment, emotion scores, embeddings, cluster labels
+- clusters.json, forecast.png
+
+``load_snapshot`` returns it only while it still matches the sample file and
+the current model configuration; the app then registers the results as
+finished background jobs (see src/jobs.py) instead of computing them.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 2
+DEFAULT_SNAPSHOT_DIR = os.path.join("data", "snapshot")
+# The app's defaults for the stages stored in the snapshot
+N_TOPICS, N_TOP_WORDS, N_CLUSTERS = 4, 8, 6
+_PACKAGES = ["sentence-transformers", "transformers", "onnxruntime", "nltk", "scikit-learn", "prophet"]
+
+
+def file_sha1(path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def model_versions() -> dict:
+    """Everything the stored scores depend on besides the journal itself."""
+    from .emotions import default_tier
+    from .models import DEFAULT_EMBEDDING_MODEL, DEFAULT_EMOTION_MODEL
+    from .onnx_backend import backend, use_quantized
+    versions = {"embedding_model": DEFAULT_EMBEDDING_MODEL, "emotion_model": DEFAULT_EMOTION_MODEL,
+                "backend": backend(), "onnx_quantized": backend() == "onnx" and use_quantized(),
+                "emotion_tier": default_tier()}
+    if default_tier() != "accurate":
+        from .emotion_lexicon import DEFAULT_LEXICON
+        versions["emotion_lexicon"] = file_sha1(os.getenv("DREAM_NLP_EMOTION_LEXICON", DEFAULT_LEXICON))
+    for package in _PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def prepare_journal(df) -> pd.DataFrame:
+    """Dated, date-sorted entries, as run_analysis orders them."""
+    from .analyze import ensure_datetime
+    df = df.copy()
+    df["date"] = ensure_datetime(df["date"])
+    return df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
+
+
+def build_snapshot(sample_path, outdir=DEFAULT_SNAPSHOT_DIR, progress=print):
+    """Run every heavy stage on the sample journal and write the snapshot to outdir."""
+    from .analyze import topic_model
+    from .clustering import cluster_with_kmeans, label_clusters_by_top_terms
+    from .corpus import DreamCorpus, score_emotions, score_sentiment
+    from .forecast import forecast_emotions
+    from .ingest import load_journal
+    from .keyword_index import KeywordIndex
+    from .rollups import Rollups
+    from .semantic import embed_texts
+
+    df, _ = load_journal(sample_path)
+    df = prepare_journal(df)
+    corpus = DreamCorpus.from_frame(df)
+    timings = {}
+
+    def stage(name, fn):
+        started = time.perf_counter()
+        out = fn()
+        timings[name] = round(time.perf_counter() - started, 2)
+        if progress:
+            progress(f"{name}: {timings[name]:.2f}s")
+        return out
+
+    stage("sentiment", lambda: score_sentiment(corpus))
+    labels = stage("emotions", lambda: score_emotions(corpus))
+    embeddings = stage("embeddings", lambda: np.asarray(embed_texts(corpus.texts.tolist()), dtype=np.float32))
+    topics = stage("topics", lambda: topic_model(corpus.to_frame(["sentiment"]), n_topics=N_TOPICS,
+                                                  n_top_words=N_TOP_WORDS))
+    cluster_labels, km = stage("clusters", lambda: cluster_with_kmeans(embeddings, n_clusters=N_CLUSTERS))
+    kw_index = KeywordIndex.from_frame(df)
+    cluster_summary = label_clusters_by_top_terms(corpus.to_frame([]), cluster_labels, embeddings=embeddings,
+                                                  centers=km.cluster_centers_, doc_terms=kw_index.doc_terms,
+                                                  vocab=kw_index.vocab)
+    daily = Rollups.from_frame(corpus.to_frame(["sentiment"] + labels), ["sentiment"] + labels).daily()
+    forecast_png, forecast_summary = stage("forecast", lambda: forecast_emotions(daily))
+
+    tmp = f"{outdir}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.savez(os.path.join(tmp, "arrays.npz"), sentiment=corpus.column("sentiment"),
+             emotions=np.column_stack([corpus.column(label) for label in labels]),
+             embeddings=embeddings, cluster_labels=np.asarray(cluster_labels, dtype=np.int32))
+    cluster_summary.to_json(os.path.join(tmp, "clusters.json"), orient="records")
+    with open(os.path.join(tmp, "forecast.png"), "wb") as f:
+        f.write(forecast_png.getvalue())
+    manifest = {"version": SNAPSHOT_VERSION, "sample_sha1": file_sha1(sample_path), "n": len(corpus),
+                "versions": model_versions(), "emotion_labels": labels, "topics": topics,
+                "n_topics": N_TOPICS, "n_top_words": N_TOP_WORDS, "n_clusters": N_CLUSTERS,
+                "forecast_summary": forecast_summary, "timings": timings,
+                "created": pd.Timestamp.now(tz="UTC").isoformat()}
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, default=int)
+    # Swap the finished snapshot in whole: a reader never sees half of one
+    shutil.rmtree(outdir, ignore_errors=True)
+    os.replace(tmp, outdir)
+    return manifest
+
+
+def snapshot_problem(sample_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Why the snapshot cannot stand in for the sample analysis (None when it can)."""
+    path = os.path.join(snapshot_dir, "manifest.json")
+    if not os.path.exists(path):
+        return f"no snapshot in {snapshot_dir}"
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        return f"snapshot format {manifest.get('version')} (expected {SNAPSHOT_VERSION})"
+    if manifest.get("sample_sha1") != file_sha1(sample_path):
+        return f"{sample_path} changed since the snapshot was built"
+    current = model_versions()
+    changed = sorted(k for k in set(current) | set(manifest.get("versions", {}))
+                     if current.get(k) != manifest["versions"].get(k))
+    if changed:
+        return "model configuration changed: " + ", ".join(changed)
+    return None
+
+
+def load_snapshot(sample_path, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """The stored stage results for sample_path, or None if missing or stale."""
+    if snapshot_problem(sample_path, snapshot_dir) is not None:
+        return None
+    with open(os.path.join(snapshot_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    with np.load(os.path.join(snapshot_dir, "arrays.npz")) as arrays:
+        snapshot = {name: arrays[name] for name in arrays.files}
+    with open(os.path.join(snapshot_dir, "forecast.png"), "rb") as f:
+        snapshot["forecast_png"] = f.read()
+    snapshot["cluster_summary"] = pd.read_json(os.path.join(snapshot_dir, "clusters.json"), orient="records")
+    snapshot["manifest"] = manifest
+    return snapshot
+
+
+def seed_jobs(runner, snapshot, dataset_key, full_key):
+    """Register the snapshot's results under the job names run_analysis submits for the full view."""
+    manifest = snapshot["manifest"]
+    runner.put(f"emotions:{dataset_key}", (manifest["emotion_labels"], snapshot["emotions"]))
+    runner.put(f"embeddings:{dataset_key}", snapshot["embeddings"])
+    runner.put(f"topics:{full_key}", manifest["topics"])
+    runner.put(f"clusters:{full_key}:{manifest['n_clusters']}",
+               (snapshot["cluster_labels"], snapshot["cluster_summary"]))
+    runner.put(f"forecast:{full_key}", (io.BytesIO(snapshot["forecast_png"]), manifest["forecast_summary"]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build (or check) the precomputed sample-journal snapshot")
+    ap.add_argument("--input", default=os.path.join("data", "sample_dreams.csv"))
+    ap.add_argument("--outdir", default=DEFAULT_SNAPSHOT_DIR)
+    ap.add_argument("--check", action="store_true", help="Only report whether the snapshot is current")
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the snapshot is current")
+    args = ap.parse_args()
+
+    problem = snapshot_problem(args.input, args.outdir)
+    if args.check:
+        print(f"Snapshot is stale: {problem}" if problem else f"Snapshot in {args.outdir} is current.")
+        raise SystemExit(1 if problem else 0)
+    if problem is None and not args.force:
+        print(f"Snapshot in {args.outdir} is current (use --force to rebuild).")
+        return
+    manifest = build_snapshot(args.input, args.outdir)
+    print(f"Saved: {args.outdir} ({manifest['n']} entries, {sum(manifest['timings'].values()):.1f}s of stages)")
+
+
+if __name__ == "__main__":
+    main()
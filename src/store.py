@@ -0,0 +1,258 @@
+# src/store.py
+"""Append-only SQLite journal store with incrementally maintained aggregates.
+
+Each new entry is analyzed once when it is inserted (sentiment, symbols,
+tokens and optionally emotions) and folded into materialized aggregates:
+per-day sentiment sum/count, per-symbol totals, token counts and per-emotion
+sums, and per-day symbol counts. Dashboards read the aggregates directly, so
+adding an entry costs O(1) work instead of a re-analysis of the whole history.
+
+    python -m src.store add --db journal.db --input new_dreams.csv
+    python -m src.store report --db journal.db --outdir reports
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from .analyze import compute_sentiment, ensure_datetime, save_csv
+from .ingest import load_journal_cli
+from .preprocess import preprocess_text
+from .symbols_ext import count_symbols_in_text, load_symbol_lexicon
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT UNIQUE NOT NULL,
+    date TEXT NOT NULL,
+    text TEXT NOT NULL,
+    sentiment REAL,
+    emotions TEXT,
+    symbols TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_date ON entries(date);
+CREATE TABLE IF NOT EXISTS daily_sentiment (date TEXT PRIMARY KEY, sum REAL NOT NULL, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS symbol_totals (symbol_group TEXT PRIMARY KEY, total_count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS token_counts (token TEXT PRIMARY KEY, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS emotion_sums (emotion TEXT PRIMARY KEY, sum REAL NOT NULL, count INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS symbol_daily (
+    date TEXT NOT NULL,
+    symbol_group TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (date, symbol_group)
+);
+"""
+
+
+def entry_hash(date, text) -> str:
+    return hashlib.sha1(f"{pd.Timestamp(date).date()}\0{text}".encode("utf-8")).hexdigest()
+
+
+class JournalStore:
+    def __init__(self, path="journal.db", lexicon=None):
+        self.path = path
+        self.lexicon = lexicon if lexicon is not None else load_symbol_lexicon()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._backfill_symbol_daily()
+
+    def _backfill_symbol_daily(self):
+        # Stores created before the per-day symbol table fill it once from the stored entries
+        if self._conn.execute("SELECT 1 FROM symbol_daily LIMIT 1").fetchone() is not None:
+            return
+        counts = Counter()
+        for day, symbols in self._conn.execute("SELECT date, symbols FROM entries"):
+            for group, c in json.loads(symbols or "{}").items():
+                if c:
+                    counts[day, group] += c
+        with self._conn:
+            self._conn.executemany("INSERT INTO symbol_daily VALUES (?, ?, ?)",
+                                   [(d, g, int(c)) for (d, g), c in counts.items()])
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # --- Writes ---
+    def add_entries(self, df: pd.DataFrame, with_emotions=True, emotion_tier=None) -> int:
+        """Analyze and insert entries not stored yet; returns how many were added."""
+        df = df[["date", "text"]].copy()
+        df["date"] = ensure_datetime(df["date"])
+        df = df.dropna(subset=["date"]).reset_index(drop=True)
+        df["text"] = df["text"].astype(str)
+        df["hash"] = [entry_hash(d, t) for d, t in zip(df["date"], df["text"])]
+        df = df.drop_duplicates("hash")
+
+        with self._lock:
+            known = self._known(df["hash"].tolist())
+        new = df[~df["hash"].isin(known)].reset_index(drop=True)
+        if new.empty:
+            return 0
+
+        # Per-entry analysis, once per new entry only
+        new = compute_sentiment(new)
+        symbols = [count_symbols_in_text(t, self.lexicon) for t in new["text"]]
+        tokens = [[t for t in preprocess_text(text) if len(t) > 2] for text in new["text"]]
+        emotions = [{} for _ in range(len(new))]
+        if with_emotions:
+            from .emotions import analyze_emotions
+            emo = analyze_emotions(new[["date", "text"]], tier=emotion_tier)
+            labels = [c for c in emo.columns if c not in ("date", "text")]
+            emotions = emo[labels].to_dict("records")
+
+        with self._lock, self._conn:
+            # Another writer may have stored some of them during the analysis: re-check under the
+            # write lock and fold only the entries inserted here into the aggregates
+            self._conn.execute("BEGIN IMMEDIATE")
+            stored = self._known(new["hash"].tolist())
+            if stored:
+                keep = ~new["hash"].isin(stored).to_numpy()
+                new = new[keep].reset_index(drop=True)
+                symbols, tokens, emotions = ([v for v, k in zip(values, keep) if k]
+                                             for values in (symbols, tokens, emotions))
+                if new.empty:
+                    return 0
+            self._insert(new, symbols, tokens, emotions)
+        return len(new)
+
+    def _known(self, hashes):
+        """The stored hashes among hashes (call with the lock held)."""
+        known = set()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT hash FROM entries WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            known.update(h for (h,) in rows)
+        return known
+
+    def _insert(self, new, symbols, tokens, emotions):
+        """Insert analyzed entries and fold them into the aggregates (inside the write transaction)."""
+        days = new["date"].dt.strftime("%Y-%m-%d")
+        daily = new.groupby(days)["sentiment"].agg(["sum", "count"])
+        symbol_sums, symbol_days = Counter(), Counter()
+        for day, counts in zip(days, symbols):
+            symbol_sums.update(counts)
+            symbol_days.update({(day, g): c for g, c in counts.items() if c})
+        emotion_sums = Counter()
+        emotion_counts = Counter()
+        for scores in emotions:
+            emotion_sums.update(scores)
+            emotion_counts.update(scores.keys())
+        token_counts = Counter(t for row in tokens for t in row)
+
+        self._conn.executemany(
+            "INSERT INTO entries(hash, date, text, sentiment, emotions, symbols) VALUES (?, ?, ?, ?, ?, ?)",
+            [(h, d, t, float(s), json.dumps(e), json.dumps(sym))
+             for h, d, t, s, e, sym in zip(new["hash"], days, new["text"], new["sentiment"], emotions, symbols)])
+        self._conn.executemany(
+            "INSERT INTO daily_sentiment VALUES (?, ?, ?) ON CONFLICT(date) DO UPDATE "
+            "SET sum = sum + excluded.sum, count = count + excluded.count",
+            [(d, float(r["sum"]), int(r["count"])) for d, r in daily.iterrows()])
+        self._conn.executemany(
+            "INSERT INTO symbol_totals VALUES (?, ?) ON CONFLICT(symbol_group) DO UPDATE "
+            "SET total_count = total_count + excluded.total_count",
+            [(g, int(c)) for g, c in symbol_sums.items()])
+        self._conn.executemany(
+            "INSERT INTO symbol_daily VALUES (?, ?, ?) ON CONFLICT(date, symbol_group) DO UPDATE "
+            "SET count = count + excluded.count",
+            [(d, g, int(c)) for (d, g), c in symbol_days.items()])
+        self._conn.executemany(
+            "INSERT INTO token_counts VALUES (?, ?) ON CONFLICT(token) DO UPDATE "
+            "SET count = count + excluded.count",
+            list(token_counts.items()))
+        self._conn.executemany(
+            "INSERT INTO emotion_sums VALUES (?, ?, ?) ON CONFLICT(emotion) DO UPDATE "
+            "SET sum = sum + excluded.sum, count = count + excluded.count",
+            [(e, float(emotion_sums[e]), int(emotion_counts[e])) for e in emotion_sums])
+
+    # --- Reads (aggregates) ---
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def daily(self) -> pd.DataFrame:
+        """Same shape as groupby('date')['sentiment'].mean(): columns date, sentiment."""
+        rows = self._query("SELECT date, sum / count FROM daily_sentiment ORDER BY date")
+        daily = pd.DataFrame(rows, columns=["date", "sentiment"])
+        daily["date"] = pd.to_datetime(daily["date"], format="%Y-%m-%d")
+        return daily
+
+    def top_keywords(self, n=30) -> pd.DataFrame:
+        rows = self._query("SELECT token, count FROM token_counts ORDER BY count DESC, token LIMIT ?", (n,))
+        return pd.DataFrame(rows, columns=["token", "count"])
+
+    def symbol_totals(self) -> pd.DataFrame:
+        rows = self._query("SELECT symbol_group, total_count FROM symbol_totals ORDER BY total_count DESC")
+        totals = pd.DataFrame(rows, columns=["symbol_group", "total_count"])
+        totals["meaning"] = [self.lexicon.get(g, {}).get("meaning", "") for g in totals["symbol_group"]]
+        return totals
+
+    def symbol_timeline(self) -> pd.DataFrame:
+        """Same shape as symbols.py's timeline: date plus one count column per symbol group."""
+        days = [d for (d,) in self._query("SELECT date FROM daily_sentiment ORDER BY date")]
+        rows = self._query("SELECT date, symbol_group, count FROM symbol_daily")
+        counts = pd.DataFrame(rows, columns=["date", "symbol_group", "count"])
+        timeline = (counts.pivot_table(index="date", columns="symbol_group", values="count", aggfunc="sum")
+                    .reindex(index=days, columns=list(self.lexicon)).fillna(0).astype(int))
+        timeline = timeline.rename_axis(index="date", columns=None).reset_index()
+        timeline["date"] = pd.to_datetime(timeline["date"], format="%Y-%m-%d")
+        return timeline
+
+    def avg_emotions(self) -> pd.DataFrame:
+        rows = self._query("SELECT emotion, sum / count FROM emotion_sums ORDER BY sum / count DESC")
+        return pd.DataFrame(rows, columns=["emotion", "average_score"])
+
+    def emotion_labels(self):
+        return [e for (e,) in self._query("SELECT emotion FROM emotion_sums ORDER BY emotion")]
+
+    def texts(self) -> pd.DataFrame:
+        """date / text of every stored entry (no scores)."""
+        rows = self._query("SELECT date, text FROM entries ORDER BY date, id")
+        df = pd.DataFrame(rows, columns=["date", "text"])
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+        return df
+
+    def entries(self) -> pd.DataFrame:
+        """Stored entries with their per-entry sentiment and emotion scores."""
+        rows = self._query("SELECT date, text, sentiment, emotions FROM entries ORDER BY date, id")
+        df = pd.DataFrame(rows, columns=["date", "text", "sentiment", "emotions"])
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+        emo = pd.DataFrame([json.loads(e or "{}") for e in df.pop("emotions")], columns=self.emotion_labels())
+        return pd.concat([df, emo], axis=1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Append-only journal store")
+    ap.add_argument("command", choices=["add", "report"])
+    ap.add_argument("--db", default="journal.db", help="SQLite database path")
+    ap.add_argument("--input", help="Journal file or Markdown folder to add (for 'add')")
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--no-emotions", action="store_true", help="Skip transformer emotion scoring")
+    args = ap.parse_args()
+
+    store = JournalStore(args.db)
+    if args.command == "add":
+        if not args.input:
+            raise ValueError("--input is required for 'add'")
+        df = load_journal_cli(args, sort=False)
+        added = store.add_entries(df, with_emotions=not args.no_emotions)
+        print(f"✅ Added {added} new entries ({len(store)} total) to {args.db}")
+    else:
+        save_csv(store.daily(), os.path.join(args.outdir, "daily_sentiment.csv"))
+        save_csv(store.top_keywords(40), os.path.join(args.outdir, "top_keywords.csv"))
+        save_csv(store.symbol_totals(), os.path.join(args.outdir, "symbols_totals.csv"))
+        save_csv(store.symbol_timeline(), os.path.join(args.outdir, "symbols_timeline.csv"))
+        save_csv(store.avg_emotions(), os.path.join(args.outdir, "avg_emotions.csv"))
+        print(f"✅ Wrote aggregate reports to {args.outdir}")
+
+
+if __name__ == "__main__":
+    main()
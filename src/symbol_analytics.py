@@ -0,0 +1,147 @@
+# src/symbol_analytics.py
+"""Symbol-group analytics on the sparse entries x symbol-groups count matrix.
+
+Counting tokenizes every entry once and maps single-word terms to groups with
+a sparse product (multi-word terms are matched on the original text);
+co-occurrence, period trends, lift and per-group scores are then matrix
+algebra on that matrix instead of per-row Python work.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+def _term_group_matrix(lexicon):
+    """Vectorizer over the single-word lexicon terms, the (terms x groups) indicator matrix and the
+    multi-word terms as (pattern, group index) pairs."""
+    groups = list(lexicon)
+    analyzer = CountVectorizer().build_analyzer()
+    vocab, rows, cols, phrases = {}, [], [], []
+    for j, g in enumerate(groups):
+        for w in lexicon[g].get("words", []):
+            w = str(w)
+            if len(w.split()) > 1:
+                phrases.append((rf"\b{re.escape(w)}\b", j))
+                continue
+            term = " ".join(analyzer(w))
+            # Terms that do not survive tokenization (e.g. "kiss(ed)") can never
+            # match as whole words, same as their \b...\b regex
+            if not term or term != w.lower():
+                continue
+            rows.append(vocab.setdefault(term, len(vocab)))
+            cols.append(j)
+    vectorizer = CountVectorizer(vocabulary=vocab, lowercase=True)
+    T = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(max(len(vocab), 1), len(groups)))
+    return groups, vectorizer, T, phrases
+
+
+def symbol_matrix(texts, lexicon):
+    """Sparse (entries x groups) matrix of whole-word symbol counts, plus the group names."""
+    groups, vectorizer, T, phrases = _term_group_matrix(lexicon)
+    texts = pd.Series(texts).fillna("").astype(str)
+    M = sp.csr_matrix((len(texts), len(groups)), dtype=np.int32)
+    if T.nnz:
+        M = vectorizer.transform(texts) @ T
+    # Multi-word terms are counted on the original text like their \b...\b regex: token n-grams
+    # would also match across line breaks, punctuation and runs of spaces
+    rows, cols, counts = [], [], []
+    for pattern, j in phrases:
+        c = texts.str.count(pattern, flags=re.I).to_numpy()
+        hit = np.flatnonzero(c)
+        rows.append(hit)
+        cols.append(np.full(len(hit), j))
+        counts.append(c[hit])
+    if phrases:
+        M = M + sp.csr_matrix((np.concatenate(counts), (np.concatenate(rows), np.concatenate(cols))),
+                              shape=M.shape)
+    return M.astype(np.int32).tocsr(), groups
+
+
+def cooccurrence(M, groups):
+    """Number of entries in which each pair of groups appears together (diagonal: entries with the group)."""
+    B = (M > 0).astype(np.int32)
+    return pd.DataFrame((B.T @ B).toarray(), index=groups, columns=groups)
+
+
+def _period_matrix(dates, freq):
+    periods = pd.DatetimeIndex(dates).to_period(freq)
+    full = pd.period_range(periods.min(), periods.max(), freq=freq)
+    codes = periods.asi8 - full[0].ordinal
+    P = sp.csr_matrix((np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(len(full), len(codes)))
+    return P, full
+
+
+def period_frequency(dates, M, groups, freq="W", window=4):
+    """Symbol counts per period (W or M), and their rolling mean over ``window`` periods."""
+    P, full = _period_matrix(dates, freq)
+    counts = pd.DataFrame((P @ M).toarray() if sp.issparse(M) else P @ M, index=full.to_timestamp(), columns=groups)
+    counts.index.name = "period"
+    return counts, counts.rolling(window, min_periods=1).mean()
+
+
+def symbol_lift(dates, M, groups, freq="M"):
+    """Per-period share of entries containing each group, divided by its overall share."""
+    B = (M > 0).astype(np.float64)
+    P, full = _period_matrix(dates, freq)
+    entries = np.asarray(P.sum(axis=1)).ravel()
+    rate = (P @ B).toarray() / np.maximum(entries, 1)[:, None]
+    baseline = np.asarray(B.mean(axis=0)).ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = np.where(baseline > 0, rate / baseline, 0.0)
+    lift[entries == 0] = np.nan
+    out = pd.DataFrame(lift, index=full.to_timestamp(), columns=groups)
+    out.index.name = "period"
+    return out
+
+
+def symbol_scores(M, groups, scores: pd.DataFrame):
+    """Average of each score column (sentiment, emotions) over the entries containing each group."""
+    B = (M > 0).astype(np.float64)
+    S = scores.to_numpy(dtype=np.float64)
+    n = np.asarray(B.sum(axis=0)).ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = (B.T @ S) / n[:, None]
+    out = pd.DataFrame(means, index=groups, columns=scores.columns)
+    out.insert(0, "entries", n.astype(int))
+    out.index.name = "symbol_group"
+    return out.reset_index()
+
+
+def symbol_analytics(df, lexicon, score_cols=None):
+    """All symbol analytics for a frame with date, text and optional score columns."""
+    M, groups = symbol_matrix(df["text"], lexicon)
+    dates = pd.to_datetime(df["date"])
+    weekly, weekly_rolling = period_frequency(dates, M, groups, "W", window=4)
+    monthly, monthly_rolling = period_frequency(dates, M, groups, "M", window=3)
+    score_cols = [c for c in (score_cols or []) if c in df.columns]
+    return {
+        "matrix": M,
+        "groups": groups,
+        "cooccurrence": cooccurrence(M, groups),
+        "weekly": weekly,
+        "weekly_rolling": weekly_rolling,
+        "monthly": monthly,
+        "monthly_rolling": monthly_rolling,
+        "lift": symbol_lift(dates, M, groups, "M"),
+        "scores": symbol_scores(M, groups, df[score_cols]) if score_cols else pd.DataFrame(),
+    }
+
+
+def symbol_report_table(stats, round_to=3):
+    """Compact per-group table for reports: entries, avg sentiment, dominant emotion, latest lift."""
+    scores = stats["scores"]
+    if scores.empty:
+        return scores
+    table = scores[["symbol_group", "entries"]].copy()
+    if "sentiment" in scores.columns:
+        table["avg_sentiment"] = scores["sentiment"].round(round_to)
+    emotion_cols = [c for c in scores.columns if c not in ("symbol_group", "entries", "sentiment")]
+    if emotion_cols:
+        table["dominant_emotion"] = scores[emotion_cols].fillna(-1).idxmax(axis=1).where(scores["entries"] > 0, "")
+    lift = stats["lift"].dropna(how="all")
+    if not lift.empty:
+        table["latest_lift"] = lift.iloc[-1].reindex(table["symbol_group"]).round(2).to_numpy()
+    return table[table["entries"] > 0].sort_values("entries", ascending=False).reset_index(drop=True)
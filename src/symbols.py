@@ -1,48 +1,27 @@
 import argparse
 import os
-import re
-import yaml
 import pandas as pd
 
-def ensure_datetime(s: pd.Series) -> pd.Series:
-    return pd.to_datetime(s, errors="coerce")
-
-def load_lexicon(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    groups = data.get("groups", {})
-    compiled = {g: [re.compile(rf"\b{re.escape(term)}\b", re.I) for term in terms]
-                for g, terms in groups.items()}
-    return compiled
-
-def count_symbols(text: str, lex):
-    text = str(text)
-    out = {}
-    for group, patterns in lex.items():
-        c = 0
-        for p in patterns:
-            c += len(p.findall(text))
-        out[group] = c
-    return out
+from .symbols_ext import load_symbol_lexicon
+from .symbol_analytics import symbol_analytics
+from .ingest import add_input_args, load_journal_cli
 
 def main():
     ap = argparse.ArgumentParser(description="Symbol/archetype counter")
-    ap.add_argument("--input", required=True, help="CSV with columns: date,text")
-    ap.add_argument("--lex", required=True, help="YAML lexicon")
+    add_input_args(ap, dedup=True)
+    ap.add_argument("--lex", required=True,
+                    help="YAML lexicon: groups -> {words, meaning} (or, older format, a list of words)")
     ap.add_argument("--outdir", default="reports")
     args = ap.parse_args()
 
     os.makedirs(args.outdir, exist_ok=True)
-    df = pd.read_csv(args.input)
-    if not {"date","text"}.issubset(df.columns):
-        raise ValueError("Input CSV must include date,text")
+    df = load_journal_cli(args)
 
-    df["date"] = ensure_datetime(df["date"])
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
-    lex = load_lexicon(args.lex)
-    symbol_rows = df["text"].apply(lambda t: count_symbols(t, lex)).apply(pd.Series)
-    symbol_rows = symbol_rows.fillna(0).astype(int)
+    lexicon = load_symbol_lexicon(args.lex)
+    # Score columns (e.g. from dreams_with_emotions.csv) get per-symbol averages
+    score_cols = [c for c in df.columns if c not in ("date", "text") and pd.api.types.is_numeric_dtype(df[c])]
+    stats = symbol_analytics(df, lexicon, score_cols=score_cols)
+    symbol_rows = pd.DataFrame(stats["matrix"].toarray(), columns=stats["groups"])
     per_entry = pd.concat([df[["date","text"]], symbol_rows], axis=1)
     per_entry.to_csv(os.path.join(args.outdir, "symbols_per_entry.csv"), index=False)
 
@@ -54,10 +33,19 @@ def main():
     totals = totals.sort_values("total_count", ascending=False)
     totals.to_csv(os.path.join(args.outdir, "symbols_totals.csv"), index=False)
 
+    stats["cooccurrence"].to_csv(os.path.join(args.outdir, "symbols_cooccurrence.csv"))
+    stats["weekly_rolling"].to_csv(os.path.join(args.outdir, "symbols_weekly.csv"))
+    stats["monthly_rolling"].to_csv(os.path.join(args.outdir, "symbols_monthly.csv"))
+    stats["lift"].to_csv(os.path.join(args.outdir, "symbols_lift.csv"))
+    if not stats["scores"].empty:
+        stats["scores"].to_csv(os.path.join(args.outdir, "symbols_scores.csv"), index=False)
+
     print("Saved:")
     print(f"- {os.path.join(args.outdir, 'symbols_per_entry.csv')}")
     print(f"- {os.path.join(args.outdir, 'symbols_timeline.csv')}")
     print(f"- {os.path.join(args.outdir, 'symbols_totals.csv')}")
+    for name in ["symbols_cooccurrence.csv", "symbols_weekly.csv", "symbols_monthly.csv", "symbols_lift.csv"]:
+        print(f"- {os.path.join(args.outdir, name)}")
 
 if __name__ == "__main__":
     main()
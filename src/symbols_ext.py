@@ -10,9 +10,12 @@ def load_symbol_lexicon(path="config/symbols.yaml"):
     # Precompile regex lists
     compiled = {}
     for g, info in groups.items():
+        if isinstance(info, list):
+            info = {"words": info}  # older lexicons: group -> list of words, no meaning
         words = info.get("words", [])
         patterns = [re.compile(rf"\b{re.escape(w)}\b", re.I) for w in words]
         compiled[g] = {
+            "words": words,
             "patterns": patterns,
             "meaning": info.get("meaning", "")
         }
@@ -32,7 +35,13 @@ def symbol_summary_for_df(df, lexicon=None):
     # returns per-entry counts, totals and a per-group meaning table
     if lexicon is None:
         lexicon = load_symbol_lexicon()
-    counts_df = df["text"].apply(lambda t: count_symbols_in_text(t, lexicon)).apply(pd.Series).fillna(0).astype(int)
+    from .symbol_analytics import symbol_matrix
+    M, groups = symbol_matrix(df["text"], lexicon)
+    counts_df = pd.DataFrame(M.toarray(), columns=groups, index=df.index)
+    return counts_df, symbol_totals(counts_df, lexicon)
+
+def symbol_totals(counts_df, lexicon):
+    # totals per symbol group with its meaning attached
     totals = counts_df.sum().sort_values(ascending=False).rename_axis("symbol_group").reset_index(name="total_count")
     # attach meaning
     meanings = []
@@ -40,4 +49,4 @@ def symbol_summary_for_df(df, lexicon=None):
         m = lexicon.get(g, {}).get("meaning", "")
         meanings.append(m)
     totals["meaning"] = meanings
-    return counts_df, totals
+    return totals
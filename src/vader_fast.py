@@ -0,0 +1,244 @@
+# src/vader_fast.py
+"""Batched, VADER-compatible sentiment scoring.
+
+NLTK's ``SentimentIntensityAnalyzer`` walks every token in Python. Here a batch
+of entries is split on whitespace (``str.split``, as SentiText does) into one
+flat token array that is factorized once, so the string rules run once per
+distinct token. The lexicon, booster and negation lists are compiled into
+per-vocabulary lookup arrays, and VADER's rules run as NumPy passes over all
+tokens at once: ALL-CAPS emphasis, the three-token booster / negation window,
+"never so", "least", the first-"but" reweighting and punctuation emphasis.
+The rare idiom windows are delegated to NLTK's own ``_idioms_check``.
+
+Like NLTK, a repeated token is scored with the context of its first
+occurrence in the entry.
+"""
+import argparse
+import json
+import os
+import re
+import string
+import time
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+_C = VaderConstants
+_PUNCT = re.escape(string.punctuation)
+_PUNC_ALT = "|".join(re.escape(p) for p in sorted(_C.PUNC_LIST, key=len, reverse=True))
+# A token is reduced to its word when exactly one PUNC_LIST item is attached to
+# a punctuation-free word of 2+ characters (SentiText._words_and_emoticons)
+_STRIP = re.compile(rf"^(?:{_PUNC_ALT})([^{_PUNCT}]{{2,}})$|^([^{_PUNCT}]{{2,}})(?:{_PUNC_ALT})$")
+_IDIOM_WORDS = {w for phrase in list(_C.SPECIAL_CASE_IDIOMS) + [b for b in _C.BOOSTER_DICT if " " in b]
+                for w in phrase.split()}
+
+
+@lru_cache(maxsize=1)
+def _analyzer():
+    return SentimentIntensityAnalyzer()
+
+
+def _strip(token):
+    m = _STRIP.match(token)
+    return (m.group(1) or m.group(2)) if m else token
+
+
+def _tokens(texts):
+    """Token ids (SentiText rules), their vocabulary and the entry of each token."""
+    split = [t.split() for t in texts]
+    lengths = np.fromiter(map(len, split), dtype=np.int64, count=len(split))
+    flat = np.fromiter(chain.from_iterable(split), dtype=object, count=int(lengths.sum()))
+    doc = np.repeat(np.arange(len(texts)), lengths)
+    raw_ids, raw_vocab = pd.factorize(flat)
+    # String rules run once per distinct raw token, not once per occurrence
+    keep = np.array([len(w) > 1 for w in raw_vocab], dtype=bool)[raw_ids] if len(raw_vocab) else np.zeros(0, bool)
+    tok_of_raw, vocab = pd.factorize(np.array([_strip(w) for w in raw_vocab], dtype=object))
+    return tok_of_raw[raw_ids[keep]], list(vocab), doc[keep]
+
+
+def _shift(arr, k, fill):
+    """arr[g - k] at every flat position g (fill where that runs off the array)."""
+    out = np.full_like(arr, fill)
+    if k > 0:
+        out[k:] = arr[:-k]
+    elif k < 0:
+        out[:k] = arr[-k:]
+    else:
+        out[:] = arr
+    return out
+
+
+def _round(values, digits):
+    # Python's round() (correctly rounded), which np.round does not always match
+    return np.array([round(x, digits) for x in values.tolist()], dtype=np.float64)
+
+
+def polarity_scores(texts) -> pd.DataFrame:
+    """neg / neu / pos / compound for each text, as NLTK's polarity_scores."""
+    sia = _analyzer()
+    texts = [t if isinstance(t, str) else str(t) for t in texts]
+    n_docs = len(texts)
+    tok_ids, vocab, doc = _tokens(texts)
+    n = len(tok_ids)
+
+    # Lexicon, booster and negation rules compiled into per-vocabulary arrays
+    lex = sia.lexicon
+    lows = [w.lower() for w in vocab]
+    per_word = lambda f, dtype=bool: np.array([f(w, lw) for w, lw in zip(vocab, lows)], dtype=dtype)[tok_ids] \
+        if vocab else np.zeros(0, dtype=dtype)
+    val = per_word(lambda w, lw: lex.get(lw, np.nan), np.float64)
+    in_lex = ~np.isnan(val)
+    boost = per_word(lambda w, lw: _C.BOOSTER_DICT.get(lw, 0.0), np.float64)
+    is_boost = per_word(lambda w, lw: lw in _C.BOOSTER_DICT)
+    negated = per_word(lambda w, lw: lw in _C.NEGATE or "n't" in lw)
+    upper = per_word(lambda w, lw: w.isupper())
+    never = per_word(lambda w, lw: w == "never")
+    so_this = per_word(lambda w, lw: w in ("so", "this"))
+    is_kind = per_word(lambda w, lw: lw == "kind")
+    is_of = per_word(lambda w, lw: lw == "of")
+    is_least = per_word(lambda w, lw: lw == "least")
+    at_very = per_word(lambda w, lw: lw in ("at", "very"))
+    is_but = per_word(lambda w, lw: lw == "but")
+    near_idiom = per_word(lambda w, lw: w in _IDIOM_WORDS)
+
+    starts = np.searchsorted(doc, np.arange(n_docs))
+    pos = np.arange(n) - starts[doc] if n else np.zeros(0, dtype=np.int64)
+    doc_len = np.bincount(doc, minlength=n_docs)
+    n_upper = np.bincount(doc, weights=upper, minlength=n_docs)
+    cap_doc = (doc_len - n_upper > 0) & (doc_len - n_upper < doc_len)
+    cap = cap_doc[doc]
+
+    # "kind of" and booster words carry no valence themselves
+    kind_of = is_kind & _shift(is_of, -1, False) & (pos < doc_len[doc] - 1)
+    scored = in_lex & ~is_boost & ~kind_of
+
+    v = np.where(scored, val, 0.0)
+    emph = scored & upper & cap
+    v = np.where(emph, np.where(v > 0, v + _C.C_INCR, v - _C.C_INCR), v)
+
+    idiom_rows = []
+    for s in range(3):
+        k = s + 1
+        prev_in_lex = _shift(in_lex, k, True)
+        step = scored & (pos > s) & ~prev_in_lex
+        b = _shift(boost, k, 0.0)
+        scalar = np.where(v < 0, -b, b)
+        caps = _shift(is_boost & upper, k, False) & cap
+        scalar = np.where(caps, np.where(v > 0, scalar + _C.C_INCR, scalar - _C.C_INCR), scalar)
+        if s == 1:
+            scalar = scalar * 0.95
+        elif s == 2:
+            scalar = scalar * 0.9
+        v = np.where(step, v + scalar, v)
+
+        # _never_check
+        neg_k = _shift(negated, k, False)
+        if s == 0:
+            v = np.where(step & neg_k, v * _C.N_SCALAR, v)
+        elif s == 1:
+            boost15 = _shift(never, 2, False) & _shift(so_this, 1, False)
+            v = np.where(step & boost15, v * 1.5, np.where(step & ~boost15 & neg_k, v * _C.N_SCALAR, v))
+        else:
+            boost125 = (_shift(never, 3, False) & _shift(so_this, 2, False)) | _shift(so_this, 1, False)
+            v = np.where(step & boost125, v * 1.25, np.where(step & ~boost125 & neg_k, v * _C.N_SCALAR, v))
+            idiom_rows = np.flatnonzero(step)
+
+    # _idioms_check only matters when an idiom / booster-bigram word is nearby
+    if len(idiom_rows):
+        window = np.zeros(n, dtype=bool)
+        for k in range(-2, 4):
+            window |= _shift(near_idiom, k, False)
+        for g in idiom_rows[window[idiom_rows]]:
+            words = [vocab[t] for t in tok_ids[starts[doc[g]]:starts[doc[g]] + doc_len[doc[g]]]]
+            v[g] = sia._idioms_check(v[g], words, int(pos[g]))
+
+    # _least_check
+    prev_least = _shift(is_least, 1, False) & ~_shift(in_lex, 1, True)
+    not_at_very = ~_shift(at_very, 2, False)
+    least = scored & prev_least & (((pos > 1) & not_at_very) | (pos == 1))
+    v = np.where(least, v * _C.N_SCALAR, v)
+
+    # Every occurrence of a token takes the valence of its first occurrence
+    key = doc.astype(np.int64) * max(len(vocab), 1) + tok_ids
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    sent = v[first[inverse]]
+
+    # _but_check: halve before the first "but", boost after it
+    but_pos = np.full(n_docs, np.iinfo(np.int64).max)
+    np.minimum.at(but_pos, doc[is_but], pos[is_but])
+    bp = but_pos[doc]
+    sent = np.where(pos < bp, np.where(bp < np.iinfo(np.int64).max, sent * 0.5, sent),
+                    np.where(pos > bp, sent * 1.5, sent))
+
+    # score_valence
+    sum_s = np.bincount(doc, weights=sent, minlength=n_docs)
+    ep = np.minimum(np.fromiter((t.count("!") for t in texts), dtype=np.int64, count=n_docs), 4) * 0.292
+    qm_count = np.fromiter((t.count("?") for t in texts), dtype=np.int64, count=n_docs)
+    qm = np.where(qm_count > 1, np.where(qm_count <= 3, qm_count * 0.18, 0.96), 0.0)
+    amp = ep + qm
+    sum_s = np.where(sum_s > 0, sum_s + amp, np.where(sum_s < 0, sum_s - amp, sum_s))
+    compound = sum_s / np.sqrt(sum_s * sum_s + 15)
+
+    pos_sum = np.bincount(doc, weights=np.where(sent > 0, sent + 1, 0.0), minlength=n_docs)
+    neg_sum = np.bincount(doc, weights=np.where(sent < 0, sent - 1, 0.0), minlength=n_docs)
+    neu = np.bincount(doc, weights=sent == 0, minlength=n_docs)
+    more_pos, more_neg = pos_sum > np.abs(neg_sum), pos_sum < np.abs(neg_sum)
+    pos_sum = np.where(more_pos, pos_sum + amp, pos_sum)
+    neg_sum = np.where(more_neg, neg_sum - amp, neg_sum)
+    total = pos_sum + np.abs(neg_sum) + neu
+    has = doc_len > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = pd.DataFrame({
+            "neg": _round(np.where(has, np.abs(neg_sum / total), 0.0), 3),
+            "neu": _round(np.where(has, np.abs(neu / total), 0.0), 3),
+            "pos": _round(np.where(has, np.abs(pos_sum / total), 0.0), 3),
+            "compound": _round(np.where(has, compound, 0.0), 4),
+        })
+    return out
+
+
+def compound_scores(texts, chunk=20000) -> np.ndarray:
+    """VADER compound score per text, scored in chunks of entries."""
+    texts = list(texts)
+    parts = [polarity_scores(texts[i:i + chunk])["compound"].to_numpy() for i in range(0, len(texts), chunk)]
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def parity_check(texts, tolerance=1e-4):
+    """Largest score differences against NLTK's analyzer, plus the speedup."""
+    sia = _analyzer()
+    started = time.perf_counter()
+    ref = pd.DataFrame([sia.polarity_scores(t) for t in texts])
+    nltk_s = time.perf_counter() - started
+    started = time.perf_counter()
+    got = polarity_scores(texts)
+    fast_s = time.perf_counter() - started
+    diff = (ref[got.columns] - got).abs().max()
+    return {
+        "texts": len(texts),
+        "max_abs_diff": {c: float(diff[c]) for c in got.columns},
+        "within_tolerance": bool((diff <= tolerance).all()),
+        "nltk_seconds": round(nltk_s, 3),
+        "fast_seconds": round(fast_s, 3),
+        "speedup": round(nltk_s / max(fast_s, 1e-9), 1),
+    }
+
+
+def main():
+    from .ingest import add_input_args, load_journal
+    ap = argparse.ArgumentParser(description="Batched VADER: parity and speed against NLTK")
+    add_input_args(ap, default=os.path.join("data", "sample_dreams.csv"))
+    ap.add_argument("--repeat", type=int, default=1, help="Repeat the texts to benchmark a larger journal")
+    ap.add_argument("--tolerance", type=float, default=1e-4)
+    args = ap.parse_args()
+
+    from . import analyze  # noqa: F401  (downloads the VADER lexicon)
+    texts = load_journal(args.input)[0]["text"].tolist() * args.repeat
+    print(json.dumps(parity_check(texts, args.tolerance), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ import seaborn as sns
 import io
 from sklearn.decomposition import PCA
 
+from .render_cache import get_render_cache
+
 # --- 1️⃣ Emotion Trend Chart ---
 def plot_emotion_trends(emo_df: pd.DataFrame):
     """
@@ -16,18 +18,21 @@ def plot_emotion_trends(emo_df: pd.DataFrame):
         raise ValueError("Emotion DataFrame must include 'date' column.")
     
     emotion_cols = [c for c in emo_df.columns if c not in ["date", "text"]]
-    melted = emo_df.melt(id_vars="date", value_vars=emotion_cols, var_name="emotion", value_name="score")
-    
-    fig = px.line(
-        melted,
-        x="date",
-        y="score",
-        color="emotion",
-        title="Emotion Trends Over Time",
-        markers=True
-    )
-    fig.update_layout(template="plotly_white", hovermode="x unified")
-    return fig
+
+    def build():
+        melted = emo_df.melt(id_vars="date", value_vars=emotion_cols, var_name="emotion", value_name="score")
+        fig = px.line(
+            melted,
+            x="date",
+            y="score",
+            color="emotion",
+            title="Emotion Trends Over Time",
+            markers=True
+        )
+        fig.update_layout(template="plotly_white", hovermode="x unified")
+        return fig
+
+    return get_render_cache().plotly("emotion_trends", build, emo_df[["date"] + emotion_cols])
 
 
 # --- 2️⃣ Dream Frequency Heatmap ---
@@ -37,26 +42,28 @@ from io import BytesIO
 
 def plot_dream_frequency(df):
     """Create a dream frequency heatmap (by week and year)."""
-    df["year"] = df["date"].dt.year
-    df["week"] = df["date"].dt.isocalendar().week
+    def render():
+        # Group by derived keys instead of adding year/week columns to the caller's frame
+        iso = df["date"].dt.isocalendar()
+        freq = df.groupby([df["date"].dt.year.rename("year"), iso["week"]], as_index=False).size()
+        freq = freq.rename(columns={"size": "dream_count"})
 
-    freq = df.groupby(["year", "week"], as_index=False).size()
-    freq = freq.rename(columns={"size": "dream_count"})
+        # ✅ FIX: use keyword arguments here
+        pivot = freq.pivot(index="year", columns="week", values="dream_count").fillna(0)
 
-    # ✅ FIX: use keyword arguments here
-    pivot = freq.pivot(index="year", columns="week", values="dream_count").fillna(0)
+        fig, ax = plt.subplots(figsize=(10, 4))
+        sns.heatmap(pivot, cmap="YlGnBu", cbar_kws={"label": "Dream Count"}, ax=ax)
+        ax.set_title("Dream Frequency (Year vs Week)")
+        ax.set_xlabel("Week of Year")
+        ax.set_ylabel("Year")
 
-    fig, ax = plt.subplots(figsize=(10, 4))
-    sns.heatmap(pivot, cmap="YlGnBu", cbar_kws={"label": "Dream Count"}, ax=ax)
-    ax.set_title("Dream Frequency (Year vs Week)")
-    ax.set_xlabel("Week of Year")
-    ax.set_ylabel("Year")
+        buf = BytesIO()
+        # The figure's own savefig: pyplot's current figure is shared with the job threads
+        fig.savefig(buf, format="png", bbox_inches="tight")
+        plt.close(fig)
+        return buf.getvalue()
 
-    buf = BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    return BytesIO(get_render_cache().png("dream_frequency", render, df["date"]))
 
 
 
@@ -96,19 +103,36 @@ def plot_cluster_projection(df: pd.DataFrame, embeddings, labels):
     """
     Reduce embeddings to 2D and visualize clusters interactively.
     """
-    pca = PCA(n_components=2)
-    reduced = pca.fit_transform(embeddings)
-    df_proj = pd.DataFrame(reduced, columns=["x", "y"])
-    df_proj["cluster"] = labels
-    df_proj["text"] = df["text"].values
-
-    fig = px.scatter(
-        df_proj,
-        x="x",
-        y="y",
-        color=df_proj["cluster"].astype(str),
-        hover_data=["text"],
-        title="Dream Clusters (2D Projection)"
-    )
-    fig.update_layout(template="plotly_white")
-    return fig
+    def build():
+        pca = PCA(n_components=2)
+        reduced = pca.fit_transform(embeddings)
+        df_proj = pd.DataFrame(reduced, columns=["x", "y"])
+        df_proj["cluster"] = labels
+        df_proj["text"] = df["text"].values
+
+        fig = px.scatter(
+            df_proj,
+            x="x",
+            y="y",
+            color=df_proj["cluster"].astype(str),
+            hover_data=["text"],
+            title="Dream Clusters (2D Projection)"
+        )
+        fig.update_layout(template="plotly_white")
+        return fig
+
+    return get_render_cache().plotly("cluster_projection", build, np.asarray(embeddings),
+                                     np.asarray(labels), df["text"].astype(str))
+
+
+# --- 5️⃣ Word Cloud ---
+def wordcloud_png(freq: dict, width=1200, height=600):
+    """Word cloud of token frequencies as PNG bytes."""
+    def render():
+        from wordcloud import WordCloud
+        wc = WordCloud(width=width, height=height, background_color="white", colormap="plasma").generate_from_frequencies(freq)
+        buf = BytesIO()
+        wc.to_image().save(buf, format="PNG")
+        return buf.getvalue()
+
+    return get_render_cache().png("wordcloud", render, sorted(freq.items()), width=width, height=height)
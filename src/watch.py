@@ -0,0 +1,272 @@
+# src/watch.py
+"""Watch mode: keep the reports current while a journal grows.
+
+Polls a journal file or Markdown folder (one ``os.stat`` per file per
+interval) and reads only what changed since the last poll:
+
+- CSV / TSV / JSONL: the complete lines appended after the last read offset
+  (parsed with the CSV header and the date format of the first read)
+- .txt diaries: the entries appended after the last complete one; the last
+  entry counts once the file has been quiet for ``settle`` seconds
+- Markdown folders: the new or modified files
+- anything else (a rewritten or truncated file, JSON arrays): a rescan
+
+New entries go through the journal store (src/store.py), which analyzes
+each entry once, skips ones it already holds and folds them into its
+aggregates. The reports are then rewritten from those aggregates, each
+atomically (temp file + rename). LDA topics cannot be updated
+incrementally, so they are refit at most every ``topics_every`` seconds.
+Memory stays flat: entries live in SQLite, the watcher only keeps offsets.
+
+    python -m src.watch --input journal.csv --outdir reports
+    python -m src.analyze --input journal.csv --outdir reports --watch
+"""
+import argparse
+import copy
+import hashlib
+import io
+import json
+import os
+import time
+
+import pandas as pd
+
+from .analyze import topic_model
+from .ingest import ERROR_COLUMNS, add_input_args, is_entry_start, iter_journal, report_errors
+from .store import JournalStore
+
+_LINE_FORMATS = (".csv", ".tsv", ".jsonl", ".ndjson")
+_MARKDOWN = (".md", ".markdown")
+_CHECK_BYTES = 256  # bytes before the read offset that must be unchanged for an append
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _dump_json(obj, path, **kwargs):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, default=int, **kwargs)
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _parse(text, name, fmt):
+    source = io.StringIO(text)
+    source.name = name
+    parts, errors = [], []
+    for frame, errs in iter_journal(source, fmt=fmt):
+        parts.append(frame)
+        errors.append(errs)
+    return parts, errors
+
+
+class JournalTail:
+    """Entries added to a journal file or Markdown folder since the previous poll."""
+
+    def __init__(self, path, state=None, settle=5.0):
+        self.path = path
+        self.settle = settle
+        self.state = state or {}
+
+    def poll(self):
+        """(new entries, error report); both empty when nothing changed."""
+        if os.path.isdir(self.path):
+            parts, errors = self._poll_folder()
+        else:
+            parts, errors = self._poll_file()
+        entries = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["date", "text"])
+        errors = [e for e in errors if len(e)]
+        report = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=ERROR_COLUMNS)
+        return entries, report
+
+    # --- single file ---
+    def _poll_file(self):
+        st = os.stat(self.path)
+        ext = os.path.splitext(self.path)[1].lower()
+        seen = self.state.get("file", {})
+        if seen.get("size") == st.st_size and seen.get("mtime") == st.st_mtime_ns and not seen.get("open"):
+            return [], []
+        appendable = ext in _LINE_FORMATS or ext == ".txt"
+        with open(self.path, "rb") as f:
+            offset = seen.get("offset", 0)
+            if appendable and offset and st.st_size >= offset:
+                f.seek(max(offset - _CHECK_BYTES, 0))
+                if _digest(f.read(offset - max(offset - _CHECK_BYTES, 0))) != seen.get("check"):
+                    offset = 0  # rewritten: rescan; the store skips entries it already has
+            else:
+                offset = 0
+            f.seek(offset)
+            data = f.read()
+        if not appendable:
+            parts, errors = self._rescan()
+            self.state["file"] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+            return parts, errors
+
+        text = data.decode("utf-8", errors="replace")
+        if ext == ".txt":
+            end, still_open = self._diary_end(text, st)
+        else:
+            end, still_open = text.rfind("\n") + 1, False  # complete lines only
+        if offset == 0 and ext in (".csv", ".tsv"):
+            header_end = text.find("\n") + 1
+            seen["header"] = text[:header_end]
+            chunk = text[:end]
+        else:
+            chunk = seen.get("header", "") + text[:end]
+        parts, errors = _parse(chunk, self.path, seen.get("fmt")) if text[:end].strip() else ([], [])
+        if parts and not seen.get("fmt"):
+            seen["fmt"] = parts[0].attrs.get("date_format")
+
+        new_offset = offset + len(text[:end].encode("utf-8"))
+        with open(self.path, "rb") as f:
+            f.seek(max(new_offset - _CHECK_BYTES, 0))
+            check = _digest(f.read(new_offset - max(new_offset - _CHECK_BYTES, 0)))
+        seen.update(size=st.st_size, mtime=st.st_mtime_ns, offset=new_offset, check=check, open=still_open)
+        self.state["file"] = seen
+        return parts, errors
+
+    def _diary_end(self, text, st):
+        """Where the complete diary entries end (the last one stays open until the file settles)."""
+        if time.time() - st.st_mtime_ns / 1e9 >= self.settle:
+            return len(text), False
+        lines = text.splitlines(keepends=True)
+        starts = [i for i, line in enumerate(lines) if is_entry_start(line)]
+        return (len("".join(lines[:starts[-1]])) if starts else 0), True
+
+    def _rescan(self):
+        parts, errors = [], []
+        for frame, errs in iter_journal(self.path):
+            parts.append(frame)
+            errors.append(errs)
+        return parts, errors
+
+    # --- Markdown folder ---
+    def _poll_folder(self):
+        files = self.state.setdefault("files", {})
+        parts, errors = [], []
+        for root, _, names in os.walk(self.path):
+            for name in sorted(names):
+                if not name.lower().endswith(_MARKDOWN):
+                    continue
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                stamp = [st.st_size, st.st_mtime_ns]
+                if files.get(path) == stamp:
+                    continue
+                for frame, errs in iter_journal(path):
+                    parts.append(frame)
+                    errors.append(errs)
+                files[path] = stamp
+        return parts, errors
+
+
+def write_reports(store, outdir):
+    """Rewrite the aggregate reports from the store, each atomically."""
+    os.makedirs(outdir, exist_ok=True)
+    reports = {
+        "daily_sentiment.csv": store.daily(),
+        "top_keywords.csv": store.top_keywords(40),
+        "symbols_timeline.csv": store.symbol_timeline(),
+        "symbols_totals.csv": store.symbol_totals(),
+    }
+    avg = store.avg_emotions()
+    if len(avg):
+        reports["avg_emotions.csv"] = avg
+    for name, frame in reports.items():
+        _write_atomic(os.path.join(outdir, name), lambda tmp: frame.to_csv(tmp, index=False))
+
+
+def write_topics(store, outdir, n_topics=4):
+    topics = topic_model(store.texts(), n_topics=n_topics, n_top_words=8)
+    _write_atomic(os.path.join(outdir, "topics.json"), lambda tmp: _dump_json(topics, tmp, indent=2))
+
+
+def watch_journal(path, outdir="reports", db=None, interval=1.0, emotions="fast", topics_every=3600,
+                  n_topics=4, settle=5.0, once=False, log=print):
+    """Poll path and keep outdir's reports current (until interrupted, or one pass with once=True)."""
+    os.makedirs(outdir, exist_ok=True)
+    db = db or os.path.join(outdir, "journal.db")
+    store = JournalStore(db)
+    state_path = f"{db}.watch.json"
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    if state.get("path") != os.path.abspath(path):
+        state = {"path": os.path.abspath(path)}
+    # A single pass takes the diary's last entry as it stands
+    tail = JournalTail(path, state.setdefault("tail", {}), settle=0 if once else settle)
+    reports_due = False
+    topics_due = not os.path.exists(os.path.join(outdir, "topics.json"))
+    log(f"Watching {path} -> {outdir} ({len(store)} entries stored)")
+
+    try:
+        while True:
+            started = time.perf_counter()
+            offsets = copy.deepcopy(tail.state)
+            try:
+                new, errors = tail.poll()
+                report_errors(errors)
+                added = store.add_entries(new, with_emotions=emotions != "off",
+                                          emotion_tier=None if emotions == "off" else emotions) if len(new) else 0
+                if added:
+                    reports_due = topics_due = True
+                if reports_due:
+                    write_reports(store, outdir)
+                    reports_due = False
+                    log(f"+{added} entries ({len(store)} total), reports updated in "
+                        f"{(time.perf_counter() - started) * 1000:.0f} ms")
+                # Offsets are saved after the entries are stored: a crash in between only re-reads them
+                _write_atomic(state_path, lambda tmp: _dump_json(state, tmp))
+            except Exception as e:
+                # Keep watching; the next pass re-reads what this one could not store
+                tail.state.clear()
+                tail.state.update(offsets)
+                log(f"Update failed: {e!r}")
+                if once:
+                    raise
+
+            if topics_due and len(store) and (once or time.time() - state.get("topics_at", 0) >= topics_every):
+                try:
+                    write_topics(store, outdir, n_topics=n_topics)
+                    log("Topics refit")
+                except Exception as e:
+                    # LDA needs a few varied entries ("no terms remain" on a new journal);
+                    # it is tried again once more entries arrive
+                    log(f"Topics not refit yet: {e}")
+                state["topics_at"] = time.time()
+                topics_due = False
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        log("Stopped.")
+    finally:
+        store.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Keep the reports current as a journal file or folder grows")
+    add_input_args(ap)
+    ap.add_argument("--outdir", default="reports")
+    ap.add_argument("--db", default=None, help="Journal store (default: <outdir>/journal.db)")
+    ap.add_argument("--interval", type=float, default=1.0, help="Seconds between polls")
+    ap.add_argument("--emotions", choices=["off", "fast", "accurate", "cascade"], default="fast",
+                    help="Emotion scoring tier for new entries")
+    ap.add_argument("--topics-every", type=float, default=3600, help="Minimum seconds between topic refits")
+    ap.add_argument("--topics", type=int, default=4, help="Number of LDA topics")
+    ap.add_argument("--settle", type=float, default=5.0,
+                    help="Seconds a .txt diary must be unchanged before its last entry counts")
+    ap.add_argument("--once", action="store_true", help="Process what is new, update the reports and exit")
+    args = ap.parse_args()
+    watch_journal(args.input, args.outdir, db=args.db, interval=args.interval, emotions=args.emotions,
+                  topics_every=args.topics_every, n_topics=args.topics, settle=args.settle, once=args.once)
+
+
+if __name__ == "__main__":
+    main()